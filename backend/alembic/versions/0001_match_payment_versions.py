@@ -0,0 +1,31 @@
+"""Version matches and payments for optimistic concurrency
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from migrations import add_missing_columns, drop_existing_columns
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    for table in ("matches", "payments"):
+        # The server default fills in existing rows as the column is added
+        if add_missing_columns(table, sa.Column("version", sa.Integer(), nullable=False, server_default="1")):
+            op.execute(f"UPDATE {table} SET version = 1 WHERE version IS NULL")
+    for table in ("archived_matches", "archived_payments"):
+        add_missing_columns(table, sa.Column("version", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    for table in ("matches", "payments", "archived_matches", "archived_payments"):
+        drop_existing_columns(table, "version")
@@ -0,0 +1,33 @@
+"""Gallery image uploads with resized variants
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 10:05:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from migrations import add_missing_columns, drop_existing_columns
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    added = add_missing_columns(
+        "gallery",
+        sa.Column("image_hash", sa.String(64), nullable=True),
+        sa.Column("srcset", sa.Text(), nullable=True),
+        sa.Column("srcset_webp", sa.Text(), nullable=True),
+    )
+    if "image_hash" in added:
+        op.create_index("ix_gallery_image_hash", "gallery", ["image_hash"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_gallery_image_hash", table_name="gallery", if_exists=True)
+    drop_existing_columns("gallery", "image_hash", "srcset", "srcset_webp")
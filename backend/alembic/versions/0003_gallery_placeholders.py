@@ -0,0 +1,31 @@
+"""Gallery image dimensions and placeholders
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 10:10:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from migrations import add_missing_columns, drop_existing_columns
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Left NULL on existing rows for the placeholder backfill job to fill in
+    add_missing_columns(
+        "gallery",
+        sa.Column("width", sa.Integer(), nullable=True),
+        sa.Column("height", sa.Integer(), nullable=True),
+        sa.Column("placeholder", sa.Text(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    drop_existing_columns("gallery", "width", "height", "placeholder")
@@ -0,0 +1,25 @@
+"""Count admin retries of failed refunds
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 14:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from migrations import add_missing_columns, drop_existing_columns
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    add_missing_columns("refunds", sa.Column("retries", sa.Integer(), nullable=False, server_default="0"))
+
+
+def downgrade() -> None:
+    drop_existing_columns("refunds", "retries")
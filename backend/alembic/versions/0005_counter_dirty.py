@@ -0,0 +1,25 @@
+"""Flag table counters whose row count is unknown
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 15:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from migrations import add_missing_columns, drop_existing_columns
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    add_missing_columns("table_counters", sa.Column("dirty", sa.Boolean(), nullable=False, server_default=sa.false()))
+
+
+def downgrade() -> None:
+    drop_existing_columns("table_counters", "dirty")
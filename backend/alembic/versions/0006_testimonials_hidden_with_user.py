@@ -0,0 +1,32 @@
+"""Remember which testimonials were hidden along with their user
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 16:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from migrations import add_missing_columns, drop_existing_columns
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    column = sa.Column("hidden_with_user", sa.Boolean(), nullable=False, server_default=sa.false())
+    if add_missing_columns("testimonials", column):
+        # Hidden testimonials of deactivated users were, as far as anyone can
+        # tell now, hidden with them; restoring the user brought them back
+        op.execute(
+            "UPDATE testimonials SET hidden_with_user = true "
+            "WHERE is_active = false AND user_id IN (SELECT id FROM users WHERE is_active = false)"
+        )
+
+
+def downgrade() -> None:
+    drop_existing_columns("testimonials", "hidden_with_user")
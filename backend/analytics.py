@@ -0,0 +1,209 @@
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional
+from sqlalchemy import select, delete, insert, update, union, union_all, or_, case, cast, func, String
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import AsyncSessionLocal
+from models import (
+    Match, Booking, Payment, MatchStats, DailyBookingStats, RollupState,
+    ArchivedMatch, ArchivedBooking, ArchivedPayment
+)
+
+STATE_NAME = "analytics"
+
+# Re-read a little before the last watermark so rows committed by
+# transactions that were still open during the previous refresh are not missed
+WATERMARK_OVERLAP = timedelta(minutes=2)
+
+# Keep IN (...) lists well under SQLite's bound-parameter limit
+CHUNK_SIZE = 500
+
+def _chunks(values: list, size: int = CHUNK_SIZE) -> Iterable[list]:
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+def booking_day(booking_time=Booking.booking_time):
+    return cast(func.date(booking_time), String)
+
+def _with_archive(model, archive_model, *names):
+    # Live and archived rows together; a row lives in exactly one of them
+    return union_all(
+        select(*[getattr(model, name) for name in names]),
+        select(*[getattr(archive_model, name) for name in names]),
+    ).subquery()
+
+async def _changed_match_ids(db: AsyncSession, since: datetime) -> List[str]:
+    changed = union(
+        select(Match.id).where(or_(Match.created_at > since, Match.updated_at > since)),
+        select(Booking.match_id).where(
+            or_(Booking.booking_time > since, Booking.cancelled_at > since)
+        ),
+        select(Booking.match_id)
+        .join(Payment, Payment.booking_id == Booking.id)
+        .where(or_(Payment.created_at > since, Payment.updated_at > since)),
+    )
+    result = await db.execute(changed)
+    return [match_id for match_id in result.scalars().all() if match_id]
+
+async def _refresh_match_stats(db: AsyncSession, match_ids: Optional[List[str]], now: datetime) -> int:
+    """Recomputes match_stats rows for the given matches, or for all matches when None."""
+    booking_totals = (
+        select(
+            Match.id, Match.date, Match.location, Match.max_players,
+            func.count(Booking.id),
+            func.coalesce(func.sum(case((Booking.is_cancelled == True, 1), else_=0)), 0),
+            func.coalesce(func.sum(case((Booking.is_cancelled == True, Booking.refund_amount), else_=0)), 0),
+        )
+        .outerjoin(Booking, Booking.match_id == Match.id)
+        .group_by(Match.id, Match.date, Match.location, Match.max_players)
+    )
+    revenue_totals = (
+        select(Booking.match_id, func.sum(Payment.amount))
+        .join(Payment, Payment.booking_id == Booking.id)
+        .where(Payment.status == "completed")
+        .group_by(Booking.match_id)
+    )
+
+    if match_ids is None:
+        # Archived matches can no longer change, so their rows are kept as they are
+        await db.execute(delete(MatchStats).where(MatchStats.match_id.not_in(select(ArchivedMatch.id))))
+        batches = [None]
+    else:
+        batches = list(_chunks(match_ids))
+
+    refreshed = 0
+    for batch in batches:
+        bookings_query, revenue_query = booking_totals, revenue_totals
+        if batch is not None:
+            bookings_query = bookings_query.where(Match.id.in_(batch))
+            revenue_query = revenue_query.where(Booking.match_id.in_(batch))
+            # Deleted matches simply drop out of the rollup
+            await db.execute(delete(MatchStats).where(MatchStats.match_id.in_(batch)))
+
+        revenue = dict((await db.execute(revenue_query)).all())
+        rows = [
+            {
+                "match_id": match_id,
+                "date": date,
+                "location": location,
+                "max_players": max_players or 0,
+                "bookings": bookings,
+                "cancellations": cancellations,
+                "revenue": float(revenue.get(match_id) or 0),
+                "refunds": float(refunds or 0),
+                "refreshed_at": now,
+            }
+            for match_id, date, location, max_players, bookings, cancellations, refunds
+            in (await db.execute(bookings_query)).all()
+        ]
+        for chunk in _chunks(rows):
+            await db.execute(insert(MatchStats), chunk)
+        refreshed += len(rows)
+    return refreshed
+
+async def _refresh_daily_stats(db: AsyncSession, days: Optional[List[str]], now: datetime) -> int:
+    """
+    Recomputes daily_booking_stats rows for the given booking days, or for all days when None.
+    A day can mix archived and live bookings, so both are read.
+    """
+    matches = _with_archive(Match, ArchivedMatch, "id", "location")
+    bookings = _with_archive(
+        Booking, ArchivedBooking, "id", "match_id", "booking_time", "is_cancelled", "refund_amount"
+    )
+    payments = _with_archive(Payment, ArchivedPayment, "booking_id", "amount", "status")
+
+    day = booking_day(bookings.c.booking_time)
+    booking_totals = (
+        select(
+            day, matches.c.location,
+            func.count(bookings.c.id),
+            func.coalesce(func.sum(case((bookings.c.is_cancelled == True, 1), else_=0)), 0),
+            func.coalesce(func.sum(case((bookings.c.is_cancelled == True, bookings.c.refund_amount), else_=0)), 0),
+        )
+        .select_from(bookings)
+        .join(matches, matches.c.id == bookings.c.match_id)
+        .group_by(day, matches.c.location)
+    )
+    revenue_totals = (
+        select(day, matches.c.location, func.sum(payments.c.amount))
+        .select_from(payments)
+        .join(bookings, bookings.c.id == payments.c.booking_id)
+        .join(matches, matches.c.id == bookings.c.match_id)
+        .where(payments.c.status == "completed")
+        .group_by(day, matches.c.location)
+    )
+
+    if days is None:
+        await db.execute(delete(DailyBookingStats))
+        batches = [None]
+    else:
+        batches = list(_chunks(days))
+
+    refreshed = 0
+    for batch in batches:
+        bookings_query, revenue_query = booking_totals, revenue_totals
+        if batch is not None:
+            bookings_query = bookings_query.where(day.in_(batch))
+            revenue_query = revenue_query.where(day.in_(batch))
+            await db.execute(delete(DailyBookingStats).where(DailyBookingStats.day.in_(batch)))
+
+        revenue = {(d, location): total for d, location, total in (await db.execute(revenue_query)).all()}
+        rows = [
+            {
+                "day": d,
+                "location": location,
+                "bookings": bookings,
+                "cancellations": cancellations,
+                "revenue": float(revenue.get((d, location)) or 0),
+                "refunds": float(refunds or 0),
+                "refreshed_at": now,
+            }
+            for d, location, bookings, cancellations, refunds in (await db.execute(bookings_query)).all()
+            if d is not None
+        ]
+        for chunk in _chunks(rows):
+            await db.execute(insert(DailyBookingStats), chunk)
+        refreshed += len(rows)
+    return refreshed
+
+async def refresh_rollups(full: bool = False) -> dict:
+    """
+    Brings match_stats and daily_booking_stats up to date.
+
+    Incremental runs only recompute matches touched since the last watermark
+    and the booking days of those matches; a full run rebuilds both tables,
+    which also drops rows for matches and bookings deleted in the meantime.
+    """
+    # Timestamps in the tables are naive UTC (server defaults and utcnow())
+    now = datetime.utcnow()
+    async with AsyncSessionLocal() as db:
+        state = (await db.execute(
+            select(RollupState).where(RollupState.name == STATE_NAME)
+        )).scalar_one_or_none()
+        if state is None or state.watermark is None:
+            full = True
+
+        if full:
+            matches = await _refresh_match_stats(db, None, now)
+            days = await _refresh_daily_stats(db, None, now)
+        else:
+            match_ids = await _changed_match_ids(db, state.watermark - WATERMARK_OVERLAP)
+            affected_days = set()
+            for batch in _chunks(match_ids):
+                result = await db.execute(
+                    select(booking_day()).where(Booking.match_id.in_(batch)).distinct()
+                )
+                affected_days.update(d for d in result.scalars().all() if d is not None)
+            matches = await _refresh_match_stats(db, match_ids, now) if match_ids else 0
+            days = await _refresh_daily_stats(db, sorted(affected_days), now) if affected_days else 0
+
+        if state is None:
+            db.add(RollupState(name=STATE_NAME, watermark=now, refreshed_at=now))
+        else:
+            await db.execute(
+                update(RollupState)
+                .where(RollupState.name == STATE_NAME)
+                .values(watermark=now, refreshed_at=now)
+            )
+        await db.commit()
+
+    return {"full": full, "matches_refreshed": matches, "days_refreshed": days, "refreshed_at": now}
@@ -0,0 +1,124 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Optional
+from zoneinfo import ZoneInfo
+from sqlalchemy import select, insert, delete, literal, func, union
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import AsyncSessionLocal
+from models import Match, Booking, Payment, Refund, ArchivedMatch, ArchivedBooking, ArchivedPayment
+from config import settings
+
+# A match is only archived once none of its payments can still change,
+# which includes a refund still to be settled against one
+UNSETTLED_PAYMENT_STATUSES = ("pending",)
+UNSETTLED_REFUND_STATUSES = ("queued", "processing")
+
+ARCHIVES = (
+    (Match, ArchivedMatch),
+    (Booking, ArchivedBooking),
+    (Payment, ArchivedPayment),
+)
+
+def archive_cutoff(days: Optional[int] = None) -> str:
+    """Match dates strictly before this "YYYY-MM-DD" are old enough to archive."""
+    days = settings.archive_after_days if days is None else days
+    # Match dates are venue dates, so count days in the venue's timezone
+    today = datetime.now(ZoneInfo(settings.timezone)).date()
+    return (today - timedelta(days=days)).isoformat()
+
+def _candidates(cutoff: str, limit: int):
+    unsettled = union(
+        select(Booking.match_id)
+        .join(Payment, Payment.booking_id == Booking.id)
+        .where(Payment.status.in_(UNSETTLED_PAYMENT_STATUSES)),
+        select(Booking.match_id)
+        .join(Refund, Refund.booking_id == Booking.id)
+        .where(Refund.status.in_(UNSETTLED_REFUND_STATUSES)),
+    )
+    # FOR UPDATE (ignored by SQLite, which locks the whole database on the
+    # first write) keeps bookings from being added to a match mid-move;
+    # SKIP LOCKED lets concurrent runs split the work instead of queueing
+    return (
+        select(Match.id)
+        .where(Match.date < cutoff, Match.id.not_in(unsettled))
+        .order_by(Match.date, Match.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+
+async def _move(db: AsyncSession, model, archive_model, condition, now: datetime) -> int:
+    columns = [column.name for column in model.__table__.columns]
+    await db.execute(
+        insert(archive_model).from_select(
+            columns + ["archived_at"],
+            select(*[getattr(model, name) for name in columns], literal(now)).where(condition)
+        )
+    )
+    result = await db.execute(
+        delete(model).where(condition).execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+async def archive_batch(cutoff: str, batch_size: int) -> Optional[dict]:
+    """
+    Moves one batch of matches, with their bookings and payments, into the
+    archive tables in a single transaction. Returns None when nothing is
+    left to archive.
+    """
+    now = datetime.utcnow()
+    async with AsyncSessionLocal() as db:
+        match_ids = (await db.execute(_candidates(cutoff, batch_size))).scalars().all()
+        if not match_ids:
+            return None
+
+        booking_ids = select(Booking.id).where(Booking.match_id.in_(match_ids))
+        # Children first, so the subqueries still see their parents
+        moved = {
+            "payments": await _move(db, Payment, ArchivedPayment, Payment.booking_id.in_(booking_ids), now),
+            "bookings": await _move(db, Booking, ArchivedBooking, Booking.match_id.in_(match_ids), now),
+            "matches": await _move(db, Match, ArchivedMatch, Match.id.in_(match_ids), now),
+        }
+        await db.commit()
+    return moved
+
+async def archive_matches(cutoff: Optional[str] = None, batch_size: Optional[int] = None,
+                          max_batches: Optional[int] = None) -> dict:
+    """
+    Archives every settled match dated before the cutoff, batch by batch.
+
+    Each batch commits on its own, so an interrupted run leaves every match
+    either fully live or fully archived and the next run simply picks up
+    the remaining candidates.
+    """
+    cutoff = cutoff or archive_cutoff()
+    batch_size = batch_size or settings.archive_batch_size
+    totals = {"matches": 0, "bookings": 0, "payments": 0}
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        moved = await archive_batch(cutoff, batch_size)
+        if moved is None:
+            break
+        batches += 1
+        for name, count in moved.items():
+            totals[name] += count
+        # Let request handlers in between batches
+        await asyncio.sleep(0)
+    return {"cutoff": cutoff, "batches": batches, "archived": totals}
+
+async def archive_status(db: AsyncSession) -> dict:
+    counts = {}
+    for _, archive_model in ARCHIVES:
+        counts[archive_model.__tablename__] = (await db.execute(
+            select(func.count()).select_from(archive_model)
+        )).scalar_one()
+    last_archived_at = (await db.execute(select(func.max(ArchivedMatch.archived_at)))).scalar_one()
+    cutoff = archive_cutoff()
+    pending = (await db.execute(
+        select(func.count()).select_from(Match).where(Match.date < cutoff)
+    )).scalar_one()
+    return {
+        "cutoff": cutoff,
+        "archived": counts,
+        "last_archived_at": last_archived_at,
+        "live_matches_before_cutoff": pending,
+    }
@@ -6,7 +6,7 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from database import get_db
+from loaders import Loaders, get_loaders
 from models import User
 from schemas import TokenData
 from config import settings
@@ -49,7 +49,7 @@ def verify_token(token: str) -> Optional[TokenData]:
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: AsyncSession = Depends(get_db)
+    loaders: Loaders = Depends(get_loaders)
 ) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -62,9 +62,8 @@ async def get_current_user(
     if token_data is None:
         raise credentials_exception
     
-    # Get user from database
-    result = await db.execute(select(User).where(User.username == token_data.username))
-    user = result.scalar_one_or_none()
+    # Get user from database; later lookups of this user in the request are free
+    user = await loaders.users_by_username.load(token_data.username)
     
     if user is None:
         raise credentials_exception
@@ -0,0 +1,245 @@
+"""
+Load-test harness for the Kickora API.
+
+Seeds a throwaway database with benchmarks/seed.py, drives the real FastAPI app and prints a JSON
+report with throughput and latency percentiles per scenario, so runs can be
+diffed across commits. Run from the backend directory:
+
+    python -m benchmarks.loadtest                       # in-process, temp SQLite
+    python -m benchmarks.loadtest --scenario browse --scenario booking
+    python -m benchmarks.loadtest --scale medium --scenario admin_stats
+    python -m benchmarks.loadtest --database-url postgresql+asyncpg://... --recreate \\
+        --url http://127.0.0.1:8000                     # against a running uvicorn
+
+Seeding drops and recreates every table, so a --database-url is only used
+with --recreate. When --url is given the server must use the same
+--database-url, since the harness seeds that database directly before
+sending any traffic.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import date
+from benchmarks.seed import SCALES, SEED_PASSWORD, generate, resolve_counts, username
+
+SCENARIOS = ["browse", "booking", "login", "admin_stats"]
+
+RUSH_MATCHES = 5
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Kickora API load test")
+    parser.add_argument("--url", help="Base URL of a running server; default drives the app in-process")
+    parser.add_argument("--database-url", help="Database to seed; default is a temporary SQLite file")
+    parser.add_argument("--recreate", action="store_true",
+                        help="Confirm that --database-url may be wiped: its tables are dropped and reseeded")
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS,
+                        help="Scenario to run (repeatable); default runs all of them")
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent clients per scenario")
+    parser.add_argument("--scale", choices=SCALES, default="tiny", help="Dataset size, see benchmarks/seed.py")
+    for table in ["users", "matches", "bookings", "testimonials", "gallery"]:
+        parser.add_argument(f"--{table}", type=int, help=f"Override the number of {table}")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for data and traffic")
+    # Pinned so reports from different days compare like for like
+    parser.add_argument("--anchor-date", default="2026-01-01", help="'Now' for the generated dataset")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+    if args.database_url and not args.recreate:
+        parser.error("seeding drops every table of --database-url; pass --recreate if that is intended")
+    return args
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def summarize(name, latencies, statuses, elapsed):
+    latencies.sort()
+    ms = [value * 1000 for value in latencies]
+    errors = sum(count for code, count in statuses.items() if code >= 400 or code == 0)
+    return {
+        "scenario": name,
+        "requests": len(latencies),
+        "errors": errors,
+        "status_counts": {str(code): count for code, count in sorted(statuses.items())},
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "latency_ms": {
+            "mean": round(sum(ms) / len(ms), 3) if ms else None,
+            "p50": round(percentile(ms, 50), 3) if ms else None,
+            "p90": round(percentile(ms, 90), 3) if ms else None,
+            "p99": round(percentile(ms, 99), 3) if ms else None,
+            "max": round(ms[-1], 3) if ms else None
+        }
+    }
+
+async def seed_database(args):
+    from database import engine, AsyncSessionLocal
+    from models import Match
+    from counters import reconcile_counters
+
+    counts = resolve_counts(args)
+    await generate(engine, counts, args.seed, date.fromisoformat(args.anchor_date))
+
+    # Release matches with room for everybody, so the booking rush measures
+    # booking rather than "Match is full"
+    async with AsyncSessionLocal() as db:
+        db.add_all([
+            Match(id=f"rush-{i}", date=args.anchor_date, time="19:00", location="Kickora Arena",
+                  price=299.0, max_players=counts["users"], players_left=counts["users"])
+            for i in range(RUSH_MATCHES)
+        ])
+        await db.commit()
+
+    # The generator writes through Core, which the counters don't see; do
+    # what the scheduled reconcile job would before admin_stats reads them
+    await reconcile_counters()
+    return counts
+
+def build_requests(name, args, counts, rng):
+    from auth import create_access_token
+    from config import settings
+
+    if name == "browse":
+        paths = ["/api/v1/matches/", "/api/v1/gallery/", "/api/v1/testimonials/",
+                 "/api/v1/gallery/categories/list"]
+        return [("GET", rng.choice(paths), None, None) for _ in range(args.requests)]
+
+    if name == "login":
+        return [
+            ("POST", "/api/v1/auth/login",
+             {"username": username(rng.randrange(counts["users"])), "password": SEED_PASSWORD}, None)
+            for _ in range(args.requests)
+        ]
+
+    if name == "admin_stats":
+        return [
+            ("GET", f"/api/v1/admin/stats?password={settings.admin_mode_password}", None, None)
+            for _ in range(args.requests)
+        ]
+
+    if name == "booking":
+        # Tokens are minted directly so the rush measures booking, not bcrypt;
+        # the headline match gets most of the traffic like a real release
+        pairs = set()
+        limit = min(args.requests, counts["users"] * RUSH_MATCHES)
+        while len(pairs) < limit:
+            match = 0 if rng.random() < 0.8 else rng.randrange(RUSH_MATCHES)
+            pairs.add((rng.randrange(counts["users"]), match))
+        pairs = sorted(pairs)
+        rng.shuffle(pairs)
+        return [
+            ("POST", f"/api/v1/matches/rush-{match}/book", {"match_id": f"rush-{match}"},
+             {"Authorization": f"Bearer {create_access_token(data={'sub': username(user)})}"})
+            for user, match in pairs
+        ]
+
+    raise ValueError(f"Unknown scenario: {name}")
+
+async def run_scenario(client, name, args, counts, rng):
+    queue = build_requests(name, args, counts, rng)
+    queue.reverse()
+    latencies = []
+    statuses = Counter()
+
+    async def worker():
+        while queue:
+            method, path, body, headers = queue.pop()
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body, headers=headers)
+                code = response.status_code
+            except Exception:
+                code = 0
+            latencies.append(time.perf_counter() - started)
+            statuses[code] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    return summarize(name, latencies, statuses, time.perf_counter() - started)
+
+async def run(args):
+    import httpx
+    from config import settings
+
+    rng = random.Random(args.seed)
+    counts = await seed_database(args)
+
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=60)
+        lifespan = contextlib.nullcontext()
+    else:
+        from main import app
+        client = httpx.AsyncClient(app=app, base_url="http://loadtest", timeout=60)
+        # httpx doesn't send lifespan events, so start the app up (migrations,
+        # search index, webhook processor) the way uvicorn would
+        lifespan = app.router.lifespan_context(app)
+
+    results = []
+    async with lifespan, client:
+        for name in args.scenario or SCENARIOS:
+            results.append(await run_scenario(client, name, args, counts, rng))
+
+    return {
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "database": settings.database_url.split("://")[0],
+        "target": args.url or "in-process",
+        "parameters": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "scale": args.scale,
+            "dataset": counts,
+            "seed": args.seed,
+            "anchor_date": args.anchor_date
+        },
+        "results": results
+    }
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    # config.py reads the environment at import time, so configure it first
+    tmpdir = None
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        tmpdir = tempfile.TemporaryDirectory()
+        os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{tmpdir.name}/loadtest.db"
+    os.environ["DATABASE_ECHO"] = "false"
+    # Background jobs firing mid-run would only add noise to the timings
+    os.environ.setdefault("SCHEDULER_ENABLED", "false")
+
+    try:
+        report = asyncio.run(run(args))
+    finally:
+        if tmpdir:
+            tmpdir.cleanup()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    sys.exit(main())
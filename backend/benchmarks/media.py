@@ -0,0 +1,147 @@
+"""
+Benchmark for serving gallery media.
+
+Compares media_files.MediaFiles with the naive handler it replaces (a route
+that reads the whole file into memory on the event loop and returns it) on
+a temporary media directory laid out like media.py's. Scenarios:
+
+    full        plain GETs of random variants
+    revalidate  GETs with the If-None-Match a browser would send
+    range       GETs of the first 64 KiB of large variants
+
+Run from the backend directory:
+
+    python -m benchmarks.media
+    python -m benchmarks.media --requests 5000 --concurrency 64 --images 200
+
+Requests go through httpx's in-process ASGI transport, so this measures the
+app's own cost; the zero-copy path needs a server that offers the
+http.response.zerocopysend extension and is not exercised here.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+# Typical encoded sizes of each variant
+SIZES = {"thumb": 25 * 1024, "medium": 180 * 1024, "large": 700 * 1024}
+
+SCENARIOS = ["full", "revalidate", "range"]
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark gallery media serving")
+    parser.add_argument("--images", type=int, default=50, help="Distinct uploaded images")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per scenario and variant")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent clients")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for files and traffic")
+    return parser.parse_args(argv)
+
+def write_media(root: str, images: int, rng: random.Random) -> list:
+    paths = []
+    for _ in range(images):
+        content = rng.randbytes(64)
+        digest = hashlib.sha256(content).hexdigest()
+        directory = os.path.join(root, digest[:2], digest)
+        os.makedirs(directory, exist_ok=True)
+        for name, size in SIZES.items():
+            # Random bytes compress about as badly as real JPEG/WebP data
+            with open(os.path.join(directory, f"{name}.jpg"), "wb") as file:
+                file.write(rng.randbytes(size))
+            paths.append(f"/{digest[:2]}/{digest}/{name}.jpg")
+    return paths
+
+def build_app(root: str):
+    from fastapi import FastAPI, HTTPException, Response
+    from media_files import MediaFiles
+
+    app = FastAPI()
+
+    @app.get("/naive/{path:path}")
+    async def naive(path: str):
+        try:
+            with open(os.path.join(root, path), "rb") as file:
+                return Response(file.read(), media_type="image/jpeg")
+        except FileNotFoundError:
+            raise HTTPException(status_code=404)
+
+    app.mount("/media", MediaFiles(root))
+    return app
+
+def requests_for(scenario: str, paths: list, etags: dict, count: int, rng: random.Random) -> list:
+    if scenario == "range":
+        paths = [path for path in paths if path.endswith("/large.jpg")]
+    requests = []
+    for _ in range(count):
+        path = rng.choice(paths)
+        headers = {}
+        if scenario == "revalidate":
+            headers["if-none-match"] = etags[path]
+        elif scenario == "range":
+            headers["range"] = "bytes=0-65535"
+        requests.append((path, headers))
+    return requests
+
+async def drive(client, prefix: str, requests: list, concurrency: int) -> dict:
+    queue = list(reversed(requests))
+    timings, statuses, transferred = [], {}, 0
+
+    async def worker():
+        nonlocal transferred
+        while queue:
+            path, headers = queue.pop()
+            started = time.perf_counter()
+            response = await client.get(prefix + path, headers=headers)
+            timings.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            transferred += len(response.content)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    timings.sort()
+    return {
+        "requests_per_s": round(len(requests) / elapsed),
+        "mb_per_s": round(transferred / elapsed / 1024 / 1024, 1),
+        "p50_ms": round(statistics.median(timings) * 1000, 2),
+        "p95_ms": round(timings[int(len(timings) * 0.95)] * 1000, 2),
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+    }
+
+async def run(args, root: str):
+    import httpx
+
+    rng = random.Random(args.seed)
+    paths = write_media(root, args.images, rng)
+    app = build_app(root)
+    report = {"images": args.images, "requests": args.requests, "concurrency": args.concurrency, "results": {}}
+
+    async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+        etags = {path: (await client.head("/media" + path)).headers["etag"] for path in paths}
+        for scenario in SCENARIOS:
+            requests = requests_for(scenario, paths, etags, args.requests, rng)
+            results = {}
+            for variant, prefix in [("naive", "/naive"), ("media_files", "/media")]:
+                await drive(client, prefix, requests[:args.concurrency], args.concurrency)  # warm up
+                results[variant] = await drive(client, prefix, requests, args.concurrency)
+            results["speedup"] = round(
+                results["media_files"]["requests_per_s"] / results["naive"]["requests_per_s"], 2
+            )
+            report["results"][scenario] = results
+    return report
+
+def main(argv=None):
+    args = parse_args(argv)
+    tmpdir = tempfile.TemporaryDirectory()
+    try:
+        print(json.dumps(asyncio.run(run(args, tmpdir.name)), indent=2))
+    finally:
+        tmpdir.cleanup()
+
+if __name__ == "__main__":
+    sys.exit(main())
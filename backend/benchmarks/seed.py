@@ -0,0 +1,335 @@
+"""
+Synthetic dataset generator for scale testing.
+
+Bulk-loads realistic volumes of users, matches, bookings, payments,
+testimonials and gallery items through the models in models.py, using
+batched multi-row inserts. The same --seed and --anchor-date always produce
+the same rows.
+Run from the backend directory:
+
+    python -m benchmarks.seed --scale large                # ./kickora_scale.db
+    python -m benchmarks.seed --scale medium --bookings 800000
+    python -m benchmarks.seed --database-url postgresql+asyncpg://... --scale large
+
+Every generated user can log in as user_<n> with SEED_PASSWORD.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone
+
+SEED_PASSWORD = "kickora-seed"
+
+DEFAULT_DATABASE_URL = "sqlite+aiosqlite:///./kickora_scale.db"
+
+SCALES = {
+    "tiny": {"users": 500, "matches": 200, "bookings": 2000,
+             "testimonials": 500, "gallery": 300},
+    "small": {"users": 10000, "matches": 1000, "bookings": 50000,
+              "testimonials": 5000, "gallery": 1000},
+    "medium": {"users": 100000, "matches": 10000, "bookings": 500000,
+               "testimonials": 50000, "gallery": 5000},
+    "large": {"users": 300000, "matches": 30000, "bookings": 2000000,
+              "testimonials": 200000, "gallery": 20000},
+}
+
+# Share of bookings that get cancelled / get a payment row
+CANCEL_RATE = 0.08
+PAYMENT_RATE = 0.95
+
+VENUES = [
+    "Kickora Arena, Andheri", "Goal Park, Bandra", "Striker Turf, Powai",
+    "Corner Spot, Thane", "Green Field, Navi Mumbai", "Kick Ground, Malad",
+    "Urban Turf, Lower Parel", "Sports Hub, Borivali",
+]
+GALLERY_CATEGORIES = ["match", "turf", "equipment", "training", "facilities"]
+PAYMENT_METHODS = ["upi", "card", "netbanking"]
+REVIEW_SNIPPETS = [
+    "Great game, well organised!", "Turf was in excellent condition.",
+    "Friendly players and fair refereeing.", "Booking was quick and easy.",
+    "Started a bit late but still fun.", "Would love more evening slots.",
+    "Best five-a-side in the city.", "Floodlights could be brighter.",
+]
+KICKOFF_TIMES = ["06:00", "07:00", "17:00", "18:00", "19:00", "20:00", "21:00"]
+
+def username(index: int) -> str:
+    return f"user_{index}"
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a large synthetic Kickora dataset")
+    parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL,
+                        help=f"Target database (default {DEFAULT_DATABASE_URL})")
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    for table in ["users", "matches", "bookings", "testimonials", "gallery"]:
+        parser.add_argument(f"--{table}", type=int, help=f"Override the number of {table}")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--anchor-date", type=date.fromisoformat, default=date.today(),
+                        help="Date treated as 'now' when placing past and upcoming matches (YYYY-MM-DD)")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--keep", action="store_true",
+                        help="Append to existing tables instead of recreating them")
+    return parser.parse_args(argv)
+
+class BatchWriter:
+    """Buffers rows per table and flushes them as multi-row INSERTs.
+
+    Tables are flushed in dependency order, so a child batch never reaches a
+    database that enforces foreign keys before its parents.
+    """
+
+    def __init__(self, engine, tables, batch_size: int):
+        self.engine = engine
+        self.tables = tables
+        self.batch_size = batch_size
+        self.buffers = {name: [] for name in tables}
+        self.counts = {name: 0 for name in tables}
+
+    async def add(self, name: str, row: dict):
+        buffer = self.buffers[name]
+        buffer.append(row)
+        if len(buffer) >= self.batch_size:
+            await self.flush(upto=name)
+
+    async def flush(self, upto: str = None):
+        async with self.engine.begin() as conn:
+            for name, table in self.tables.items():
+                rows = self.buffers[name]
+                if rows:
+                    await conn.execute(table.insert(), rows)
+                    self.counts[name] += len(rows)
+                    self.buffers[name] = []
+                if name == upto:
+                    break
+
+class Generator:
+    def __init__(self, counts: dict, seed: int, anchor: date):
+        self.counts = counts
+        self.rng = random.Random(seed)
+        # All timestamps derive from the anchor, never from the wall clock
+        self.now = datetime(anchor.year, anchor.month, anchor.day, tzinfo=timezone.utc)
+
+    def uuid(self) -> str:
+        return str(uuid.UUID(int=self.rng.getrandbits(128), version=4))
+
+    def past(self, days: int) -> datetime:
+        return self.now - timedelta(seconds=self.rng.randrange(days * 86400))
+
+    def users(self, password_hash: str):
+        rng = self.rng
+        for i in range(self.counts["users"]):
+            birth_year = rng.randint(1975, 2008)
+            yield {
+                "id": self.uuid(),
+                "username": username(i),
+                "password_hash": password_hash,
+                "email": f"{username(i)}@example.com",
+                "phone_number": f"+91{rng.randrange(7000000000, 9999999999)}",
+                "full_name": f"Player {i}",
+                "age": self.now.year - birth_year,
+                "date_of_birth": f"{birth_year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                "profile_photo_url": None,
+                "is_admin": i == 0,
+                "is_active": rng.random() > 0.01,
+                "created_at": self.past(730),
+                "updated_at": None,
+            }
+
+    def matches_with_bookings(self, user_ids: list):
+        """Yields (match, bookings, payments) so capacity always matches bookings."""
+        rng = self.rng
+        matches = self.counts["matches"]
+        remaining = self.counts["bookings"]
+        for i in range(matches):
+            # Spread bookings around the per-match average, never beyond what is left
+            average = remaining / (matches - i)
+            booked = min(remaining, int(rng.uniform(0, 2 * average) + 0.5))
+            if i == matches - 1:
+                booked = remaining
+            booked = min(booked, len(user_ids))
+            remaining -= booked
+
+            # A year of history plus two months of upcoming fixtures
+            kickoff = self.now + timedelta(days=rng.randint(-365, 60))
+            # Nothing is created or booked after the anchor, even for upcoming fixtures
+            created_at = min(kickoff, self.now) - timedelta(days=rng.randint(7, 30))
+            price = float(rng.choice([199, 249, 299, 349, 399]))
+            cancelled = [rng.random() < CANCEL_RATE for _ in range(booked)]
+            active = booked - sum(cancelled)
+            max_players = max(22, active + rng.randint(0, 4))
+
+            match = {
+                "id": self.uuid(),
+                "date": kickoff.strftime("%Y-%m-%d"),
+                "time": rng.choice(KICKOFF_TIMES),
+                "location": rng.choice(VENUES),
+                "price": price,
+                "max_players": max_players,
+                "players_left": max_players - active,
+                "is_active": kickoff > self.now,
+                "created_at": created_at,
+                "updated_at": None,
+            }
+
+            bookings = []
+            payments = []
+            window = max(1, int((min(kickoff, self.now) - created_at).total_seconds()))
+            for user_id, is_cancelled in zip(rng.sample(user_ids, booked), cancelled):
+                booking_time = created_at + timedelta(seconds=rng.randrange(window))
+                booking = {
+                    "id": self.uuid(),
+                    "user_id": user_id,
+                    "match_id": match["id"],
+                    "booking_time": booking_time,
+                    "is_cancelled": is_cancelled,
+                    "cancelled_at": None,
+                    "refund_amount": None,
+                }
+                status = None
+                if is_cancelled:
+                    booking["cancelled_at"] = min(self.now, booking_time + timedelta(hours=rng.randint(1, 72)))
+                    refunded = booking["cancelled_at"] - booking_time <= timedelta(hours=24)
+                    booking["refund_amount"] = price if refunded else 0
+                    status = "refunded" if refunded else "completed"
+                bookings.append(booking)
+
+                if rng.random() < PAYMENT_RATE:
+                    if status is None:
+                        roll = rng.random()
+                        status = "completed" if roll < 0.9 else "pending" if roll < 0.95 else "failed"
+                    payments.append({
+                        "id": self.uuid(),
+                        "booking_id": booking["id"],
+                        "amount": price,
+                        "payment_method": rng.choice(PAYMENT_METHODS),
+                        "transaction_id": f"TXN_{rng.getrandbits(40):010X}" if status != "pending" else None,
+                        "status": status,
+                        "created_at": booking_time,
+                        "updated_at": booking_time + timedelta(minutes=rng.randint(1, 30)),
+                    })
+
+            yield match, bookings, payments
+
+    def testimonials(self, user_ids: list):
+        rng = self.rng
+        for i in range(self.counts["testimonials"]):
+            yield {
+                "id": self.uuid(),
+                "user_id": rng.choice(user_ids),
+                "text": " ".join(rng.sample(REVIEW_SNIPPETS, rng.randint(1, 3))),
+                "rating": rng.choices([1, 2, 3, 4, 5], weights=[2, 3, 10, 35, 50])[0],
+                "name": f"Player {i}",
+                "is_active": rng.random() > 0.02,
+                "created_at": self.past(365),
+                "updated_at": None,
+            }
+
+    def gallery(self):
+        rng = self.rng
+        for i in range(self.counts["gallery"]):
+            category = rng.choice(GALLERY_CATEGORIES)
+            yield {
+                "id": self.uuid(),
+                "title": f"{category.title()} photo {i}",
+                "description": f"{rng.choice(VENUES)} - {category}",
+                "image_url": f"https://cdn.kickora.in/gallery/{category}/{i}.jpg",
+                "category": category,
+                "is_active": rng.random() > 0.05,
+                "created_at": self.past(365),
+                "updated_at": None,
+            }
+
+async def configure_sqlite(engine):
+    # Bulk loads don't need crash safety; WAL also keeps the file readable meanwhile
+    async with engine.begin() as conn:
+        await conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+        await conn.exec_driver_sql("PRAGMA synchronous=OFF")
+
+async def generate(engine, counts: dict, seed: int = 42, anchor: date = None,
+                   batch_size: int = 5000, recreate: bool = True, log=None) -> dict:
+    """Populates the database behind `engine` and returns the row count per table."""
+    from models import Base, User, Match, Booking, Payment, Testimonial, Gallery
+    from auth import get_password_hash
+
+    log = log or (lambda message: None)
+    if recreate:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+    if engine.dialect.name == "sqlite":
+        await configure_sqlite(engine)
+
+    writer = BatchWriter(engine, {
+        "users": User.__table__,
+        "matches": Match.__table__,
+        "bookings": Booking.__table__,
+        "payments": Payment.__table__,
+        "testimonials": Testimonial.__table__,
+        "gallery": Gallery.__table__,
+    }, batch_size)
+    generator = Generator(counts, seed, anchor or date.today())
+
+    # bcrypt is deliberately slow, so every generated user shares one hash
+    password_hash = get_password_hash(SEED_PASSWORD)
+    started = time.perf_counter()
+
+    user_ids = []
+    for row in generator.users(password_hash):
+        user_ids.append(row["id"])
+        await writer.add("users", row)
+    await writer.flush()
+    log(f"users: {writer.counts['users']} ({time.perf_counter() - started:.1f}s)")
+
+    for match, bookings, payments in generator.matches_with_bookings(user_ids):
+        await writer.add("matches", match)
+        for booking in bookings:
+            await writer.add("bookings", booking)
+        for payment in payments:
+            await writer.add("payments", payment)
+    await writer.flush()
+    log(f"matches: {writer.counts['matches']}, bookings: {writer.counts['bookings']}, "
+        f"payments: {writer.counts['payments']} ({time.perf_counter() - started:.1f}s)")
+
+    for row in generator.testimonials(user_ids):
+        await writer.add("testimonials", row)
+    for row in generator.gallery():
+        await writer.add("gallery", row)
+    await writer.flush()
+    log(f"testimonials: {writer.counts['testimonials']}, gallery: {writer.counts['gallery']} "
+        f"({time.perf_counter() - started:.1f}s)")
+
+    return dict(writer.counts)
+
+def resolve_counts(args) -> dict:
+    counts = dict(SCALES[args.scale])
+    for table in counts:
+        override = getattr(args, table, None)
+        if override is not None:
+            counts[table] = override
+    # Each user books a match at most once
+    counts["bookings"] = min(counts["bookings"], counts["users"] * counts["matches"])
+    return counts
+
+async def run(args):
+    from database import engine
+
+    counts = resolve_counts(args)
+    print(f"Generating {args.scale} dataset (seed {args.seed}): {counts}", file=sys.stderr)
+    try:
+        await generate(engine, counts, args.seed, args.anchor_date, args.batch_size,
+                       recreate=not args.keep, log=lambda m: print(m, file=sys.stderr))
+    finally:
+        await engine.dispose()
+
+def main(argv=None):
+    args = parse_args(argv)
+    # config.py reads the environment at import time, so configure it first
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ["DATABASE_ECHO"] = "false"
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""
+Micro-benchmark for list-response serialization.
+
+Compares the old list path (full ORM objects, per-row `from_orm`, then
+FastAPI re-validating and encoding through `response_model`) with the fast
+path in serialization.py on a single large page. Run from the backend
+directory:
+
+    python -m benchmarks.serialization                 # 10k-row pages
+    python -m benchmarks.serialization --rows 50000 --repeat 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark list-response serialization")
+    parser.add_argument("--rows", type=int, default=10000, help="Rows per page")
+    parser.add_argument("--repeat", type=int, default=10, help="Timed requests per variant")
+    return parser.parse_args(argv)
+
+def build_app():
+    from typing import List
+    from fastapi import FastAPI, Depends
+    from sqlalchemy import select
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from database import get_db
+    from models import Match
+    from schemas import MatchResponse
+    from serialization import select_for, list_response
+
+    app = FastAPI()
+
+    @app.get("/legacy", response_model=List[MatchResponse])
+    async def legacy(limit: int, db: AsyncSession = Depends(get_db)):
+        result = await db.execute(select(Match).limit(limit))
+        return [MatchResponse.from_orm(match) for match in result.scalars().all()]
+
+    @app.get("/fast", response_model=List[MatchResponse])
+    async def fast(limit: int, db: AsyncSession = Depends(get_db)):
+        result = await db.execute(select_for(MatchResponse, Match).limit(limit))
+        return list_response(MatchResponse, result)
+
+    return app
+
+async def seed(rows: int):
+    from database import engine
+    from benchmarks.seed import generate
+
+    await generate(engine, {"users": 1, "matches": rows, "bookings": 0,
+                            "testimonials": 0, "gallery": 0}, recreate=True)
+
+async def run(args):
+    import httpx
+
+    await seed(args.rows)
+    app = build_app()
+    report = {"rows": args.rows, "repeat": args.repeat, "results": {}}
+
+    async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+        bodies = {}
+        for variant in ["legacy", "fast"]:
+            # Warm up caches (statement cache, TypeAdapter build) before timing
+            response = await client.get(f"/{variant}", params={"limit": args.rows})
+            bodies[variant] = response.json()
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                response = await client.get(f"/{variant}", params={"limit": args.rows})
+                timings.append(time.perf_counter() - started)
+            report["results"][variant] = {
+                "bytes": len(response.content),
+                "median_ms": round(statistics.median(timings) * 1000, 2),
+                "min_ms": round(min(timings) * 1000, 2),
+                "rows_per_s": round(args.rows / statistics.median(timings)),
+            }
+
+    report["identical_payload"] = bodies["legacy"] == bodies["fast"]
+    report["speedup"] = round(
+        report["results"]["legacy"]["median_ms"] / report["results"]["fast"]["median_ms"], 2
+    )
+    return report
+
+def main(argv=None):
+    args = parse_args(argv)
+    tmpdir = tempfile.TemporaryDirectory()
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{tmpdir.name}/serialization.db"
+    os.environ["DATABASE_ECHO"] = "false"
+    try:
+        print(json.dumps(asyncio.run(run(args)), indent=2))
+    finally:
+        tmpdir.cleanup()
+
+if __name__ == "__main__":
+    sys.exit(main())
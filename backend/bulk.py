@@ -0,0 +1,193 @@
+from typing import Dict, List, Optional
+from fastapi import HTTPException, status
+from sqlalchemy import select, update, delete, func, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import User, Testimonial, Match, Gallery, Booking, Payment
+from schemas import BulkFilter
+
+# Every statement here is a single set-based UPDATE/DELETE whose target set
+# is expressed as a subquery, so the number of rows touched never changes
+# the number of round trips. The session holds no affected objects, so
+# synchronize_session is turned off.
+SET_BASED = {"synchronize_session": False}
+
+def _common_filters(model, created_column) -> dict:
+    filters = {
+        "created_before": lambda value: created_column < value,
+        "created_after": lambda value: created_column >= value,
+    }
+    if hasattr(model, "is_active"):
+        filters["is_active"] = lambda value: model.is_active == value
+    return filters
+
+FILTERS = {
+    "users": {
+        **_common_filters(User, User.created_at),
+        "username_contains": lambda value: User.username.contains(value, autoescape=True),
+        "email_domain": lambda value: User.email.endswith(f"@{value}", autoescape=True),
+    },
+    "testimonials": {
+        **_common_filters(Testimonial, Testimonial.created_at),
+        "user_id": lambda value: Testimonial.user_id == value,
+        "max_rating": lambda value: Testimonial.rating <= value,
+    },
+    "matches": {
+        **_common_filters(Match, Match.created_at),
+        "location": lambda value: Match.location == value,
+        "date_before": lambda value: Match.date < value,
+        "date_after": lambda value: Match.date >= value,
+    },
+    "gallery": {
+        **_common_filters(Gallery, Gallery.created_at),
+        "category": lambda value: Gallery.category == value,
+    },
+    "bookings": {
+        **_common_filters(Booking, Booking.booking_time),
+        "user_id": lambda value: Booking.user_id == value,
+        "match_id": lambda value: Booking.match_id == value,
+        "is_cancelled": lambda value: Booking.is_cancelled == value,
+    },
+    "payments": {
+        **_common_filters(Payment, Payment.created_at),
+        "status": lambda value: Payment.status == value,
+    },
+}
+
+MODELS = {
+    "users": User,
+    "testimonials": Testimonial,
+    "matches": Match,
+    "gallery": Gallery,
+    "bookings": Booking,
+    "payments": Payment,
+}
+
+# Bookings and payments have no is_active flag, so they can only be deleted
+ACTIONS = {
+    "users": ("deactivate", "restore", "delete"),
+    "testimonials": ("deactivate", "restore", "delete"),
+    "matches": ("deactivate", "restore", "delete"),
+    "gallery": ("deactivate", "restore", "delete"),
+    "bookings": ("delete",),
+    "payments": ("delete",),
+}
+
+def target_condition(resource: str, action: str, ids: Optional[List[str]], filter: Optional[BulkFilter]):
+    """Builds the WHERE clause selecting the rows a bulk request applies to."""
+    if resource not in MODELS:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown resource; expected one of: {', '.join(MODELS)}"
+        )
+    if action not in ACTIONS[resource]:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"action for {resource} must be one of: {', '.join(ACTIONS[resource])}"
+        )
+
+    model = MODELS[resource]
+    conditions = []
+    if ids is not None:
+        conditions.append(model.id.in_(ids))
+    for name, value in (filter.model_dump(exclude_none=True) if filter else {}).items():
+        if name not in FILTERS[resource]:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Filter '{name}' does not apply to {resource}"
+            )
+        conditions.append(FILTERS[resource][name](value))
+
+    # Never fall through to "every row in the table"
+    if not conditions:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide ids or at least one filter"
+        )
+    if model is User:
+        # Admin accounts are changed one at a time through the single-user endpoints
+        conditions.append(User.is_admin == False)
+    return and_(*conditions)
+
+async def _execute(db: AsyncSession, statement) -> int:
+    result = await db.execute(statement.execution_options(**SET_BASED))
+    return max(result.rowcount or 0, 0)
+
+async def _set_active(db: AsyncSession, model, condition, active: bool, **values) -> int:
+    values["is_active"] = active
+    if hasattr(model, "version"):
+        values["version"] = model.version + 1
+    return await _execute(db, update(model).where(condition).values(**values))
+
+async def _release_seats(db: AsyncSession, booking_condition):
+    """Gives the seats held by live bookings matching the condition back to their matches."""
+    live = and_(booking_condition, Booking.is_cancelled == False)
+    seats = (
+        select(func.count(Booking.id))
+        .where(live, Booking.match_id == Match.id)
+        .scalar_subquery()
+    )
+    await db.execute(
+        update(Match)
+        .where(Match.id.in_(select(Booking.match_id).where(live)))
+        .values(players_left=Match.players_left + seats, version=Match.version + 1)
+        .execution_options(**SET_BASED)
+    )
+
+async def _delete_bookings(db: AsyncSession, booking_condition, release_seats: bool = True) -> Dict[str, int]:
+    if release_seats:
+        await _release_seats(db, booking_condition)
+    affected = {
+        "payments": await _execute(db, delete(Payment).where(
+            Payment.booking_id.in_(select(Booking.id).where(booking_condition))
+        )),
+    }
+    affected["bookings"] = await _execute(db, delete(Booking).where(booking_condition))
+    return affected
+
+async def apply_bulk_action(db: AsyncSession, resource: str, action: str, condition) -> Dict[str, int]:
+    """
+    Runs a bulk action and the matching changes to dependent rows in the
+    caller's transaction; returns affected row counts per table.
+
+    Deactivating users hides their visible testimonials as well, and
+    restoring them shows just those again. Deleting users or matches deletes their bookings and payments
+    (and a user's testimonials); deleting bookings of users returns their
+    seats to the matches.
+    """
+    model = MODELS[resource]
+    target_ids = select(model.id).where(condition)
+    affected = {}
+
+    if action in ("deactivate", "restore"):
+        active = action == "restore"
+        if model is User:
+            # Deactivating hides and marks the visible ones; restoring shows
+            # only marked ones, so any an admin hid one by one stay hidden
+            eligible = Testimonial.hidden_with_user if active else Testimonial.is_active
+            affected["testimonials"] = await _set_active(
+                db, Testimonial, and_(Testimonial.user_id.in_(target_ids), eligible == True),
+                active, hidden_with_user=not active
+            )
+            affected[resource] = await _set_active(db, model, condition, active)
+        elif model is Testimonial:
+            # A decision about the testimonial itself outlasts its user's restore
+            affected[resource] = await _set_active(db, model, condition, active, hidden_with_user=False)
+        else:
+            affected[resource] = await _set_active(db, model, condition, active)
+        return affected
+
+    # Delete dependents first; target_ids still resolves because the
+    # target rows themselves go last
+    if model is User:
+        affected.update(await _delete_bookings(db, Booking.user_id.in_(target_ids)))
+        affected["testimonials"] = await _execute(
+            db, delete(Testimonial).where(Testimonial.user_id.in_(target_ids))
+        )
+    elif model is Match:
+        affected.update(await _delete_bookings(db, Booking.match_id.in_(target_ids), release_seats=False))
+    elif model is Booking:
+        affected.update(await _delete_bookings(db, condition))
+        return affected
+
+    affected[resource] = await _execute(db, delete(model).where(condition))
+    return affected
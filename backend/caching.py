@@ -0,0 +1,149 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional, Tuple
+from fastapi import Request, Response
+from sqlalchemy import event, select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from models import Match, Gallery, Testimonial, ResourceVersion
+from database import upsert
+from config import settings
+
+# Public resources whose list endpoints answer conditional requests.
+# Any write to one of these models bumps its version in the same transaction.
+TRACKED_RESOURCES = {
+    Match: "matches",
+    Gallery: "gallery",
+    Testimonial: "testimonials",
+}
+
+def _changed(session: Session) -> set:
+    return session.info.setdefault("changed_resources", set())
+
+def _resource_for(instance_or_class) -> Optional[str]:
+    cls = instance_or_class if isinstance(instance_or_class, type) else type(instance_or_class)
+    return TRACKED_RESOURCES.get(cls)
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed_changes(session, flush_context):
+    for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+        resource = _resource_for(instance)
+        if resource and (instance not in session.dirty or session.is_modified(instance)):
+            _changed(session).add(resource)
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_changes(orm_execute_state):
+    # insert(Model)/delete(Model)/update(Model) statements bypass the unit of work
+    if orm_execute_state.is_insert or orm_execute_state.is_delete or orm_execute_state.is_update:
+        mapper = orm_execute_state.bind_mapper
+        resource = _resource_for(mapper.class_) if mapper is not None else None
+        if resource:
+            _changed(orm_execute_state.session).add(resource)
+
+@event.listens_for(Session, "before_commit")
+def _bump_versions(session):
+    # Flush first so changes still pending in the unit of work are counted
+    session.flush()
+    changed = session.info.pop("changed_resources", None)
+    if not changed:
+        return
+
+    now = datetime.now(timezone.utc)
+    connection = session.connection()
+    for resource in sorted(changed):
+        # The first writes to a resource may come from several requests at once
+        connection.execute(
+            upsert(connection, ResourceVersion)
+            .values(name=resource, version=1, updated_at=now)
+            .on_conflict_do_update(
+                index_elements=[ResourceVersion.name],
+                set_={"version": ResourceVersion.version + 1, "updated_at": now}
+            )
+        )
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session):
+    session.info.pop("changed_resources", None)
+
+def _http_date(value: Optional[datetime]) -> Optional[str]:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        # SQLite hands back naive datetimes; they are stored as UTC
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+def _etag(resource: str, version: int, request: Request) -> str:
+    # The query string selects a different representation (page, filters)
+    variant = hashlib.sha1(
+        str(sorted(request.query_params.multi_items())).encode()
+    ).hexdigest()[:16]
+    return f'"{resource}-{version}-{variant}"'
+
+def _matches_etag(if_none_match: str, etag: str) -> bool:
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # If-None-Match uses weak comparison
+    return "*" in candidates or etag in [tag[2:] if tag.startswith("W/") else tag for tag in candidates]
+
+def _not_modified_since(if_modified_since: str, last_modified: Optional[str]) -> bool:
+    if last_modified is None:
+        return False
+    try:
+        return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+
+async def cache_headers(db: AsyncSession, resource: str, request: Request) -> dict:
+    result = await db.execute(
+        select(ResourceVersion.version, ResourceVersion.updated_at)
+        .where(ResourceVersion.name == resource)
+    )
+    row = result.one_or_none()
+    if row:
+        version, updated_at = row
+    else:
+        # Nothing has written the resource since versions were tracked (or
+        # the rows predate them); date it by its newest row instead
+        model = next(model for model, name in TRACKED_RESOURCES.items() if name == resource)
+        result = await db.execute(
+            select(func.max(func.coalesce(model.updated_at, model.created_at)))
+        )
+        version, updated_at = 0, result.scalar()
+
+    headers = {
+        "ETag": _etag(resource, version, request),
+        "Cache-Control": (
+            f"public, max-age={settings.public_cache_max_age}, "
+            f"stale-while-revalidate={settings.public_cache_stale_while_revalidate}"
+        ),
+    }
+    last_modified = _http_date(updated_at)
+    if last_modified:
+        headers["Last-Modified"] = last_modified
+    return headers
+
+async def conditional_get(
+    request: Request,
+    db: AsyncSession,
+    resource: str
+) -> Tuple[Optional[Response], dict]:
+    """
+    Returns (304 response or None, validator headers) for a public list read.
+    Costs one primary-key lookup, so a revalidation skips the main query and
+    serialization entirely; otherwise attach the headers to the full response.
+    """
+    headers = await cache_headers(db, resource, request)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        not_modified = _matches_etag(if_none_match, headers["ETag"])
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        not_modified = if_modified_since is not None and _not_modified_since(
+            if_modified_since, headers.get("Last-Modified")
+        )
+
+    if not_modified:
+        return Response(status_code=304, headers=headers), headers
+    return None, headers
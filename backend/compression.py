@@ -0,0 +1,255 @@
+import gzip
+import hashlib
+import re
+import zlib
+from collections import OrderedDict
+from typing import Optional
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from config import settings
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip alone still works
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "image/svg+xml",
+    "text/",
+)
+
+ENCODING_SUFFIX = re.compile(r'-(?:br|gzip)"')
+
+def no_compression(endpoint):
+    """Route decorator that opts a (typically streaming) endpoint out of compression."""
+    endpoint.skip_compression = True
+    return endpoint
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """Picks br over gzip among the codings the client accepts with q > 0."""
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        match = re.search(r"q=([0-9.]+)", params)
+        if match:
+            try:
+                quality = float(match.group(1))
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip()] = quality
+
+    wildcard = accepted.get("*", 0.0)
+    for coding in (["br"] if brotli else []) + ["gzip"]:
+        if accepted.get(coding, wildcard) > 0:
+            return coding
+    return None
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.compression_brotli_quality)
+    return gzip.compress(body, compresslevel=settings.compression_gzip_level, mtime=0)
+
+class StreamCompressor:
+    """Incremental compressor that flushes after every chunk, so streamed rows reach the client promptly."""
+
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self.compressor = brotli.Compressor(quality=settings.compression_brotli_quality)
+        else:
+            self.compressor = zlib.compressobj(settings.compression_gzip_level, zlib.DEFLATED, 31)
+        self.encoding = encoding
+
+    def feed(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self.compressor.process(data) + self.compressor.flush()
+        return self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self.compressor.finish()
+        return self.compressor.flush()
+
+class BodyCache:
+    """
+    LRU of bodies bounded by total size. Here it keeps compressed bodies, so
+    identical hot payloads are compressed once; media_files.py keeps hot images.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries = OrderedDict()
+
+    def get(self, key) -> Optional[bytes]:
+        body = self.entries.get(key)
+        if body is not None:
+            self.entries.move_to_end(key)
+        return body
+
+    def put(self, key, body: bytes):
+        if len(body) > self.max_bytes or key in self.entries:
+            return
+        self.entries[key] = body
+        self.size += len(body)
+        while self.size > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= len(evicted)
+
+class CompressionMiddleware:
+    """
+    gzip/brotli response compression negotiated from Accept-Encoding.
+
+    Bodies under the size threshold, non-text content, responses that already
+    carry a Content-Encoding and endpoints marked with @no_compression pass
+    through untouched. Complete bodies are cached compressed, keyed by their
+    ETag or content hash. Streaming bodies are compressed chunk by chunk.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = None, cache_bytes: int = None):
+        self.app = app
+        self.minimum_size = settings.compression_minimum_size if minimum_size is None else minimum_size
+        self.cache = BodyCache(
+            settings.compression_cache_bytes if cache_bytes is None else cache_bytes
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        encoding = negotiate(headers.get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        # A 304 confirms the representation the client holds, so its ETag
+        # carries the same suffix the 200 did. Without an If-None-Match to
+        # tell, assume the compressed one
+        suffix_not_modified = True
+        if "if-none-match" in headers:
+            suffix_not_modified = f'-{encoding}"' in headers["if-none-match"]
+            # Compressed representations carry a suffixed ETag; compare the base one downstream
+            request_headers = MutableHeaders(scope=scope)
+            request_headers["if-none-match"] = ENCODING_SUFFIX.sub('"', headers["if-none-match"])
+
+        responder = CompressionResponder(self, scope, send, encoding, suffix_not_modified)
+        await self.app(scope, receive, responder.send)
+
+class CompressionResponder:
+    def __init__(
+        self,
+        middleware: CompressionMiddleware,
+        scope: Scope,
+        send: Send,
+        encoding: str,
+        suffix_not_modified: bool = True
+    ):
+        self.middleware = middleware
+        self.scope = scope
+        self.downstream = send
+        self.encoding = encoding
+        self.suffix_not_modified = suffix_not_modified
+        self.start_message = None
+        self.passthrough = False
+        self.stream = None
+
+    def should_compress(self, headers: Headers) -> bool:
+        endpoint = self.scope.get("endpoint")
+        if getattr(endpoint, "skip_compression", False):
+            return False
+        if self.scope["method"] == "HEAD" or "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "")
+        return content_type.startswith(COMPRESSIBLE_TYPES)
+
+    def compressed_headers(self, body_length: Optional[int]) -> list:
+        headers = MutableHeaders(raw=list(self.start_message["headers"]))
+        headers["content-encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        if body_length is None:
+            del headers["content-length"]
+        else:
+            headers["content-length"] = str(body_length)
+        self.suffix_etag(headers)
+        return headers.raw
+
+    def suffix_etag(self, headers: MutableHeaders):
+        etag = headers.get("etag")
+        if etag and etag.endswith('"'):
+            headers["etag"] = f'{etag[:-1]}-{self.encoding}"'
+
+    def not_modified_headers(self) -> list:
+        headers = MutableHeaders(raw=list(self.start_message["headers"]))
+        headers.add_vary_header("Accept-Encoding")
+        if self.suffix_not_modified:
+            self.suffix_etag(headers)
+        return headers.raw
+
+    async def send(self, message: Message):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            if message["status"] == 304:
+                self.passthrough = True
+                message["headers"] = self.not_modified_headers()
+                await self.downstream(message)
+                return
+            self.passthrough = not self.should_compress(Headers(raw=message["headers"]))
+            if self.passthrough:
+                await self.downstream(message)
+            return
+
+        if message["type"] != "http.response.body":
+            await self.downstream(message)
+            return
+
+        if self.passthrough:
+            await self.downstream(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.stream is None and not more_body:
+            await self.send_complete(body)
+            return
+
+        if self.stream is None:
+            self.stream = StreamCompressor(self.encoding)
+            self.start_message["headers"] = self.compressed_headers(None)
+            await self.downstream(self.start_message)
+
+        chunk = self.stream.feed(body) if body else b""
+        if not more_body:
+            chunk += self.stream.finish()
+        await self.downstream({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+    async def send_complete(self, body: bytes):
+        if len(body) < self.middleware.minimum_size:
+            headers = MutableHeaders(raw=list(self.start_message["headers"]))
+            headers.add_vary_header("Accept-Encoding")
+            self.start_message["headers"] = headers.raw
+            await self.downstream(self.start_message)
+            await self.downstream({"type": "http.response.body", "body": body})
+            return
+
+        # A strong ETag already identifies the body; otherwise hash it, which
+        # is still far cheaper than compressing it again
+        etag = Headers(raw=self.start_message["headers"]).get("etag")
+        if etag and not etag.startswith("W/"):
+            key = (self.encoding, self.scope["path"], etag)
+        else:
+            key = (self.encoding, hashlib.blake2b(body, digest_size=16).digest())
+
+        compressed = self.middleware.cache.get(key)
+        if compressed is None:
+            compressed = compress(body, self.encoding)
+            self.middleware.cache.put(key, compressed)
+
+        self.start_message["headers"] = self.compressed_headers(len(compressed))
+        await self.downstream(self.start_message)
+        await self.downstream({"type": "http.response.body", "body": compressed})
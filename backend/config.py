@@ -8,6 +8,7 @@ load_dotenv()
 class Settings(BaseSettings):
     # Database - Using SQLite for development
     database_url: str = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./kickora.db")
+    database_echo: bool = os.getenv("DATABASE_ECHO", "true").lower() == "true"
     
     # Security
     secret_key: str = os.getenv("SECRET_KEY", "your-secret-key-here-make-it-long-and-random")
@@ -22,6 +23,115 @@ class Settings(BaseSettings):
     # Admin
     admin_mode_password: str = os.getenv("ADMIN_MODE_PASSWORD", "your-super-secure-admin-mode-password")
     
+    # Server / workers
+    host: str = os.getenv("HOST", "0.0.0.0")
+    port: int = int(os.getenv("PORT", "8000"))
+    web_concurrency: int = int(os.getenv("WEB_CONCURRENCY", "0"))  # 0 = one worker per CPU
+    max_workers: int = int(os.getenv("MAX_WORKERS", "8"))
+    worker_max_requests: int = int(os.getenv("WORKER_MAX_REQUESTS", "10000"))
+    worker_max_requests_jitter: int = int(os.getenv("WORKER_MAX_REQUESTS_JITTER", "1000"))
+    graceful_timeout: int = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+    
+    # Connection pool budget shared by all workers
+    db_max_connections: int = int(os.getenv("DB_MAX_CONNECTIONS", "80"))
+    db_pool_size: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    
+    # HTTP caching for public list endpoints (seconds)
+    public_cache_max_age: int = int(os.getenv("PUBLIC_CACHE_MAX_AGE", "30"))
+    public_cache_stale_while_revalidate: int = int(os.getenv("PUBLIC_CACHE_STALE_WHILE_REVALIDATE", "60"))
+    
+    # Response compression
+    compression_minimum_size: int = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))
+    compression_gzip_level: int = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+    compression_brotli_quality: int = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "5"))
+    compression_cache_bytes: int = int(os.getenv("COMPRESSION_CACHE_BYTES", str(32 * 1024 * 1024)))
+    
+    # Background jobs (see scheduler.py). Cron schedules and match kickoff
+    # times are wall-clock times in this timezone
+    scheduler_enabled: bool = os.getenv("SCHEDULER_ENABLED", "true").lower() == "true"
+    scheduler_job_timeout: int = int(os.getenv("SCHEDULER_JOB_TIMEOUT", "600"))
+    timezone: str = os.getenv("TIMEZONE", "Asia/Kolkata")
+    
+    # Seconds between admin stats counter reconciliations
+    counter_reconcile_interval: int = int(os.getenv("COUNTER_RECONCILE_INTERVAL", "3600"))
+    
+    # Analytics rollups: incremental refresh interval (seconds) and a cron
+    # schedule for full rebuilds
+    analytics_refresh_interval: int = int(os.getenv("ANALYTICS_REFRESH_INTERVAL", "300"))
+    analytics_full_refresh_cron: str = os.getenv("ANALYTICS_FULL_REFRESH_CRON", "30 3 * * *")
+    
+    # Housekeeping: how often past matches are deactivated and stale pending
+    # payments expired (seconds), and how long a payment may stay pending
+    match_deactivate_interval: int = int(os.getenv("MATCH_DEACTIVATE_INTERVAL", "300"))
+    payment_expiry_interval: int = int(os.getenv("PAYMENT_EXPIRY_INTERVAL", "300"))
+    payment_pending_ttl_minutes: int = int(os.getenv("PAYMENT_PENDING_TTL_MINUTES", "30"))
+    
+    # Archival: matches dated more than N days ago (with settled payments)
+    # move to the archive tables, N matches per transaction, every interval seconds
+    archive_after_days: int = int(os.getenv("ARCHIVE_AFTER_DAYS", "180"))
+    archive_batch_size: int = int(os.getenv("ARCHIVE_BATCH_SIZE", "200"))
+    archive_interval: int = int(os.getenv("ARCHIVE_INTERVAL", "86400"))
+    
+    # Idempotency-Key support: how long responses are kept for replay (hours),
+    # how long an in-flight request holds its key before it is presumed dead,
+    # and how long a concurrent duplicate waits for it (seconds)
+    idempotency_ttl_hours: int = int(os.getenv("IDEMPOTENCY_TTL_HOURS", "24"))
+    idempotency_lock_timeout: int = int(os.getenv("IDEMPOTENCY_LOCK_TIMEOUT", "60"))
+    idempotency_wait_timeout: int = int(os.getenv("IDEMPOTENCY_WAIT_TIMEOUT", "15"))
+    
+    # Payment gateway (see gateway.py); empty URL = simulated gateway.
+    # Timeouts, bulkhead wait and backoff are seconds; the breaker opens after
+    # N consecutive failures and probes again after the reset time
+    gateway_url: str = os.getenv("GATEWAY_URL", "")
+    gateway_api_key: str = os.getenv("GATEWAY_API_KEY", "")
+    gateway_connect_timeout: float = float(os.getenv("GATEWAY_CONNECT_TIMEOUT", "2"))
+    gateway_timeout: float = float(os.getenv("GATEWAY_TIMEOUT", "10"))
+    gateway_max_connections: int = int(os.getenv("GATEWAY_MAX_CONNECTIONS", "20"))
+    gateway_max_concurrency: int = int(os.getenv("GATEWAY_MAX_CONCURRENCY", "20"))
+    gateway_bulkhead_wait: float = float(os.getenv("GATEWAY_BULKHEAD_WAIT", "1"))
+    gateway_retries: int = int(os.getenv("GATEWAY_RETRIES", "2"))
+    gateway_backoff: float = float(os.getenv("GATEWAY_BACKOFF", "0.2"))
+    gateway_breaker_threshold: int = int(os.getenv("GATEWAY_BREAKER_THRESHOLD", "5"))
+    gateway_breaker_reset: float = float(os.getenv("GATEWAY_BREAKER_RESET", "30"))
+    
+    # Gateway webhooks: HMAC secret and accepted signature age (seconds);
+    # events are applied in batches of up to N, collected for at most the
+    # batch wait (seconds), and unapplied events are swept up every interval
+    gateway_webhook_secret: str = os.getenv("GATEWAY_WEBHOOK_SECRET", "")
+    gateway_webhook_tolerance: int = int(os.getenv("GATEWAY_WEBHOOK_TOLERANCE", "300"))
+    webhook_batch_size: int = int(os.getenv("WEBHOOK_BATCH_SIZE", "100"))
+    webhook_batch_wait: float = float(os.getenv("WEBHOOK_BATCH_WAIT", "0.05"))
+    webhook_sweep_interval: int = int(os.getenv("WEBHOOK_SWEEP_INTERVAL", "60"))
+    
+    # Refunds: settled every interval (seconds), N per batch with at most M
+    # gateway calls at once; failed attempts back off from the retry delay
+    # (seconds, doubling) until max attempts
+    refund_interval: int = int(os.getenv("REFUND_INTERVAL", "30"))
+    refund_batch_size: int = int(os.getenv("REFUND_BATCH_SIZE", "50"))
+    refund_concurrency: int = int(os.getenv("REFUND_CONCURRENCY", "5"))
+    refund_retry_delay: int = int(os.getenv("REFUND_RETRY_DELAY", "60"))
+    refund_max_attempts: int = int(os.getenv("REFUND_MAX_ATTEMPTS", "8"))
+    
+    # Media: uploaded images live under MEDIA_ROOT, addressed by content
+    # hash, and are served from MEDIA_URL with up to MEDIA_CACHE_BYTES of
+    # hot files kept in memory. Resized variants are rendered by a pool of
+    # MEDIA_WORKERS processes (0 = one per CPU). Gallery items from before
+    # placeholders were computed at upload are backfilled N per batch, every
+    # interval (seconds)
+    media_root: str = os.getenv("MEDIA_ROOT", "./media")
+    media_url: str = os.getenv("MEDIA_URL", "/media")
+    media_max_upload_mb: int = int(os.getenv("MEDIA_MAX_UPLOAD_MB", "20"))
+    media_workers: int = int(os.getenv("MEDIA_WORKERS", "2"))
+    media_cache_bytes: int = int(os.getenv("MEDIA_CACHE_BYTES", str(64 * 1024 * 1024)))
+    gallery_backfill_interval: int = int(os.getenv("GALLERY_BACKFILL_INTERVAL", "3600"))
+    gallery_backfill_batch_size: int = int(os.getenv("GALLERY_BACKFILL_BATCH_SIZE", "50"))
+    
+    # Bulk import: rows validated and inserted per batch, password hashing
+    # threads (0 = one per CPU) and how many failed rows the report lists
+    import_chunk_size: int = int(os.getenv("IMPORT_CHUNK_SIZE", "500"))
+    import_hash_workers: int = int(os.getenv("IMPORT_HASH_WORKERS", "0"))
+    import_max_reported_errors: int = int(os.getenv("IMPORT_MAX_REPORTED_ERRORS", "1000"))
+    
     # CORS
     allowed_origins: List[str] = ["http://localhost:3000", "http://localhost:3001"]
     
@@ -0,0 +1,128 @@
+from collections import Counter
+from datetime import datetime, timezone
+from sqlalchemy import event, select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from database import AsyncSessionLocal, upsert
+from models import User, Testimonial, Match, Gallery, Booking, Payment, TableCounter
+
+# Tables whose row counts back the admin stats page
+COUNTED_MODELS = {
+    User: "users",
+    Testimonial: "testimonials",
+    Match: "matches",
+    Gallery: "gallery",
+    Booking: "bookings",
+    Payment: "payments",
+}
+
+def _deltas(session: Session) -> Counter:
+    return session.info.setdefault("counter_deltas", Counter())
+
+def _dirty(session: Session) -> set:
+    return session.info.setdefault("counter_dirty", set())
+
+@event.listens_for(Session, "after_flush")
+def _count_flushed_rows(session, flush_context):
+    for instance in session.new:
+        name = COUNTED_MODELS.get(type(instance))
+        if name:
+            _deltas(session)[name] += 1
+    for instance in session.deleted:
+        name = COUNTED_MODELS.get(type(instance))
+        if name:
+            _deltas(session)[name] -= 1
+
+@event.listens_for(Session, "do_orm_execute")
+def _count_bulk_writes(orm_execute_state):
+    # insert(Model)/delete(Model) statements bypass the unit of work; run them here to learn the row count
+    if not (orm_execute_state.is_insert or orm_execute_state.is_delete):
+        return None
+    mapper = orm_execute_state.bind_mapper
+    name = COUNTED_MODELS.get(mapper.class_) if mapper is not None else None
+    if name is None:
+        return None
+
+    result = orm_execute_state.invoke_statement()
+    parameters = orm_execute_state.parameters
+    if orm_execute_state.is_insert and isinstance(parameters, list):
+        # executemany rowcounts vary by driver; one row per parameter set is exact
+        rows = len(parameters)
+    else:
+        # Covers multi-row VALUES and INSERT ... SELECT; -1 where the driver
+        # doesn't report it
+        rows = getattr(result, "rowcount", -1)
+    if rows < 0:
+        # Rather than guess, leave the counter to the next reconcile
+        _dirty(orm_execute_state.session).add(name)
+    else:
+        _deltas(orm_execute_state.session)[name] += rows if orm_execute_state.is_insert else -rows
+    return result
+
+@event.listens_for(Session, "before_commit")
+def _apply_deltas(session):
+    # Flush first so inserts still pending in the unit of work are counted
+    session.flush()
+    deltas = session.info.pop("counter_deltas", None) or Counter()
+    dirty = session.info.pop("counter_dirty", None) or set()
+    if not deltas and not dirty:
+        return
+
+    connection = session.connection()
+    models = {name: model for model, name in COUNTED_MODELS.items()}
+    for name in sorted(set(deltas) | dirty):
+        delta = deltas[name]
+        if delta or name in dirty:
+            # A counter that doesn't exist yet starts from COUNT(*), which
+            # already includes this transaction's rows; the upsert lets
+            # workers create it concurrently
+            count_query = select(func.count()).select_from(models[name]).scalar_subquery()
+            changes = {"count": TableCounter.count + delta}
+            if name in dirty:
+                changes["dirty"] = True
+            connection.execute(
+                upsert(connection, TableCounter)
+                .values(name=name, count=count_query)
+                .on_conflict_do_update(index_elements=[TableCounter.name], set_=changes)
+            )
+
+@event.listens_for(Session, "after_rollback")
+def _discard_deltas(session):
+    session.info.pop("counter_deltas", None)
+    session.info.pop("counter_dirty", None)
+
+async def get_table_counts(db: AsyncSession) -> dict:
+    result = await db.execute(
+        select(TableCounter.name, TableCounter.count).where(TableCounter.dirty == False)
+    )
+    counts = dict(result.all())
+
+    # Fall back to an aggregate for any counter that hasn't been created yet,
+    # or is dirty until the next reconcile
+    for model, name in COUNTED_MODELS.items():
+        if name not in counts:
+            result = await db.execute(select(func.count()).select_from(model))
+            counts[name] = result.scalar_one()
+    return counts
+
+async def reconcile_counters() -> dict:
+    """Recomputes every counter with COUNT(*), correcting drift from writes that bypass the ORM."""
+    now = datetime.now(timezone.utc)
+    counts = {}
+    async with AsyncSessionLocal() as db:
+        for model, name in COUNTED_MODELS.items():
+            count_query = select(func.count()).select_from(model).scalar_subquery()
+            # Upserted, as a write may create the row at the same time
+            await db.execute(
+                upsert(await db.connection(), TableCounter)
+                .values(name=name, count=count_query, dirty=False, reconciled_at=now)
+                .on_conflict_do_update(
+                    index_elements=[TableCounter.name],
+                    set_={"count": count_query, "dirty": False, "reconciled_at": now}
+                )
+            )
+            counts[name] = (await db.execute(
+                select(TableCounter.count).where(TableCounter.name == name)
+            )).scalar_one()
+        await db.commit()
+    return counts
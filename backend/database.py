@@ -1,13 +1,30 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.dialects import postgresql, sqlite
 from config import settings
 
+# Each worker process gets its own pool, so split the database's connection
+# budget across workers instead of letting N x pool_size exceed it
+def pool_options():
+    if settings.database_url.startswith("sqlite"):
+        return {}
+
+    workers = max(1, settings.web_concurrency)
+    budget = max(1, settings.db_max_connections // workers)
+    pool_size = min(settings.db_pool_size, budget)
+    return {
+        "pool_size": pool_size,
+        "max_overflow": budget - pool_size,
+        "pool_pre_ping": True
+    }
+
 # Create async engine
 engine = create_async_engine(
     settings.database_url,
-    echo=True,  # Set to False in production
-    future=True
+    echo=settings.database_echo,  # Set DATABASE_ECHO=false in production
+    future=True,
+    **pool_options()
 )
 
 # Create async session factory
@@ -20,10 +37,17 @@ AsyncSessionLocal = sessionmaker(
 # Create base class for models
 Base = declarative_base()
 
+# INSERT ... ON CONFLICT for whichever database the connection is on, for
+# rows several workers may try to create at once
+def upsert(connection, table):
+    if connection.dialect.name == "postgresql":
+        return postgresql.insert(table)
+    return sqlite.insert(table)
+
 # Dependency to get database session
 async def get_db():
     async with AsyncSessionLocal() as session:
         try:
             yield session
         finally:
-            await session.close() 
\ No newline at end of file
+            await session.close()
\ No newline at end of file
@@ -0,0 +1,72 @@
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime, timedelta
+from typing import AsyncIterator, List, Optional
+from fastapi import HTTPException, status
+from database import AsyncSessionLocal
+
+# Rows fetched per round trip from the server-side cursor; memory use stays
+# bounded by one batch no matter how many rows the export has
+EXPORT_BATCH_SIZE = 2000
+
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+}
+
+def parse_date_range(start: Optional[str], end: Optional[str]):
+    """Turns inclusive YYYY-MM-DD bounds into a [start, end) datetime range."""
+    try:
+        start_at = datetime.combine(date.fromisoformat(start), datetime.min.time()) if start else None
+        end_at = datetime.combine(date.fromisoformat(end) + timedelta(days=1), datetime.min.time()) if end else None
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start and end must be dates in YYYY-MM-DD format"
+        )
+    return start_at, end_at
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+def _encode_csv(columns: List[str], rows, header: bool) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(columns)
+    for row in rows:
+        writer.writerow(["" if value is None else value.isoformat() if isinstance(value, datetime) else value
+                         for value in row])
+    return buffer.getvalue().encode()
+
+def _encode_ndjson(columns: List[str], rows) -> bytes:
+    return "".join(
+        json.dumps(dict(zip(columns, row)), default=_json_default, separators=(",", ":")) + "\n"
+        for row in rows
+    ).encode()
+
+async def stream_export(query, columns: List[str], fmt: str, compress: bool) -> AsyncIterator[bytes]:
+    gzip_stream = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    def emit(data: bytes) -> bytes:
+        return gzip_stream.compress(data) if gzip_stream else data
+
+    # The export outlives the request's dependencies, so it owns its session
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        if fmt == "csv":
+            yield emit(_encode_csv(columns, [], header=True))
+        async for partition in result.partitions():
+            if fmt == "csv":
+                chunk = emit(_encode_csv(columns, partition, header=False))
+            else:
+                chunk = emit(_encode_ndjson(columns, partition))
+            if chunk:
+                yield chunk
+
+    if gzip_stream:
+        yield gzip_stream.flush()
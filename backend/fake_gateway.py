@@ -0,0 +1,176 @@
+"""
+Local stand-in for the payment gateway, for development and tests.
+
+    python fake_gateway.py            # listens on :8100
+    GATEWAY_URL=http://localhost:8100 uvicorn main:app
+
+Behaviour is tuned with environment variables (or at runtime through
+POST /_control, e.g. {"latency": 5} to simulate a slow gateway):
+
+    FAKE_GATEWAY_LATENCY       seconds added to every call
+    FAKE_GATEWAY_FAILURE_RATE  fraction of calls answered with a 503
+    FAKE_GATEWAY_DECLINE_CENTS charges whose amount ends in these cents are
+                               declined (default "13", so 499.13 declines)
+    FAKE_GATEWAY_WEBHOOK_URL   where to send signed charge.* webhooks, e.g.
+                               http://localhost:8000/api/v1/webhooks/gateway
+                               (signed with GATEWAY_WEBHOOK_SECRET)
+
+Charges and refunds honor the Idempotency-Key header like real gateways do.
+"""
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+from typing import Dict, List, Optional
+import httpx
+from fastapi import BackgroundTasks, FastAPI, Header, HTTPException
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from gateway import webhook_signature
+
+app = FastAPI(title="Fake payment gateway")
+
+state = {
+    "latency": float(os.getenv("FAKE_GATEWAY_LATENCY", "0")),
+    "failure_rate": float(os.getenv("FAKE_GATEWAY_FAILURE_RATE", "0")),
+    "decline_cents": os.getenv("FAKE_GATEWAY_DECLINE_CENTS", "13").split(","),
+    "webhook_url": os.getenv("FAKE_GATEWAY_WEBHOOK_URL", ""),
+    "webhook_secret": os.getenv("GATEWAY_WEBHOOK_SECRET", ""),
+    "calls": 0,
+    "in_flight": 0,
+    "max_in_flight": 0,
+}
+charges: Dict[str, dict] = {}
+refunds: Dict[str, dict] = {}
+replies: Dict[str, dict] = {}
+
+class ChargeRequest(BaseModel):
+    reference: str
+    amount: float
+    method: str
+
+class RefundRequest(BaseModel):
+    charge: str
+    amount: float
+
+class ControlRequest(BaseModel):
+    latency: Optional[float] = None
+    failure_rate: Optional[float] = None
+    webhook_url: Optional[str] = None
+    decline_cents: Optional[List[str]] = None
+    reset: bool = False
+
+async def _send_webhook(event_type: str, data: dict):
+    if not state["webhook_url"]:
+        return
+    body = json.dumps({"id": f"evt_{uuid.uuid4().hex[:16]}", "type": event_type, "data": data}).encode()
+    timestamp = int(time.time())
+    signature = webhook_signature(state["webhook_secret"], timestamp, body)
+    async with httpx.AsyncClient() as client:
+        await client.post(state["webhook_url"], content=body, headers={
+            "Content-Type": "application/json",
+            "Gateway-Signature": f"t={timestamp},v1={signature}",
+        })
+
+async def _simulate():
+    state["calls"] += 1
+    state["in_flight"] += 1
+    state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+    try:
+        if state["latency"]:
+            await asyncio.sleep(state["latency"])
+    finally:
+        state["in_flight"] -= 1
+    if random.random() < state["failure_rate"]:
+        raise HTTPException(status_code=503, detail="Gateway temporarily unavailable")
+
+@app.post("/v1/charges")
+async def create_charge(
+    data: ChargeRequest,
+    background_tasks: BackgroundTasks,
+    idempotency_key: Optional[str] = Header(None)
+):
+    await _simulate()
+    if idempotency_key in replies:
+        return replies[idempotency_key]
+    cents = f"{data.amount:.2f}".split(".")[1]
+    if cents in state["decline_cents"]:
+        background_tasks.add_task(_send_webhook, "charge.failed", {
+            "id": None, "reference": data.reference, "amount": data.amount, "status": "failed"
+        })
+        declined = JSONResponse({"error": "Card declined"}, status_code=402)
+        if idempotency_key:
+            replies[idempotency_key] = declined
+        return declined
+    charge = {
+        "id": f"ch_{uuid.uuid4().hex[:12]}",
+        "reference": data.reference,
+        "amount": data.amount,
+        "method": data.method,
+        "status": "completed",
+    }
+    charges[charge["id"]] = charge
+    if idempotency_key:
+        replies[idempotency_key] = charge
+    background_tasks.add_task(_send_webhook, "charge.succeeded", dict(charge))
+    return charge
+
+@app.get("/v1/charges/{charge_id}")
+async def get_charge(charge_id: str):
+    await _simulate()
+    if charge_id not in charges:
+        raise HTTPException(status_code=404, detail="No such charge")
+    return charges[charge_id]
+
+@app.post("/v1/refunds")
+async def create_refund(
+    data: RefundRequest,
+    background_tasks: BackgroundTasks,
+    idempotency_key: Optional[str] = Header(None)
+):
+    await _simulate()
+    if idempotency_key in replies:
+        return replies[idempotency_key]
+    charge = charges.get(data.charge)
+    if charge is None:
+        raise HTTPException(status_code=404, detail="No such charge")
+    if data.amount > charge["amount"]:
+        rejected = JSONResponse({"error": "Refund exceeds charge amount"}, status_code=422)
+        if idempotency_key:
+            replies[idempotency_key] = rejected
+        return rejected
+    refund = {
+        "id": f"re_{uuid.uuid4().hex[:12]}",
+        "charge": data.charge,
+        "amount": data.amount,
+        "status": "refunded",
+    }
+    charge["status"] = "refunded"
+    refunds[refund["id"]] = refund
+    if idempotency_key:
+        replies[idempotency_key] = refund
+    background_tasks.add_task(_send_webhook, "charge.refunded", {**charge, "amount_refunded": data.amount})
+    return refund
+
+@app.post("/_control")
+async def control(data: ControlRequest):
+    if data.reset:
+        charges.clear()
+        refunds.clear()
+        replies.clear()
+        state.update(calls=0, max_in_flight=0)
+    if data.latency is not None:
+        state["latency"] = data.latency
+    if data.failure_rate is not None:
+        state["failure_rate"] = data.failure_rate
+    if data.webhook_url is not None:
+        state["webhook_url"] = data.webhook_url
+    if data.decline_cents is not None:
+        state["decline_cents"] = data.decline_cents
+    return state
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="127.0.0.1", port=int(os.getenv("FAKE_GATEWAY_PORT", "8100")))
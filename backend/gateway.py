@@ -0,0 +1,238 @@
+import asyncio
+import hashlib
+import hmac
+import random
+import time
+import uuid
+from typing import Optional
+import httpx
+from config import settings
+
+class GatewayError(Exception):
+    """Base class for payment gateway failures."""
+
+class GatewayUnavailable(GatewayError):
+    """The gateway can't be reached right now (breaker open, bulkhead full, timeouts, 5xx); safe to retry later."""
+
+class GatewayDeclined(GatewayError):
+    """The gateway processed the request and refused it (e.g. card declined)."""
+
+# Statuses worth another attempt; the gateway's own idempotency keys make
+# retrying a POST whose response was lost safe
+RETRYABLE_STATUSES = {429, 502, 503, 504}
+
+def webhook_signature(secret: str, timestamp: int, body: bytes) -> str:
+    """HMAC-SHA256 over "<timestamp>.<body>", as sent in the Gateway-Signature header."""
+    return hmac.new(secret.encode(), f"{timestamp}.".encode() + body, hashlib.sha256).hexdigest()
+
+def _json_body(response: httpx.Response) -> Optional[dict]:
+    try:
+        data = response.json()
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+class GatewayResult:
+    def __init__(self, transaction_id: str, status: str):
+        self.transaction_id = transaction_id
+        self.status = status  # completed, pending, refunded
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures and fails calls fast for
+    `reset_timeout` seconds, then lets a single probe through (half-open);
+    the probe's outcome closes or re-opens it.
+    """
+
+    def __init__(self, threshold: int, reset_timeout: float):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self.probing:
+            self.probing = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.probing or self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+        self.probing = False
+
+    def abandon_probe(self):
+        # The probe was cancelled before it had an outcome; let the next call probe
+        self.probing = False
+
+class HttpGateway:
+    """
+    Adapter for an HTTP payment gateway.
+
+    One httpx.AsyncClient per worker process keeps a bounded pool of
+    keep-alive connections. Every call has connect/read timeouts, is retried
+    with exponential backoff and jitter on transport errors and 429/5xx, and
+    goes through a circuit breaker and a bulkhead (a cap on concurrent
+    gateway calls), so a slow or failing gateway costs callers a fast 503
+    instead of tying up workers.
+    """
+
+    def __init__(self, base_url: str, api_key: str, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.client = httpx.AsyncClient(
+            base_url=base_url,
+            headers={"Authorization": f"Bearer {api_key}"} if api_key else None,
+            timeout=httpx.Timeout(
+                settings.gateway_timeout,
+                connect=settings.gateway_connect_timeout,
+                pool=settings.gateway_bulkhead_wait
+            ),
+            limits=httpx.Limits(
+                max_connections=settings.gateway_max_connections,
+                max_keepalive_connections=settings.gateway_max_connections
+            ),
+            transport=transport
+        )
+        self.breaker = CircuitBreaker(settings.gateway_breaker_threshold, settings.gateway_breaker_reset)
+        self.bulkhead = asyncio.Semaphore(settings.gateway_max_concurrency)
+        self.in_flight = 0
+
+    async def close(self):
+        await self.client.aclose()
+
+    def stats(self) -> dict:
+        return {
+            "mode": "http",
+            "breaker": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "in_flight": self.in_flight,
+            "max_concurrency": settings.gateway_max_concurrency,
+        }
+
+    async def _request(self, method: str, path: str, idempotency_key: Optional[str] = None, **kwargs) -> dict:
+        try:
+            await asyncio.wait_for(self.bulkhead.acquire(), timeout=settings.gateway_bulkhead_wait)
+        except asyncio.TimeoutError:
+            raise GatewayUnavailable("Too many concurrent gateway calls")
+
+        self.in_flight += 1
+        try:
+            headers = {"Idempotency-Key": idempotency_key} if idempotency_key else {}
+            for attempt in range(settings.gateway_retries + 1):
+                if not self.breaker.allow():
+                    raise GatewayUnavailable("Payment gateway circuit is open")
+                probe = self.breaker.probing
+                try:
+                    response = await self.client.request(method, path, headers=headers, **kwargs)
+                except httpx.TransportError as exc:
+                    # Connect/read timeouts and connection failures
+                    self.breaker.record_failure()
+                    error = GatewayUnavailable(f"Gateway request failed: {exc.__class__.__name__}")
+                except BaseException:
+                    # Cancelled (client gone, caller's timeout): otherwise the
+                    # breaker would wait forever for this probe's outcome
+                    if probe:
+                        self.breaker.abandon_probe()
+                    raise
+                else:
+                    data = None
+                    if response.status_code < 500:
+                        data = _json_body(response)
+                    if response.status_code in RETRYABLE_STATUSES or response.status_code >= 500:
+                        self.breaker.record_failure()
+                        error = GatewayUnavailable(f"Gateway returned {response.status_code}")
+                    elif response.status_code < 400 and data is None:
+                        # Not the gateway's answer (a proxy's page, a truncated
+                        # body); the outcome is unknown, but retrying with the
+                        # same key replays the real one
+                        self.breaker.record_failure()
+                        error = GatewayUnavailable(f"Gateway returned an unreadable {response.status_code} response")
+                    else:
+                        # A 4xx is an answer, not an outage
+                        self.breaker.record_success()
+                        if response.status_code in (402, 422):
+                            raise GatewayDeclined((data or {}).get("error", "Payment declined"))
+                        if response.status_code >= 400:
+                            raise GatewayError(f"Gateway rejected the request with {response.status_code}")
+                        return data
+
+                if attempt < settings.gateway_retries:
+                    delay = settings.gateway_backoff * (2 ** attempt)
+                    await asyncio.sleep(delay + random.uniform(0, delay))
+            raise error
+        finally:
+            self.in_flight -= 1
+            self.bulkhead.release()
+
+    async def charge(self, payment_id: str, amount: float, method: str, attempt: int) -> GatewayResult:
+        # Gateways replay the stored answer, a decline included, for a key
+        # they have seen; so the key is per attempt (the payment's version
+        # when it was charged), not per payment, or a retry could never succeed
+        data = await self._request(
+            "POST", "/v1/charges",
+            idempotency_key=f"charge-{payment_id}-{attempt}",
+            json={"reference": payment_id, "amount": amount, "method": method}
+        )
+        return GatewayResult(data["id"], data["status"])
+
+    async def refund(self, refund_id: str, transaction_id: str, amount: float, attempt: int) -> GatewayResult:
+        # Automatic retries keep the key, since a refund whose response was
+        # lost may have gone through; an admin retry after a failure passes
+        # a new attempt, so it isn't answered with the stored failure
+        data = await self._request(
+            "POST", "/v1/refunds",
+            idempotency_key=f"refund-{refund_id}-{attempt}",
+            json={"charge": transaction_id, "amount": amount}
+        )
+        return GatewayResult(data["id"], data["status"])
+
+class SimulatedGateway:
+    """In-process stand-in used when no GATEWAY_URL is configured; every charge succeeds."""
+
+    async def close(self):
+        pass
+
+    def stats(self) -> dict:
+        return {"mode": "simulated"}
+
+    async def charge(self, payment_id: str, amount: float, method: str, attempt: int) -> GatewayResult:
+        return GatewayResult(f"TXN_{uuid.uuid4().hex[:8].upper()}", "completed")
+
+    async def refund(self, refund_id: str, transaction_id: str, amount: float, attempt: int) -> GatewayResult:
+        return GatewayResult(f"RFD_{uuid.uuid4().hex[:8].upper()}", "refunded")
+
+_gateway = None
+
+def get_gateway():
+    # Created on first use inside a worker: connection pools and semaphores
+    # must not be shared across gunicorn's forked processes
+    global _gateway
+    if _gateway is None:
+        if settings.gateway_url:
+            _gateway = HttpGateway(settings.gateway_url, settings.gateway_api_key)
+        else:
+            _gateway = SimulatedGateway()
+    return _gateway
+
+async def close_gateway():
+    global _gateway
+    if _gateway is not None:
+        await _gateway.close()
+        _gateway = None
@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+from sqlalchemy import update, and_, or_
+from database import AsyncSessionLocal
+from models import Match, Payment
+from payment_states import transition
+from config import settings
+
+async def deactivate_past_matches() -> int:
+    """Closes bookings for every active match whose kickoff has passed."""
+    # Match date and time are venue wall-clock strings ("2024-01-15", "18:00")
+    now = datetime.now(ZoneInfo(settings.timezone))
+    today, clock = now.date().isoformat(), now.strftime("%H:%M")
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            update(Match)
+            .where(
+                Match.is_active == True,
+                or_(Match.date < today, and_(Match.date == today, Match.time <= clock))
+            )
+            .values(is_active=False, version=Match.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+    return result.rowcount
+
+async def expire_pending_payments() -> int:
+    """
+    Marks payments left pending longer than PAYMENT_PENDING_TTL_MINUTES as
+    expired. The booking keeps its seat; /payment/{id}/process still charges
+    an expired payment, as it does a failed one.
+    """
+    cutoff = datetime.utcnow() - timedelta(minutes=settings.payment_pending_ttl_minutes)
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(transition("expired", Payment.created_at < cutoff))
+        await db.commit()
+    return result.rowcount
@@ -0,0 +1,279 @@
+import asyncio
+import hashlib
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from sqlalchemy import select, insert, update, delete
+from sqlalchemy.exc import IntegrityError
+from database import AsyncSessionLocal
+from models import IdempotencyKey
+from auth import verify_token
+from config import settings
+
+MAX_KEY_LENGTH = 255
+
+# Responses worth replaying. 5xx, auth failures and "try again later"
+# answers are dropped, so a retry runs the request again.
+UNSTORED_STATUSES = {401, 403, 408, 409, 429}
+
+def idempotent(endpoint):
+    """Route decorator: POSTs carrying an Idempotency-Key header run at most once per key."""
+    endpoint.idempotent = True
+    return endpoint
+
+def _sha256(*parts) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+def _is_idempotent_route(scope: Scope) -> bool:
+    app = scope.get("app")
+    for route in getattr(getattr(app, "router", None), "routes", []):
+        match, child_scope = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(child_scope.get("endpoint"), "idempotent", False)
+    return False
+
+def _principal(headers: Headers) -> Optional[str]:
+    # Keys are scoped per user; unauthenticated requests fail in the route anyway
+    scheme, _, token = headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    token_data = verify_token(token)
+    return token_data.username if token_data else None
+
+async def _read_body(receive: Receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            return b"".join(chunks)
+
+class IdempotencyMiddleware:
+    """
+    Honors Idempotency-Key on routes marked @idempotent.
+
+    The first request for a key claims a row in idempotency_keys, runs, and
+    stores its response; retries with the same key and body get that
+    response back (with Idempotent-Replayed: true) without running the route
+    again. A duplicate that arrives while the first is still running waits
+    for it, woken directly when both are in this worker and by polling the
+    row otherwise.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.inflight: Dict[str, asyncio.Event] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        idempotency_key = headers.get("idempotency-key")
+        if not idempotency_key or not _is_idempotent_route(scope):
+            await self.app(scope, receive, send)
+            return
+
+        principal = _principal(headers)
+        if principal is None:
+            await self.app(scope, receive, send)
+            return
+
+        if len(idempotency_key) > MAX_KEY_LENGTH:
+            response = JSONResponse(
+                {"detail": f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters"}, status_code=400
+            )
+            await response(scope, receive, send)
+            return
+
+        body = await _read_body(receive)
+        key = _sha256(principal, scope["method"], scope["path"], idempotency_key)
+        request_hash = _sha256(body)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.idempotency_wait_timeout
+        poll = 0.05
+        while True:
+            outcome, record = await self._claim(key, request_hash)
+            if outcome == "claimed":
+                break
+            if outcome == "mismatch":
+                response = JSONResponse(
+                    {"detail": "Idempotency-Key was already used with a different request"}, status_code=422
+                )
+                await response(scope, receive, send)
+                return
+            if outcome == "done":
+                await self._replay(record, send)
+                return
+            if outcome == "retry":
+                continue
+            if loop.time() >= deadline:
+                response = JSONResponse(
+                    {"detail": "A request with this Idempotency-Key is still in progress"}, status_code=409
+                )
+                await response(scope, receive, send)
+                return
+            await self._wait(key, min(poll, deadline - loop.time()))
+            poll = min(poll * 2, 0.5)
+
+        await self._execute(key, scope, body, receive, send)
+
+    async def _claim(self, key: str, request_hash: str) -> Tuple[str, Optional[IdempotencyKey]]:
+        now = datetime.utcnow()
+        async with AsyncSessionLocal() as db:
+            try:
+                await db.execute(insert(IdempotencyKey).values(
+                    key=key,
+                    request_hash=request_hash,
+                    status="in_progress",
+                    locked_until=now + timedelta(seconds=settings.idempotency_lock_timeout),
+                    expires_at=now + timedelta(hours=settings.idempotency_ttl_hours)
+                ))
+                await db.commit()
+                self.inflight[key] = asyncio.Event()
+                return "claimed", None
+            except IntegrityError:
+                await db.rollback()
+
+            # Compare timestamps in SQL; drivers disagree on naive vs aware datetimes
+            row = (await db.execute(
+                select(
+                    IdempotencyKey,
+                    (IdempotencyKey.expires_at < now).label("expired"),
+                    (IdempotencyKey.locked_until < now).label("stale"),
+                ).where(IdempotencyKey.key == key)
+            )).one_or_none()
+            if row is None:
+                return "retry", None
+            record, expired, stale = row
+
+            if expired:
+                await db.execute(
+                    delete(IdempotencyKey).where(IdempotencyKey.key == key, IdempotencyKey.expires_at < now)
+                )
+                await db.commit()
+                return "retry", None
+            if record.request_hash != request_hash:
+                return "mismatch", record
+            if record.status == "done":
+                return "done", record
+            if stale:
+                # The worker that claimed the key died mid-request; take over
+                result = await db.execute(
+                    update(IdempotencyKey)
+                    .where(
+                        IdempotencyKey.key == key,
+                        IdempotencyKey.status == "in_progress",
+                        IdempotencyKey.locked_until < now
+                    )
+                    .values(locked_until=now + timedelta(seconds=settings.idempotency_lock_timeout))
+                )
+                await db.commit()
+                if result.rowcount == 1:
+                    self.inflight[key] = asyncio.Event()
+                    return "claimed", None
+            return "in_progress", record
+
+    async def _wait(self, key: str, timeout: float):
+        event = self.inflight.get(key)
+        if event is None:
+            await asyncio.sleep(max(timeout, 0))
+            return
+        try:
+            await asyncio.wait_for(event.wait(), timeout=max(timeout, 0))
+        except asyncio.TimeoutError:
+            pass
+
+    async def _execute(self, key: str, scope: Scope, body: bytes, receive: Receive, send: Send):
+        body_sent = False
+
+        async def replay_receive() -> Message:
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        start_message = None
+        chunks = []
+
+        async def capture(message: Message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        stored = False
+        try:
+            await self.app(scope, replay_receive, capture)
+            response_body = b"".join(chunks)
+            # Store before answering, so a retry after a dropped connection finds it
+            stored = await self._store(key, start_message, response_body)
+            await send(start_message)
+            await send({"type": "http.response.body", "body": response_body})
+        finally:
+            if not stored:
+                await self._release(key)
+            event = self.inflight.pop(key, None)
+            if event:
+                event.set()
+
+    async def _store(self, key: str, start_message: Optional[Message], body: bytes) -> bool:
+        if start_message is None:
+            return False
+        status_code = start_message["status"]
+        if status_code >= 500 or status_code in UNSTORED_STATUSES:
+            return False
+        content_type = Headers(raw=start_message["headers"]).get("content-type")
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(IdempotencyKey)
+                .where(IdempotencyKey.key == key)
+                .values(
+                    status="done",
+                    response_status=status_code,
+                    response_content_type=content_type,
+                    response_body=body,
+                    locked_until=None
+                )
+            )
+            await db.commit()
+        return True
+
+    async def _release(self, key: str):
+        # Nothing worth replaying; let the next attempt run the request afresh
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                delete(IdempotencyKey).where(IdempotencyKey.key == key, IdempotencyKey.status == "in_progress")
+            )
+            await db.commit()
+
+    async def _replay(self, record: IdempotencyKey, send: Send):
+        headers = [
+            (b"content-length", str(len(record.response_body or b"")).encode()),
+            (b"idempotent-replayed", b"true"),
+        ]
+        if record.response_content_type:
+            headers.append((b"content-type", record.response_content_type.encode("latin-1")))
+        await send({"type": "http.response.start", "status": record.response_status, "headers": headers})
+        await send({"type": "http.response.body", "body": record.response_body or b""})
+
+async def purge_expired_keys() -> int:
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            delete(IdempotencyKey)
+            .where(IdempotencyKey.expires_at < datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+    return result.rowcount
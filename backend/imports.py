@@ -0,0 +1,253 @@
+import asyncio
+import codecs
+import csv
+import json
+import os
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, List, Optional, Tuple, Type
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import AsyncSessionLocal
+from models import User, Match
+from schemas import UserCreate, MatchCreate
+from auth import get_password_hash
+from config import settings
+
+FORMATS = {
+    "csv": ("text/csv",),
+    "ndjson": ("application/x-ndjson", "application/jsonl", "application/json"),
+}
+
+_hash_pool: Optional[ThreadPoolExecutor] = None
+
+def hash_pool() -> ThreadPoolExecutor:
+    # bcrypt releases the GIL while hashing, so threads hash in parallel.
+    # Created on first use, so gunicorn's preloaded master never starts threads before forking
+    global _hash_pool
+    if _hash_pool is None:
+        _hash_pool = ThreadPoolExecutor(
+            max_workers=settings.import_hash_workers or os.cpu_count() or 1,
+            thread_name_prefix="import-hash"
+        )
+    return _hash_pool
+
+async def hash_passwords(passwords: List[str]) -> List[str]:
+    loop = asyncio.get_running_loop()
+    return await asyncio.gather(*(
+        loop.run_in_executor(hash_pool(), get_password_hash, password) for password in passwords
+    ))
+
+def import_format(format: Optional[str], content_type: Optional[str]) -> Optional[str]:
+    """Resolves the upload format from ?format=, falling back to the Content-Type."""
+    if format:
+        return format if format in FORMATS else None
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    for name, media_types in FORMATS.items():
+        if media_type in media_types:
+            return name
+    return None
+
+class ImportReport:
+    def __init__(self):
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+
+    def fail(self, line: int, errors: List[str]):
+        self.failed += 1
+        if len(self.errors) < settings.import_max_reported_errors:
+            self.errors.append({"line": line, "errors": errors})
+
+    def as_dict(self) -> dict:
+        return {
+            "imported": self.imported,
+            "failed": self.failed,
+            "errors": sorted(self.errors, key=lambda error: error["line"]),
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+async def decode_lines(body: AsyncIterator[bytes], gzipped: bool) -> AsyncIterator[str]:
+    # Decode incrementally so multi-byte characters split across network
+    # chunks survive; utf-8-sig drops the BOM spreadsheet exports prepend
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    inflater = zlib.decompressobj(31) if gzipped else None
+    pending = ""
+    async for chunk in body:
+        if inflater:
+            chunk = inflater.decompress(chunk)
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+async def csv_records(lines: AsyncIterator[str]):
+    header = None
+    buffered, quotes, start, number = [], 0, 0, 0
+    async for line in lines:
+        number += 1
+        if not buffered:
+            start = number
+        buffered.append(line)
+        quotes += line.count('"')
+        if quotes % 2:
+            # Inside a quoted field that continues on the next line
+            continue
+
+        text = "\n".join(buffered)
+        buffered, quotes = [], 0
+        if not text.strip():
+            continue
+        try:
+            values = next(csv.reader([text]))
+        except csv.Error as exc:
+            yield start, None, f"invalid CSV: {exc}"
+            continue
+
+        if header is None:
+            header = [name.strip().lower() for name in values]
+            continue
+        if len(values) > len(header):
+            yield start, None, f"expected {len(header)} columns, got {len(values)}"
+            continue
+        # Empty cells fall back to the schema defaults
+        yield start, {name: value for name, value in zip(header, values) if value != ""}, None
+
+    if buffered:
+        yield start, None, "unterminated quoted field"
+
+async def ndjson_records(lines: AsyncIterator[str]):
+    number = 0
+    async for line in lines:
+        number += 1
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield number, None, f"invalid JSON: {exc.msg}"
+            continue
+        if not isinstance(record, dict):
+            yield number, None, "expected a JSON object"
+            continue
+        yield number, record, None
+
+async def _chunks(body: AsyncIterator[bytes], fmt: str, gzipped: bool, report: ImportReport):
+    """Groups parseable records into batches; unparseable ones go straight to the report."""
+    lines = decode_lines(body, gzipped)
+    records = csv_records(lines) if fmt == "csv" else ndjson_records(lines)
+    chunk = []
+    async for line, record, error in records:
+        if error:
+            report.fail(line, [error])
+            continue
+        chunk.append((line, record))
+        if len(chunk) >= settings.import_chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _validate(schema: Type[BaseModel], chunk, report: ImportReport) -> List[Tuple[int, BaseModel]]:
+    valid = []
+    for line, record in chunk:
+        try:
+            valid.append((line, schema(**record)))
+        except ValidationError as exc:
+            report.fail(line, [
+                f"{'.'.join(str(part) for part in error['loc']) or 'row'}: {error['msg']}"
+                for error in exc.errors()
+            ])
+    return valid
+
+async def _insert_rows(db: AsyncSession, model, rows: List[Tuple[int, dict]], report: ImportReport):
+    if not rows:
+        return
+    try:
+        await db.execute(insert(model), [values for _, values in rows])
+        await db.commit()
+        report.imported += len(rows)
+        return
+    except IntegrityError:
+        await db.rollback()
+
+    # Something in the batch collided with a concurrent write; retry row by
+    # row so only the offending rows are reported
+    for line, values in rows:
+        try:
+            await db.execute(insert(model), [values])
+            await db.commit()
+            report.imported += 1
+        except IntegrityError:
+            await db.rollback()
+            report.fail(line, ["conflicts with an existing record"])
+
+async def _new_users(
+    db: AsyncSession,
+    users: List[Tuple[int, UserCreate]],
+    seen_usernames: set,
+    seen_emails: set,
+    report: ImportReport
+) -> List[Tuple[int, UserCreate]]:
+    """Drops users whose username or email is taken, in the database or earlier in the upload."""
+    usernames = [user.username for _, user in users]
+    emails = [user.email for _, user in users if user.email]
+    taken_usernames = set((await db.execute(
+        select(User.username).where(User.username.in_(usernames))
+    )).scalars().all())
+    taken_emails = set((await db.execute(
+        select(User.email).where(User.email.in_(emails))
+    )).scalars().all()) if emails else set()
+
+    fresh = []
+    for line, user in users:
+        errors = []
+        if user.username in taken_usernames or user.username in seen_usernames:
+            errors.append("Username already registered")
+        if user.email and (user.email in taken_emails or user.email in seen_emails):
+            errors.append("Email already registered")
+        if errors:
+            report.fail(line, errors)
+            continue
+        seen_usernames.add(user.username)
+        if user.email:
+            seen_emails.add(user.email)
+        fresh.append((line, user))
+    return fresh
+
+async def import_users(body: AsyncIterator[bytes], fmt: str, gzipped: bool = False) -> dict:
+    """
+    Creates users from a CSV/NDJSON stream, one batch at a time: validate,
+    drop duplicates, hash the batch's passwords on the thread pool, then
+    insert the batch in a single statement. Bad rows are reported by line
+    and never abort the rest of the upload.
+    """
+    report = ImportReport()
+    seen_usernames, seen_emails = set(), set()
+    async with AsyncSessionLocal() as db:
+        async for chunk in _chunks(body, fmt, gzipped, report):
+            users = await _new_users(db, _validate(UserCreate, chunk, report), seen_usernames, seen_emails, report)
+            # End the read transaction so no connection is held while hashing
+            await db.rollback()
+
+            hashes = await hash_passwords([user.password for _, user in users])
+            rows = [
+                (line, {**user.model_dump(exclude={"password"}), "password_hash": password_hash})
+                for (line, user), password_hash in zip(users, hashes)
+            ]
+            await _insert_rows(db, User, rows, report)
+    return report.as_dict()
+
+async def import_matches(body: AsyncIterator[bytes], fmt: str, gzipped: bool = False) -> dict:
+    """Creates matches from a CSV/NDJSON stream in validated, batched inserts."""
+    report = ImportReport()
+    async with AsyncSessionLocal() as db:
+        async for chunk in _chunks(body, fmt, gzipped, report):
+            matches = _validate(MatchCreate, chunk, report)
+            await _insert_rows(db, Match, [(line, match.model_dump()) for line, match in matches], report)
+    return report.as_dict()
@@ -0,0 +1,99 @@
+import asyncio
+from typing import Any, Dict, List
+from fastapi import Depends
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_db
+from models import User, Match, Booking, Payment
+
+class Loader:
+    """
+    Looks up one model by one column for the duration of a request.
+
+    load() calls made in the same event-loop tick are collected and sent as
+    a single SELECT ... WHERE column IN (...), and every result (including
+    "not found") is memoized, so asking again costs nothing.
+    """
+
+    def __init__(self, loaders: "Loaders", model, column):
+        self.loaders = loaders
+        self.model = model
+        self.column = column
+        self.key = column.key
+        self.cache: Dict[Any, asyncio.Future] = {}
+        self.queue: List[Any] = []
+
+    def load(self, key) -> "asyncio.Future":
+        future = self.cache.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self.cache[key] = loop.create_future()
+            self.queue.append(key)
+            if len(self.queue) == 1:
+                # Dispatch once the current tick has queued everything it will
+                loop.call_soon(lambda: asyncio.ensure_future(self._dispatch()))
+        return future
+
+    async def load_many(self, keys) -> list:
+        return list(await asyncio.gather(*[self.load(key) for key in keys]))
+
+    def prime(self, key, value):
+        future = self.cache.get(key)
+        if future is None or (future.done() and future.result() is None):
+            future = self.cache[key] = asyncio.get_running_loop().create_future()
+        if not future.done():
+            future.set_result(value)
+
+    def clear(self, key):
+        self.cache.pop(key, None)
+
+    async def _dispatch(self):
+        keys, self.queue = self.queue, []
+        try:
+            # One query at a time on the request's session
+            async with self.loaders.lock:
+                rows = (await self.loaders.db.execute(
+                    select(self.model).where(self.column.in_(keys))
+                )).scalars().all()
+        except Exception as exc:
+            for key in keys:
+                future = self.cache.pop(key, None)
+                if future is not None and not future.done():
+                    future.set_exception(exc)
+            return
+
+        for row in rows:
+            self.loaders.prime(row)
+        for key in keys:
+            future = self.cache.get(key)
+            if future is not None and not future.done():
+                future.set_result(None)
+
+class Loaders:
+    """Request-scoped loaders for the entities route handlers look up by key."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.lock = asyncio.Lock()
+        self.users = Loader(self, User, User.id)
+        self.users_by_username = Loader(self, User, User.username)
+        self.matches = Loader(self, Match, Match.id)
+        self.bookings = Loader(self, Booking, Booking.id)
+        self.payments = Loader(self, Payment, Payment.id)
+        self.payments_by_booking = Loader(self, Payment, Payment.booking_id)
+
+    def _loaders(self) -> List[Loader]:
+        return [value for value in vars(self).values() if isinstance(value, Loader)]
+
+    def prime(self, instance):
+        """Makes an entity found (or created) elsewhere available to every loader of its type."""
+        for loader in self._loaders():
+            if isinstance(instance, loader.model):
+                key = getattr(instance, loader.key)
+                if key is not None:
+                    loader.prime(key, instance)
+
+async def get_loaders(db: AsyncSession = Depends(get_db)) -> Loaders:
+    # FastAPI resolves a dependency once per request, so every route and
+    # sub-dependency asking for it shares these loaders and the request's session
+    return Loaders(db)
@@ -1,22 +1,81 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from database import engine
-from models import Base
-from routers import auth, testimonials, gallery, matches, payment, admin
+from routers import auth, testimonials, gallery, matches, payment, admin, analytics, exports, imports, archive, jobs, webhooks, refunds, reconciliation
 from config import settings
+from compression import CompressionMiddleware
+from idempotency import IdempotencyMiddleware, purge_expired_keys
+from counters import reconcile_counters
+from analytics import refresh_rollups
+from archive import archive_matches
+from housekeeping import deactivate_past_matches, expire_pending_payments
+from scheduler import scheduler, Job
+from gateway import close_gateway
+from webhooks import processor as webhook_processor, apply_pending_events
+from refunds import settle_refunds
+from media import close_image_pool
+from media_files import MediaFiles
+from placeholders import backfill_gallery_placeholders
+from search import ensure_search_index
+from migrations import migrate
 
-# Create database tables
+# Create database tables and apply migrations (see alembic/versions)
 async def create_tables():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    await migrate()
+
+async def full_analytics_refresh():
+    await refresh_rollups(full=True)
+
+# Periodic jobs; each runs once per schedule across all workers
+scheduler.add(Job("reconcile-counters", reconcile_counters,
+                  interval=settings.counter_reconcile_interval, jitter=60))
+scheduler.add(Job("refresh-analytics", refresh_rollups,
+                  interval=settings.analytics_refresh_interval, jitter=15))
+scheduler.add(Job("rebuild-analytics", full_analytics_refresh,
+                  cron=settings.analytics_full_refresh_cron, jitter=60))
+scheduler.add(Job("archive-matches", archive_matches,
+                  interval=settings.archive_interval, jitter=300, timeout=3600))
+scheduler.add(Job("deactivate-past-matches", deactivate_past_matches,
+                  interval=settings.match_deactivate_interval, jitter=15))
+scheduler.add(Job("expire-pending-payments", expire_pending_payments,
+                  interval=settings.payment_expiry_interval, jitter=15))
+scheduler.add(Job("purge-idempotency-keys", purge_expired_keys,
+                  interval=3600, jitter=60))
+scheduler.add(Job("apply-webhook-events", apply_pending_events,
+                  interval=settings.webhook_sweep_interval, jitter=10))
+scheduler.add(Job("settle-refunds", settle_refunds,
+                  interval=settings.refund_interval, jitter=5))
+scheduler.add(Job("backfill-gallery-placeholders", backfill_gallery_placeholders,
+                  interval=settings.gallery_backfill_interval, jitter=60, timeout=3600))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await create_tables()
+    await ensure_search_index()
+    if settings.scheduler_enabled:
+        scheduler.start()
+    webhook_processor.start()
+    yield
+    # Runs after in-flight requests have drained
+    await scheduler.stop()
+    await webhook_processor.stop()
+    await close_gateway()
+    close_image_pool()
+    await engine.dispose()
 
 # Create FastAPI app
 app = FastAPI(
     title="Kickora Football Booking API",
     description="Backend API for Kickora football booking platform",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# Replay responses to retried POSTs that carry an Idempotency-Key; innermost,
+# so replays still get CORS headers and compression
+app.add_middleware(IdempotencyMiddleware)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -26,6 +85,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Add response compression (gzip/brotli)
+app.add_middleware(CompressionMiddleware)
+
 # Include routers
 app.include_router(auth.router, prefix="/api/v1")
 app.include_router(testimonials.router, prefix="/api/v1")
@@ -33,10 +95,17 @@ app.include_router(gallery.router, prefix="/api/v1")
 app.include_router(matches.router, prefix="/api/v1")
 app.include_router(payment.router, prefix="/api/v1")
 app.include_router(admin.router, prefix="/api/v1")
+app.include_router(analytics.router, prefix="/api/v1")
+app.include_router(exports.router, prefix="/api/v1")
+app.include_router(imports.router, prefix="/api/v1")
+app.include_router(archive.router, prefix="/api/v1")
+app.include_router(jobs.router, prefix="/api/v1")
+app.include_router(webhooks.router, prefix="/api/v1")
+app.include_router(refunds.router, prefix="/api/v1")
+app.include_router(reconciliation.router, prefix="/api/v1")
 
-@app.on_event("startup")
-async def startup_event():
-    await create_tables()
+# Uploaded gallery images and their variants (see media.py and media_files.py)
+app.mount(settings.media_url, MediaFiles(settings.media_root), name="media")
 
 @app.get("/")
 async def root():
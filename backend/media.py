@@ -0,0 +1,214 @@
+import asyncio
+import base64
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import BinaryIO, Optional, Union
+from PIL import Image, ImageOps, UnidentifiedImageError
+from starlette.concurrency import run_in_threadpool
+from config import settings
+
+# Widths rendered for every upload, largest first; never upscaled, and each
+# written as JPEG (for srcset) and WebP (for srcset_webp)
+VARIANTS = {"large": 1920, "medium": 960, "thumb": 320}
+FORMATS = {
+    "jpg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+}
+
+# Formats accepted from uploads; Pillow is never asked to parse anything
+# else (EPS through Ghostscript, PSD, TIFF, ...) from untrusted files
+ACCEPTED_FORMATS = ["JPEG", "PNG", "WEBP", "GIF"]
+
+# Longest side of the inline placeholder; a few hundred bytes as WebP
+PLACEHOLDER_SIZE = 16
+
+CHUNK_SIZE = 1024 * 1024
+
+# Written last, so its presence means every variant of the file is on disk
+MANIFEST = "variants.json"
+
+# EXIF tag; values 5-8 mean the stored pixels are rotated a quarter turn
+ORIENTATION = 0x0112
+
+class UploadTooLarge(ValueError):
+    pass
+
+class InvalidImage(ValueError):
+    pass
+
+class StoredImage:
+    def __init__(self, digest: str, manifest: dict):
+        self.digest = digest
+        self.width = manifest["width"]
+        self.height = manifest["height"]
+        self.placeholder = manifest["placeholder"]
+        self.variants = manifest["variants"]
+
+    def srcset(self, extension: str) -> str:
+        return ", ".join(
+            f"{media_url(self.digest, variant['name'] + '.' + extension)} {variant['width']}w"
+            for variant in self.variants
+        )
+
+    @property
+    def url(self) -> str:
+        # The largest JPEG, for clients that ignore srcset
+        return media_url(self.digest, self.variants[0]["name"] + ".jpg")
+
+def media_path(digest: str, name: str = "") -> str:
+    """Files are addressed by content hash: <root>/ab/abcdef.../<name>."""
+    return os.path.join(settings.media_root, digest[:2], digest, name)
+
+def media_url(digest: str, name: str) -> str:
+    return f"{settings.media_url}/{digest[:2]}/{digest}/{name}"
+
+def _write_atomic(path: str, write):
+    # Concurrent uploads of the same file write identical bytes; renaming a
+    # finished temp file into place means readers never see a partial one
+    fd, temp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as target:
+            write(target)
+        os.replace(temp, path)
+    except BaseException:
+        os.unlink(temp)
+        raise
+
+def _store(source: BinaryIO, limit: int) -> str:
+    """Copies an upload into media storage in chunks, hashing as it goes; returns the hash."""
+    os.makedirs(settings.media_root, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, temp = tempfile.mkstemp(dir=settings.media_root, prefix=".upload-")
+    try:
+        with os.fdopen(fd, "wb") as target:
+            while chunk := source.read(CHUNK_SIZE):
+                size += len(chunk)
+                if size > limit:
+                    raise UploadTooLarge(f"Upload exceeds {limit // (1024 * 1024)} MB")
+                digest.update(chunk)
+                target.write(chunk)
+        directory = media_path(digest.hexdigest())
+        os.makedirs(directory, exist_ok=True)
+        os.replace(temp, os.path.join(directory, "original"))
+    except BaseException:
+        if os.path.exists(temp):
+            os.unlink(temp)
+        raise
+    return digest.hexdigest()
+
+def read_manifest(digest: str) -> Optional[dict]:
+    try:
+        with open(media_path(digest, MANIFEST)) as manifest:
+            return json.load(manifest)
+    except FileNotFoundError:
+        return None
+
+def placeholder(image: Image.Image) -> str:
+    """A blurry micro-thumbnail as a data: URI, to show while the real image loads."""
+    tiny = image.copy()
+    tiny.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE), Image.BILINEAR)
+    buffer = io.BytesIO()
+    tiny.save(buffer, "WEBP", quality=40)
+    return "data:image/webp;base64," + base64.b64encode(buffer.getvalue()).decode()
+
+def describe_image(source: Union[str, bytes]) -> dict:
+    """
+    Process-pool worker: intrinsic width and height (after EXIF rotation)
+    and placeholder of an image file or its bytes. Large JPEGs are decoded
+    at a fraction of their size, which is all a placeholder needs.
+    """
+    try:
+        with Image.open(source if isinstance(source, str) else io.BytesIO(source), formats=ACCEPTED_FORMATS) as image:
+            width, height = image.size
+            if image.getexif().get(ORIENTATION) in (5, 6, 7, 8):
+                width, height = height, width
+            image.draft("RGB", (PLACEHOLDER_SIZE * 8, PLACEHOLDER_SIZE * 8))
+            image = ImageOps.exif_transpose(image).convert("RGBA" if "A" in image.getbands() else "RGB")
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as exc:
+        raise InvalidImage(str(exc))
+    return {"width": width, "height": height, "placeholder": placeholder(image)}
+
+def render_variants(directory: str) -> dict:
+    """
+    Process-pool worker: renders every variant of <directory>/original and
+    writes the manifest. Each size is resized from the previous (larger)
+    one, which is much cheaper than going back to the full-size original.
+    """
+    try:
+        with Image.open(os.path.join(directory, "original"), formats=ACCEPTED_FORMATS) as original:
+            image = ImageOps.exif_transpose(original)
+            image.load()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as exc:
+        raise InvalidImage(str(exc))
+
+    has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+    image = image.convert("RGBA" if has_alpha else "RGB")
+    width, height = image.size
+
+    variants = []
+    for name, target in VARIANTS.items():
+        size = min(target, width)
+        if variants and size >= variants[-1]["width"]:
+            continue
+        if size != image.width:
+            image = image.resize((size, max(1, round(height * size / width))), Image.LANCZOS)
+        # JPEG has no alpha channel; flatten transparent images onto white
+        opaque = image
+        if has_alpha:
+            opaque = Image.new("RGB", image.size, (255, 255, 255))
+            opaque.paste(image, mask=image.getchannel("A"))
+        for extension, (image_format, options) in FORMATS.items():
+            frame = opaque if image_format == "JPEG" else image
+            _write_atomic(
+                os.path.join(directory, f"{name}.{extension}"),
+                lambda target: frame.save(target, image_format, **options)
+            )
+        variants.append({"name": name, "width": image.width, "height": image.height})
+
+    manifest = {"width": width, "height": height, "placeholder": placeholder(image), "variants": variants}
+    _write_atomic(os.path.join(directory, MANIFEST), lambda target: target.write(json.dumps(manifest).encode()))
+    return manifest
+
+_image_pool: Optional[ProcessPoolExecutor] = None
+
+def image_pool() -> ProcessPoolExecutor:
+    # Resizing is CPU-bound, so it runs in worker processes rather than on the
+    # event loop. Created on first use (like imports.hash_pool); spawned, not
+    # forked, so workers never inherit the app's threads and connections
+    global _image_pool
+    if _image_pool is None:
+        _image_pool = ProcessPoolExecutor(
+            max_workers=settings.media_workers or os.cpu_count() or 1,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _image_pool
+
+def close_image_pool():
+    global _image_pool
+    if _image_pool is not None:
+        _image_pool.shutdown(wait=False, cancel_futures=True)
+        _image_pool = None
+
+async def ingest_image(source: BinaryIO) -> StoredImage:
+    """
+    Stores an uploaded image and its resized variants. A file uploaded
+    before (same content hash) is not stored or rendered again.
+    """
+    digest = await run_in_threadpool(_store, source, settings.media_max_upload_mb * 1024 * 1024)
+    manifest = await run_in_threadpool(read_manifest, digest)
+    # Manifests from before placeholders were computed are rendered again
+    if manifest is None or "placeholder" not in manifest:
+        loop = asyncio.get_running_loop()
+        try:
+            manifest = await loop.run_in_executor(image_pool(), render_variants, media_path(digest))
+        except InvalidImage:
+            await run_in_threadpool(shutil.rmtree, media_path(digest), True)
+            raise
+    return StoredImage(digest, manifest)
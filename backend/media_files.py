@@ -0,0 +1,207 @@
+import os
+import re
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional, Tuple
+import anyio
+from starlette.datastructures import Headers
+from starlette.types import Receive, Scope, Send
+from compression import BodyCache
+from config import settings
+
+# Only rendered variants are public: /<ab>/<abcdef...>/<name>.<ext>. The
+# original upload (which may carry EXIF location data) and the manifest
+# never match, and neither can anything outside the media root
+VARIANT_PATH = re.compile(r"^/([0-9a-f]{2})/(\1[0-9a-f]{62})/([a-z]+)\.(jpg|webp)$")
+
+CONTENT_TYPES = {"jpg": "image/jpeg", "webp": "image/webp"}
+
+# A file's name is its content hash, so a URL's bytes never change
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Files up to this size are read in one go (and kept in memory while hot);
+# larger ones are streamed in pieces this big
+CHUNK_SIZE = 1024 * 1024
+STAT_CACHE_SIZE = 10000
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+def byte_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    (first, last) byte of a single "bytes=" Range, or None to send the whole
+    file, which is allowed for anything else (multiple ranges, bad syntax).
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, dash, last = spec.strip().partition("-")
+    if not dash:
+        return None
+    try:
+        if first:
+            start = int(first)
+            if start >= size:
+                raise RangeNotSatisfiable
+            end = int(last) if last else size - 1
+            if end < start:
+                return None
+        else:
+            # Suffix range: the last N bytes
+            suffix = int(last)
+            if suffix == 0:
+                raise RangeNotSatisfiable
+            start, end = max(size - suffix, 0), size - 1
+    except ValueError:
+        return None
+    return start, min(end, size - 1)
+
+def _part(body: bytes, start: int, length: int) -> bytes:
+    return body if start == 0 and length == len(body) else body[start:start + length]
+
+def _read(path: str, offset: int, count: int) -> bytes:
+    with open(path, "rb") as file:
+        file.seek(offset)
+        return file.read(count)
+
+class MediaFiles:
+    """
+    ASGI app serving gallery image variants (see media.py) from disk.
+
+    Every answer comes from the URL and a stat of the file, with no
+    database access. Conditional requests (If-None-Match, If-Modified-Since)
+    get a 304 and a single Range gets a 206. Hot files are answered from
+    memory; otherwise the body goes out through the server's zero-copy
+    sendfile extension when it offers one, or is read off the event loop.
+    """
+
+    def __init__(self, directory: str, cache_bytes: int = None):
+        self.directory = directory
+        # Content-addressed files never change, so a stat or a cached body
+        # is good for as long as it is kept
+        self.stats: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+        self.bodies = BodyCache(settings.media_cache_bytes if cache_bytes is None else cache_bytes)
+
+    async def stat(self, path: str) -> Optional[Tuple[int, float]]:
+        cached = self.stats.get(path)
+        if cached is not None:
+            self.stats.move_to_end(path)
+            return cached
+        try:
+            result = await anyio.to_thread.run_sync(os.stat, path)
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        self.stats[path] = cached = (result.st_size, result.st_mtime)
+        if len(self.stats) > STAT_CACHE_SIZE:
+            self.stats.popitem(last=False)
+        return cached
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["method"] not in ("GET", "HEAD"):
+            await self.respond(send, 405, [(b"allow", b"GET, HEAD")])
+            return
+
+        match = VARIANT_PATH.match(scope["path"])
+        if match:
+            path = os.path.join(self.directory, match[1], match[2], f"{match[3]}.{match[4]}")
+            stat = await self.stat(path)
+        if not match or not stat:
+            await self.respond(send, 404)
+            return
+        size, mtime = stat
+
+        etag = f'"{match[2][:32]}-{match[3]}.{match[4]}"'
+        last_modified = formatdate(mtime, usegmt=True)
+        headers = [
+            (b"etag", etag.encode()),
+            (b"last-modified", last_modified.encode()),
+            (b"cache-control", CACHE_CONTROL.encode()),
+        ]
+
+        request_headers = Headers(scope=scope)
+        if self.not_modified(request_headers, etag, mtime):
+            await self.respond(send, 304, headers)
+            return
+
+        status, start, length = 200, 0, size
+        range_header = request_headers.get("range")
+        if_range = request_headers.get("if-range")
+        if range_header and (if_range is None or if_range in (etag, last_modified)):
+            try:
+                requested = byte_range(range_header, size)
+            except RangeNotSatisfiable:
+                await self.respond(send, 416, [(b"content-range", f"bytes */{size}".encode())])
+                return
+            if requested:
+                status, start, length = 206, requested[0], requested[1] - requested[0] + 1
+                headers.append((b"content-range", f"bytes {requested[0]}-{requested[1]}/{size}".encode()))
+
+        headers += [
+            (b"content-type", CONTENT_TYPES[match[4]].encode()),
+            (b"content-length", str(length).encode()),
+            (b"accept-ranges", b"bytes"),
+        ]
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        if scope["method"] == "HEAD" or not length:
+            await send({"type": "http.response.body", "body": b""})
+            return
+        try:
+            await self.send_file(scope, send, path, size, start, length)
+        except FileNotFoundError:
+            # Removed after the stat was cached; the response is already started
+            self.stats.pop(path, None)
+            raise
+
+    def not_modified(self, headers: Headers, etag: str, mtime: float) -> bool:
+        if_none_match = headers.get("if-none-match")
+        if if_none_match is not None:
+            # Weak comparison; If-Modified-Since is ignored when this is present
+            tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+            return "*" in tags or etag in tags
+        if_modified_since = headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    async def send_file(self, scope: Scope, send: Send, path: str, size: int, start: int, length: int):
+        body = self.bodies.get(path)
+        if body is not None:
+            await send({"type": "http.response.body", "body": _part(body, start, length)})
+            return
+
+        if "http.response.zerocopysend" in scope.get("extensions", {}):
+            file = await anyio.to_thread.run_sync(open, path, "rb")
+            try:
+                await send({"type": "http.response.zerocopysend", "file": file, "offset": start, "count": length})
+            finally:
+                file.close()
+            return
+
+        if size <= CHUNK_SIZE:
+            # Most variants: read the whole file in a single trip to a thread
+            # and keep it, whichever part of it was asked for
+            body = await anyio.to_thread.run_sync(_read, path, 0, size)
+            self.bodies.put(path, body)
+            await send({"type": "http.response.body", "body": _part(body, start, length)})
+            return
+
+        fd = await anyio.to_thread.run_sync(os.open, path, os.O_RDONLY)
+        try:
+            offset, end = start, start + length
+            while offset < end:
+                chunk = await anyio.to_thread.run_sync(os.pread, fd, min(CHUNK_SIZE, end - offset), offset)
+                if not chunk:
+                    # Shorter than its stat; end the response rather than hang
+                    await send({"type": "http.response.body", "body": b""})
+                    return
+                offset += len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": offset < end})
+        finally:
+            os.close(fd)
+
+    async def respond(self, send: Send, status: int, headers: Optional[list] = None):
+        await send({"type": "http.response.start", "status": status, "headers": headers or []})
+        await send({"type": "http.response.body", "body": b""})
@@ -0,0 +1,65 @@
+import os
+from alembic import command, op
+from alembic.config import Config
+from sqlalchemy import Column, inspect
+from database import engine
+from models import Base
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Arbitrary key for the Postgres advisory lock held while migrating
+MIGRATION_LOCK = 7351024
+
+def alembic_config() -> Config:
+    # Built without alembic.ini, whose logging setup would replace the app's
+    config = Config()
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "alembic"))
+    return config
+
+def add_missing_columns(table: str, *columns: Column) -> list:
+    """
+    For revisions: adds the columns a table lacks and returns their names.
+    Tables that don't exist yet are skipped, since create_all builds them
+    with every column, so revisions also apply cleanly to new databases.
+    """
+    inspector = inspect(op.get_bind())
+    if not inspector.has_table(table):
+        return []
+    existing = {column["name"] for column in inspector.get_columns(table)}
+    added = []
+    for column in columns:
+        if column.name not in existing:
+            op.add_column(table, column)
+            added.append(column.name)
+    return added
+
+def drop_existing_columns(table: str, *names: str):
+    """For downgrades: drops whichever of the columns the table has."""
+    inspector = inspect(op.get_bind())
+    if not inspector.has_table(table):
+        return
+    existing = {column["name"] for column in inspector.get_columns(table)}
+    # SQLite can only drop columns by copying the table
+    with op.batch_alter_table(table) as batch_op:
+        for name in names:
+            if name in existing:
+                batch_op.drop_column(name)
+
+def _migrate(connection):
+    # Every worker runs this at startup; one at a time, so they don't race
+    # to alter or create the same tables
+    if connection.dialect.name == "postgresql":
+        connection.exec_driver_sql(f"SELECT pg_advisory_xact_lock({MIGRATION_LOCK})")
+    elif connection.dialect.name == "sqlite":
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+    config = alembic_config()
+    config.attributes["connection"] = connection
+    # Revisions alter existing tables first; then tables added since are created
+    command.upgrade(config, "head")
+    Base.metadata.create_all(connection)
+
+async def migrate():
+    """Brings the database schema up to date with models.py."""
+    async with engine.begin() as conn:
+        await conn.run_sync(_migrate)
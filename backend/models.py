@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Float, ForeignKey, LargeBinary
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, false
 from database import Base
 import uuid
 
@@ -37,6 +37,7 @@ class Testimonial(Base):
     rating = Column(Integer, nullable=False)  # 1-5 stars
     name = Column(String(100), nullable=True)  # Optional display name
     is_active = Column(Boolean, default=True)
+    hidden_with_user = Column(Boolean, nullable=False, default=False, server_default=false())  # hidden by a bulk deactivate of its user; restoring the user shows it again
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
@@ -50,6 +51,16 @@ class Gallery(Base):
     title = Column(String(200), nullable=False)
     description = Column(Text, nullable=True)
     image_url = Column(String(500), nullable=False)
+    # Set for uploaded images (see media.py): content hash and responsive variants
+    image_hash = Column(String(64), nullable=True, index=True)
+    srcset = Column(Text, nullable=True)
+    srcset_webp = Column(Text, nullable=True)
+    # Intrinsic size and a data: URI micro-thumbnail, so clients can reserve
+    # space and show something before the image loads. Computed at upload,
+    # backfilled for older items by placeholders.py ("" = image unusable)
+    width = Column(Integer, nullable=True)
+    height = Column(Integer, nullable=True)
+    placeholder = Column(Text, nullable=True)
     category = Column(String(50), nullable=False)  # match, turf, equipment
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -66,17 +77,21 @@ class Match(Base):
     max_players = Column(Integer, default=22)
     players_left = Column(Integer, default=22)
     is_active = Column(Boolean, default=True)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # Relationships
     bookings = relationship("Booking", back_populates="match", cascade="all, delete-orphan")
+    
+    # Every write bumps version; ORM flushes of a stale row raise StaleDataError
+    __mapper_args__ = {"version_id_col": version}
 
 class Booking(Base):
     __tablename__ = "bookings"
     
     id = Column(String, primary_key=True, default=generate_uuid)
-    user_id = Column(String, ForeignKey("users.id"), nullable=False)
+    user_id = Column(String, ForeignKey("users.id"), nullable=False, index=True)
     match_id = Column(String, ForeignKey("matches.id"), nullable=False)
     booking_time = Column(DateTime(timezone=True), server_default=func.now())
     is_cancelled = Column(Boolean, default=False)
@@ -91,10 +106,207 @@ class Payment(Base):
     __tablename__ = "payments"
     
     id = Column(String, primary_key=True, default=generate_uuid)
-    booking_id = Column(String, ForeignKey("bookings.id"), nullable=False)
+    booking_id = Column(String, ForeignKey("bookings.id"), nullable=False, index=True)
     amount = Column(Float, nullable=False)
     payment_method = Column(String(50), nullable=False)  # card, upi, netbanking
     transaction_id = Column(String(100), nullable=True)
-    status = Column(String(20), default="pending")  # pending, completed, failed, refunded
+    status = Column(String(20), default="pending")  # pending, completed, failed, refunded, expired; see payment_states.py
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now()) 
\ No newline at end of file
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    __mapper_args__ = {"version_id_col": version}
+
+class ResourceVersion(Base):
+    __tablename__ = "resource_versions"
+    
+    # Change counter per public resource (matches, gallery, testimonials),
+    # bumped in the same transaction as every write; see caching.py
+    name = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), nullable=True)
+
+class TableCounter(Base):
+    __tablename__ = "table_counters"
+    
+    # Row count per table, kept current by the write paths and periodically
+    # reconciled with COUNT(*); see counters.py
+    name = Column(String(50), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    # Set when a write's row count couldn't be learned; count is then wrong
+    # until the next reconcile
+    dirty = Column(Boolean, nullable=False, default=False, server_default=false())
+    reconciled_at = Column(DateTime(timezone=True), nullable=True)
+
+class MatchStats(Base):
+    __tablename__ = "match_stats"
+    
+    # Per-match rollup refreshed by analytics.py
+    match_id = Column(String, primary_key=True)
+    date = Column(String(20), nullable=False, index=True)
+    location = Column(String(200), nullable=False, index=True)
+    max_players = Column(Integer, nullable=False)
+    bookings = Column(Integer, nullable=False, default=0)
+    cancellations = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
+    refunds = Column(Float, nullable=False, default=0.0)
+    refreshed_at = Column(DateTime(timezone=True), nullable=False)
+
+class DailyBookingStats(Base):
+    __tablename__ = "daily_booking_stats"
+    
+    # Per-day, per-venue rollup keyed by booking date; refreshed by analytics.py
+    day = Column(String(10), primary_key=True)  # Format: "2024-01-15"
+    location = Column(String(200), primary_key=True)
+    bookings = Column(Integer, nullable=False, default=0)
+    cancellations = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
+    refunds = Column(Float, nullable=False, default=0.0)
+    refreshed_at = Column(DateTime(timezone=True), nullable=False)
+
+class RollupState(Base):
+    __tablename__ = "rollup_state"
+    
+    # Watermark of the last incremental rollup refresh
+    name = Column(String(50), primary_key=True)
+    watermark = Column(DateTime(timezone=True), nullable=True)
+    refreshed_at = Column(DateTime(timezone=True), nullable=True)
+
+class JobLease(Base):
+    __tablename__ = "job_leases"
+    
+    # One row per scheduled job: the lease that keeps it single-flight across
+    # workers, when it is next due, and how its last run went; see scheduler.py
+    name = Column(String(50), primary_key=True)
+    owner = Column(String(100), nullable=True)
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)
+    next_run_at = Column(DateTime(timezone=True), nullable=True)
+    last_started_at = Column(DateTime(timezone=True), nullable=True)
+    last_finished_at = Column(DateTime(timezone=True), nullable=True)
+    last_status = Column(String(20), nullable=True)  # ok, failed, timeout, cancelled
+    last_error = Column(Text, nullable=True)
+    last_duration_ms = Column(Integer, nullable=True)
+    runs = Column(Integer, nullable=False, default=0)
+    failures = Column(Integer, nullable=False, default=0)
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+    
+    # First response to a request sent with an Idempotency-Key header, replayed
+    # to retries until it expires; see idempotency.py
+    key = Column(String(64), primary_key=True)  # sha256 of user, method, path and header value
+    request_hash = Column(String(64), nullable=False)  # sha256 of the request body
+    status = Column(String(20), nullable=False)  # in_progress, done
+    response_status = Column(Integer, nullable=True)
+    response_content_type = Column(String(100), nullable=True)
+    response_body = Column(LargeBinary, nullable=True)
+    locked_until = Column(DateTime(timezone=True), nullable=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+class Refund(Base):
+    __tablename__ = "refunds"
+    
+    # Refunds owed for cancelled bookings, settled against the gateway in
+    # batches by refunds.py. No foreign key: the row outlives bulk deletes
+    # and archival of the payment it refunds.
+    id = Column(String, primary_key=True, default=generate_uuid)
+    payment_id = Column(String, nullable=False, unique=True)
+    booking_id = Column(String, nullable=False, index=True)
+    amount = Column(Float, nullable=False)
+    status = Column(String(20), nullable=False, default="queued", index=True)  # queued, processing, succeeded, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    retries = Column(Integer, nullable=False, default=0, server_default="0")  # admin retries after failing; each is a new gateway request
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False, index=True)  # also the claim's expiry while processing
+    gateway_refund_id = Column(String(100), nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    processed_at = Column(DateTime(timezone=True), nullable=True)
+
+class ReconciliationRun(Base):
+    __tablename__ = "reconciliation_runs"
+    
+    # One pass of a gateway settlement file against payments; see reconciliation.py
+    id = Column(String, primary_key=True, default=generate_uuid)
+    status = Column(String(20), nullable=False, default="running")  # running, done, failed
+    since = Column(String(20), nullable=True)  # window checked for payments missing from the file
+    until = Column(String(20), nullable=True)
+    rows = Column(Integer, nullable=False, default=0)
+    matched = Column(Integer, nullable=False, default=0)
+    mismatched = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    started_at = Column(DateTime(timezone=True), server_default=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+class ReconciliationMismatch(Base):
+    __tablename__ = "reconciliation_mismatches"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    run_id = Column(String, ForeignKey("reconciliation_runs.id"), nullable=False, index=True)
+    kind = Column(String(30), nullable=False)  # missing_payment, missing_settlement, amount, status, duplicate, invalid
+    line = Column(Integer, nullable=True)  # line in the settlement file
+    transaction_id = Column(String(100), nullable=True)
+    payment_id = Column(String, nullable=True)
+    payment_amount = Column(Float, nullable=True)
+    settled_amount = Column(Float, nullable=True)
+    payment_status = Column(String(20), nullable=True)
+    settled_status = Column(String(20), nullable=True)
+    detail = Column(Text, nullable=True)
+
+class GatewayEvent(Base):
+    __tablename__ = "gateway_events"
+    
+    # Raw payment gateway webhook events, stored before they are applied so
+    # redeliveries are deduplicated and none is lost; see webhooks.py
+    id = Column(String(100), primary_key=True)  # the gateway's event id
+    type = Column(String(50), nullable=False)  # charge.succeeded, charge.failed, charge.refunded
+    payload = Column(Text, nullable=False)
+    status = Column(String(20), nullable=False, default="received", index=True)  # received, applied, ignored, failed
+    error = Column(Text, nullable=True)
+    received_at = Column(DateTime(timezone=True), server_default=func.now())
+    processed_at = Column(DateTime(timezone=True), nullable=True)
+
+# Archive tables: matches older than the archive horizon move here from the
+# live tables together with their bookings and payments; see archive.py.
+# Same columns as the live tables plus archived_at, and no foreign keys, so
+# users can still be deleted later.
+class ArchivedMatch(Base):
+    __tablename__ = "archived_matches"
+    
+    id = Column(String, primary_key=True)
+    date = Column(String(20), nullable=False, index=True)
+    time = Column(String(10), nullable=False)
+    location = Column(String(200), nullable=False, index=True)
+    price = Column(Float, nullable=False)
+    max_players = Column(Integer)
+    players_left = Column(Integer)
+    is_active = Column(Boolean)
+    version = Column(Integer)
+    created_at = Column(DateTime(timezone=True))
+    updated_at = Column(DateTime(timezone=True))
+    archived_at = Column(DateTime(timezone=True), nullable=False)
+
+class ArchivedBooking(Base):
+    __tablename__ = "archived_bookings"
+    
+    id = Column(String, primary_key=True)
+    user_id = Column(String, nullable=False, index=True)
+    match_id = Column(String, nullable=False, index=True)
+    booking_time = Column(DateTime(timezone=True))
+    is_cancelled = Column(Boolean)
+    cancelled_at = Column(DateTime(timezone=True), nullable=True)
+    refund_amount = Column(Float, nullable=True)
+    archived_at = Column(DateTime(timezone=True), nullable=False)
+
+class ArchivedPayment(Base):
+    __tablename__ = "archived_payments"
+    
+    id = Column(String, primary_key=True)
+    booking_id = Column(String, nullable=False, index=True)
+    amount = Column(Float, nullable=False)
+    payment_method = Column(String(50), nullable=False)
+    transaction_id = Column(String(100), nullable=True)
+    status = Column(String(20))
+    version = Column(Integer)
+    created_at = Column(DateTime(timezone=True))
+    updated_at = Column(DateTime(timezone=True))
+    archived_at = Column(DateTime(timezone=True), nullable=False)
\ No newline at end of file
@@ -0,0 +1,31 @@
+from sqlalchemy import update
+from models import Payment
+
+# The only moves Payment.status can make: new status -> statuses it may be
+# reached from. A charge the gateway reports as succeeded wins over an
+# earlier decline or expiry, since the money has been taken either way, and
+# a declined payment goes back to pending when it is charged again.
+PAYMENT_TRANSITIONS = {
+    "pending": ("failed",),
+    "completed": ("pending", "failed", "expired"),
+    "failed": ("pending",),
+    "expired": ("pending",),
+    "refunded": ("completed",),
+}
+
+def can_become(new_status: str):
+    """Condition matching payments whose current status may move to new_status."""
+    return Payment.status.in_(PAYMENT_TRANSITIONS[new_status])
+
+def transition(new_status: str, *conditions, **values):
+    """
+    UPDATE moving the payments matching conditions to new_status, checked
+    and applied in the one statement so concurrent writers can't interleave.
+    A rowcount of 0 means the payment was not in a state that allows it.
+    """
+    return (
+        update(Payment)
+        .where(can_become(new_status), *conditions)
+        .values(status=new_status, version=Payment.version + 1, **values)
+        .execution_options(synchronize_session=False)
+    )
@@ -0,0 +1,150 @@
+import asyncio
+import ipaddress
+import logging
+import socket
+from typing import Optional
+import httpx
+from sqlalchemy import select, update
+from starlette.concurrency import run_in_threadpool
+from database import AsyncSessionLocal
+from models import Gallery
+from media import image_pool, describe_image, read_manifest, media_path, InvalidImage
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Downloads of gallery images hosted elsewhere, per backfill run
+FETCH_TIMEOUT = 10
+FETCH_CONCURRENCY = 8
+MAX_REDIRECTS = 5
+
+class Unavailable(Exception):
+    """The image could not be read this time (network, 5xx); a later run retries it."""
+
+async def _public_address(host: str) -> str:
+    """
+    An address to reach host at, provided it resolves only to public ones.
+    Image URLs come from users, so they must not point the server at its
+    own network (localhost, cloud metadata, internal admin ports).
+    """
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(host, None, type=socket.SOCK_STREAM)
+    except socket.gaierror as exc:
+        raise Unavailable(f"{host} did not resolve: {exc}")
+    addresses = []
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0].split("%")[0])
+        if address.version == 6 and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        if not address.is_global:
+            raise InvalidImage(f"{host} resolves to non-public address {address}")
+        addresses.append(address)
+    if not addresses:
+        raise Unavailable(f"{host} did not resolve")
+    return str(addresses[0])
+
+async def _fetch(client: httpx.AsyncClient, url: str) -> bytes:
+    limit = settings.media_max_upload_mb * 1024 * 1024
+    try:
+        target = httpx.URL(url)
+        # Redirects are followed by hand, so every hop's host is checked
+        for _ in range(MAX_REDIRECTS + 1):
+            if target.scheme not in ("http", "https") or not target.host:
+                raise InvalidImage(f"{target} is not an http(s) URL")
+            # Connect to the address just checked, not whatever the name
+            # resolves to a moment later; TLS still verifies the hostname
+            address = await _public_address(target.host)
+            async with client.stream(
+                "GET", target.copy_with(host=address),
+                headers={"Host": target.netloc.decode("ascii")},
+                extensions={"sni_hostname": target.host}
+            ) as response:
+                if response.is_redirect:
+                    target = target.join(response.headers["location"])
+                    continue
+                if response.status_code >= 500:
+                    raise Unavailable(f"{url} returned {response.status_code}")
+                if response.status_code >= 400:
+                    raise InvalidImage(f"{url} returned {response.status_code}")
+                body = bytearray()
+                async for chunk in response.aiter_bytes():
+                    body += chunk
+                    if len(body) > limit:
+                        raise InvalidImage(f"{url} is larger than {settings.media_max_upload_mb} MB")
+                return bytes(body)
+    except httpx.InvalidURL as exc:
+        raise InvalidImage(f"{url}: {exc}")
+    except httpx.HTTPError as exc:
+        raise Unavailable(f"{url}: {exc!r}")
+    raise InvalidImage(f"{url} redirects more than {MAX_REDIRECTS} times")
+
+async def _describe(client: httpx.AsyncClient, item) -> Optional[dict]:
+    """Dimensions and placeholder for one gallery item; None when its image can't be used."""
+    try:
+        if item.image_hash:
+            manifest = await run_in_threadpool(read_manifest, item.image_hash)
+            if manifest and "placeholder" in manifest:
+                return manifest
+            source = media_path(item.image_hash, "original")
+        elif item.image_url.startswith(("http://", "https://")):
+            source = await _fetch(client, item.image_url)
+        else:
+            raise InvalidImage(f"{item.image_url} is not a URL")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(image_pool(), describe_image, source)
+    except (InvalidImage, OSError) as exc:
+        logger.warning("No placeholder for gallery item %s: %s", item.id, exc)
+        return None
+
+async def backfill_gallery_placeholders(max_batches: Optional[int] = None) -> dict:
+    """
+    Fills width, height and placeholder for gallery items created before
+    they were computed at upload. Images that can't be used get an empty
+    placeholder so later runs skip them; ones that are only unreachable
+    right now are left for the next run.
+    """
+    totals = {"filled": 0, "unusable": 0, "retry": 0}
+    batches = 0
+    async with httpx.AsyncClient(
+        timeout=FETCH_TIMEOUT,
+        # Connections are made to checked addresses by IP, so one must not be
+        # reused for a different hostname that happens to share the address
+        limits=httpx.Limits(max_connections=FETCH_CONCURRENCY, max_keepalive_connections=0)
+    ) as client:
+        while max_batches is None or batches < max_batches:
+            async with AsyncSessionLocal() as db:
+                items = (await db.execute(
+                    select(Gallery.id, Gallery.image_url, Gallery.image_hash)
+                    .where(Gallery.placeholder == None)
+                    .order_by(Gallery.created_at, Gallery.id)
+                    # Items left for a retry stay NULL; step past them
+                    .offset(totals["retry"])
+                    .limit(settings.gallery_backfill_batch_size)
+                )).all()
+            if not items:
+                break
+
+            results = await asyncio.gather(*[_describe(client, item) for item in items], return_exceptions=True)
+            async with AsyncSessionLocal() as db:
+                for item, result in zip(items, results):
+                    if isinstance(result, Unavailable):
+                        logger.info("Placeholder for gallery item %s deferred: %s", item.id, result)
+                        totals["retry"] += 1
+                        continue
+                    if isinstance(result, BaseException):
+                        raise result
+                    if result is None:
+                        values = {"placeholder": ""}
+                        totals["unusable"] += 1
+                    else:
+                        values = {key: result[key] for key in ("width", "height", "placeholder")}
+                        totals["filled"] += 1
+                    await db.execute(
+                        update(Gallery)
+                        .where(Gallery.id == item.id, Gallery.placeholder == None)
+                        .values(**values)
+                        .execution_options(synchronize_session=False)
+                    )
+                await db.commit()
+            batches += 1
+    return {"batches": batches, **totals}
@@ -0,0 +1,155 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import select, update, insert, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import AsyncSessionLocal
+from models import Refund, Payment
+from gateway import get_gateway, GatewayError, GatewayUnavailable
+from payment_states import transition
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# How long a claimed batch stays reserved before another run may retry it
+CLAIM_TIMEOUT = 600
+
+# Longest wait between attempts, however many have failed
+MAX_RETRY_DELAY = 3600
+
+async def enqueue_refund(db: AsyncSession, payment: Payment, amount: float):
+    """Queues a refund in the caller's transaction, so it commits with the cancellation."""
+    await db.execute(insert(Refund).values(
+        payment_id=payment.id,
+        booking_id=payment.booking_id,
+        amount=min(amount, payment.amount),
+        status="queued",
+        attempts=0,
+        next_attempt_at=datetime.utcnow()
+    ))
+
+async def _claim_batch() -> list:
+    # Due refunds, plus claims whose run died mid-batch. The gateway dedupes
+    # refunds per refund and retry, so retrying one that did go through is harmless.
+    now = datetime.utcnow()
+    due = [Refund.status.in_(("queued", "processing")), Refund.next_attempt_at <= now]
+    async with AsyncSessionLocal() as db:
+        candidates = (await db.execute(
+            select(Refund.id)
+            .where(*due)
+            .order_by(Refund.next_attempt_at)
+            .limit(settings.refund_batch_size)
+            .with_for_update(skip_locked=True)
+        )).scalars().all()
+        if not candidates:
+            return []
+        # SKIP LOCKED does nothing on SQLite, and another run may have claimed
+        # some candidates since; the UPDATE re-checks each row is still due and
+        # RETURNING says which ones this run actually got
+        refund_ids = (await db.execute(
+            update(Refund)
+            .where(Refund.id.in_(candidates), *due)
+            .values(
+                status="processing",
+                attempts=Refund.attempts + 1,
+                next_attempt_at=now + timedelta(seconds=CLAIM_TIMEOUT)
+            )
+            .returning(Refund.id)
+            .execution_options(synchronize_session=False)
+        )).scalars().all()
+        if not refund_ids:
+            await db.commit()
+            return []
+        rows = (await db.execute(
+            select(Refund.id, Refund.payment_id, Refund.amount, Refund.attempts, Refund.retries, Payment.transaction_id)
+            .outerjoin(Payment, Payment.id == Refund.payment_id)
+            .where(Refund.id.in_(refund_ids))
+        )).all()
+        await db.commit()
+    return rows
+
+async def _settle(row, limiter: asyncio.Semaphore):
+    """Calls the gateway for one refund; returns (status, gateway refund id, error)."""
+    if not row.transaction_id:
+        return "failed", None, "Payment has no gateway charge to refund"
+    try:
+        async with limiter:
+            result = await get_gateway().refund(row.id, row.transaction_id, row.amount, row.retries)
+    except GatewayUnavailable as exc:
+        if row.attempts >= settings.refund_max_attempts:
+            return "failed", None, f"Gave up after {row.attempts} attempts: {exc}"
+        return "retry", None, str(exc)
+    except GatewayError as exc:
+        return "failed", None, str(exc)
+    return "succeeded", result.transaction_id, None
+
+def _retry_at(attempts: int) -> datetime:
+    delay = min(settings.refund_retry_delay * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+    return datetime.utcnow() + timedelta(seconds=delay)
+
+async def _record(rows: list, outcomes: list):
+    async with AsyncSessionLocal() as db:
+        for row, (outcome, gateway_refund_id, error) in zip(rows, outcomes):
+            if outcome == "succeeded":
+                # Refund row and payment change commit together
+                await db.execute(
+                    update(Refund)
+                    .where(Refund.id == row.id)
+                    .values(status="succeeded", gateway_refund_id=gateway_refund_id,
+                            last_error=None, processed_at=func.now())
+                    .execution_options(synchronize_session=False)
+                )
+                await db.execute(transition("refunded", Payment.id == row.payment_id))
+            elif outcome == "retry":
+                await db.execute(
+                    update(Refund)
+                    .where(Refund.id == row.id)
+                    .values(status="queued", next_attempt_at=_retry_at(row.attempts), last_error=error)
+                    .execution_options(synchronize_session=False)
+                )
+            else:
+                logger.error("Refund %s for payment %s failed: %s", row.id, row.payment_id, error)
+                await db.execute(
+                    update(Refund)
+                    .where(Refund.id == row.id)
+                    .values(status="failed", last_error=error, processed_at=func.now())
+                    .execution_options(synchronize_session=False)
+                )
+        await db.commit()
+
+async def settle_refunds(max_batches: Optional[int] = None) -> dict:
+    """Settles due refunds batch by batch until none are left (or max_batches)."""
+    limiter = asyncio.Semaphore(settings.refund_concurrency)
+    totals = {"succeeded": 0, "retry": 0, "failed": 0}
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        rows = await _claim_batch()
+        if not rows:
+            break
+        # Gateway calls happen outside any transaction
+        outcomes = await asyncio.gather(*[_settle(row, limiter) for row in rows])
+        await _record(rows, outcomes)
+        for outcome, _, _ in outcomes:
+            totals[outcome] += 1
+        batches += 1
+        if all(outcome == "retry" for outcome, _, _ in outcomes):
+            # The gateway is down; leave the rest for the next run
+            break
+    return {"batches": batches, **totals}
+
+async def refund_queue_status(db: AsyncSession) -> dict:
+    counts = dict((await db.execute(
+        select(Refund.status, func.count()).group_by(Refund.status)
+    )).all())
+    oldest = (await db.execute(
+        select(func.min(Refund.created_at)).where(Refund.status.in_(("queued", "processing")))
+    )).scalar()
+    return {
+        "depth": counts.get("queued", 0) + counts.get("processing", 0),
+        "counts": counts,
+        "oldest_pending_at": oldest,
+        "owed": (await db.execute(
+            select(func.coalesce(func.sum(Refund.amount), 0)).where(Refund.status.in_(("queued", "processing")))
+        )).scalar(),
+    }
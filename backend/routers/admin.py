@@ -4,8 +4,15 @@ from sqlalchemy import select, delete, update
 from typing import List
 from database import get_db
 from models import User, Testimonial, Match, Gallery, Booking, Payment
-from schemas import UserResponse, TestimonialResponse, MatchResponse, GalleryResponse
+from schemas import (
+    UserResponse, TestimonialResponse, MatchResponse, GalleryResponse,
+    BookingResponse, PaymentResponse, BulkActionRequest, BulkActionResponse
+)
 from config import settings
+from serialization import select_for, list_response
+from counters import get_table_counts, reconcile_counters
+from bulk import target_condition, apply_bulk_action
+from gateway import get_gateway
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -29,13 +36,12 @@ async def get_all_users(
     await verify_admin_mode_password(password)
     
     result = await db.execute(
-        select(User)
+        select_for(UserResponse, User)
         .offset(skip)
         .limit(limit)
         .order_by(User.created_at.desc())
     )
-    users = result.scalars().all()
-    return [UserResponse.from_orm(user) for user in users]
+    return list_response(UserResponse, result)
 
 @router.put("/users/{user_id}/admin")
 async def toggle_user_admin_status(
@@ -46,16 +52,20 @@ async def toggle_user_admin_status(
 ):
     await verify_admin_mode_password(password)
     
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
+    # A single UPDATE: nothing is read first, so there is nothing to go stale
+    result = await db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(is_admin=is_admin)
+        .execution_options(synchronize_session=False)
+    )
     
-    if not user:
+    if not result.rowcount:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
     
-    user.is_admin = is_admin
     await db.commit()
     
     return {"message": f"User admin status updated to {is_admin}"}
@@ -93,13 +103,12 @@ async def get_all_testimonials(
     await verify_admin_mode_password(password)
     
     result = await db.execute(
-        select(Testimonial)
+        select_for(TestimonialResponse, Testimonial)
         .offset(skip)
         .limit(limit)
         .order_by(Testimonial.created_at.desc())
     )
-    testimonials = result.scalars().all()
-    return [TestimonialResponse.from_orm(t) for t in testimonials]
+    return list_response(TestimonialResponse, result)
 
 @router.delete("/testimonials/{testimonial_id}")
 async def delete_testimonial_admin(
@@ -136,13 +145,12 @@ async def get_all_matches(
     await verify_admin_mode_password(password)
     
     result = await db.execute(
-        select(Match)
+        select_for(MatchResponse, Match)
         .offset(skip)
         .limit(limit)
         .order_by(Match.created_at.desc())
     )
-    matches = result.scalars().all()
-    return [MatchResponse.from_orm(match) for match in matches]
+    return list_response(MatchResponse, result)
 
 @router.delete("/matches/{match_id}")
 async def delete_match_admin(
@@ -177,13 +185,12 @@ async def get_all_gallery_items(
     await verify_admin_mode_password(password)
     
     result = await db.execute(
-        select(Gallery)
+        select_for(GalleryResponse, Gallery)
         .offset(skip)
         .limit(limit)
         .order_by(Gallery.created_at.desc())
     )
-    gallery_items = result.scalars().all()
-    return [GalleryResponse.from_orm(item) for item in gallery_items]
+    return list_response(GalleryResponse, result)
 
 @router.delete("/gallery/{gallery_id}")
 async def delete_gallery_item_admin(
@@ -208,7 +215,7 @@ async def delete_gallery_item_admin(
     return {"message": "Gallery item deleted successfully"}
 
 # Booking Management
-@router.get("/bookings")
+@router.get("/bookings", response_model=List[BookingResponse])
 async def get_all_bookings(
     password: str,
     skip: int = 0,
@@ -218,28 +225,12 @@ async def get_all_bookings(
     await verify_admin_mode_password(password)
     
     result = await db.execute(
-        select(Booking)
+        select_for(BookingResponse, Booking)
         .offset(skip)
         .limit(limit)
         .order_by(Booking.booking_time.desc())
     )
-    bookings = result.scalars().all()
-    
-    # Convert to dict for easier handling
-    booking_list = []
-    for booking in bookings:
-        booking_dict = {
-            "id": booking.id,
-            "user_id": booking.user_id,
-            "match_id": booking.match_id,
-            "booking_time": booking.booking_time,
-            "is_cancelled": booking.is_cancelled,
-            "cancelled_at": booking.cancelled_at,
-            "refund_amount": booking.refund_amount
-        }
-        booking_list.append(booking_dict)
-    
-    return booking_list
+    return list_response(BookingResponse, result)
 
 @router.delete("/bookings/{booking_id}")
 async def delete_booking_admin(
@@ -264,7 +255,7 @@ async def delete_booking_admin(
     return {"message": "Booking deleted successfully"}
 
 # Payment Management
-@router.get("/payments")
+@router.get("/payments", response_model=List[PaymentResponse])
 async def get_all_payments(
     password: str,
     skip: int = 0,
@@ -274,29 +265,12 @@ async def get_all_payments(
     await verify_admin_mode_password(password)
     
     result = await db.execute(
-        select(Payment)
+        select_for(PaymentResponse, Payment)
         .offset(skip)
         .limit(limit)
         .order_by(Payment.created_at.desc())
     )
-    payments = result.scalars().all()
-    
-    # Convert to dict for easier handling
-    payment_list = []
-    for payment in payments:
-        payment_dict = {
-            "id": payment.id,
-            "booking_id": payment.booking_id,
-            "amount": payment.amount,
-            "payment_method": payment.payment_method,
-            "transaction_id": payment.transaction_id,
-            "status": payment.status,
-            "created_at": payment.created_at,
-            "updated_at": payment.updated_at
-        }
-        payment_list.append(payment_dict)
-    
-    return payment_list
+    return list_response(PaymentResponse, result)
 
 @router.delete("/payments/{payment_id}")
 async def delete_payment_admin(
@@ -320,6 +294,24 @@ async def delete_payment_admin(
     
     return {"message": "Payment deleted successfully"}
 
+# Bulk Operations
+@router.post("/bulk/{resource}", response_model=BulkActionResponse)
+async def bulk_action(
+    resource: str,
+    request: BulkActionRequest,
+    password: str,
+    db: AsyncSession = Depends(get_db)
+):
+    await verify_admin_mode_password(password)
+    
+    condition = target_condition(resource, request.action, request.ids, request.filter)
+    
+    # All statements, dependents included, commit or roll back together
+    affected = await apply_bulk_action(db, resource, request.action, condition)
+    await db.commit()
+    
+    return {"resource": resource, "action": request.action, "affected": affected}
+
 # Database Statistics
 @router.get("/stats")
 async def get_database_stats(
@@ -328,30 +320,29 @@ async def get_database_stats(
 ):
     await verify_admin_mode_password(password)
     
-    # Count all entities
-    users_count = await db.execute(select(User))
-    users_count = len(users_count.scalars().all())
+    # Maintained counters: one small read regardless of table size
+    counts = await get_table_counts(db)
     
-    testimonials_count = await db.execute(select(Testimonial))
-    testimonials_count = len(testimonials_count.scalars().all())
-    
-    matches_count = await db.execute(select(Match))
-    matches_count = len(matches_count.scalars().all())
-    
-    gallery_count = await db.execute(select(Gallery))
-    gallery_count = len(gallery_count.scalars().all())
+    return {
+        "total_users": counts["users"],
+        "total_testimonials": counts["testimonials"],
+        "total_matches": counts["matches"],
+        "total_gallery_items": counts["gallery"],
+        "total_bookings": counts["bookings"],
+        "total_payments": counts["payments"]
+    }
+
+@router.post("/stats/reconcile")
+async def reconcile_database_stats(password: str):
+    await verify_admin_mode_password(password)
     
-    bookings_count = await db.execute(select(Booking))
-    bookings_count = len(bookings_count.scalars().all())
+    counts = await reconcile_counters()
     
-    payments_count = await db.execute(select(Payment))
-    payments_count = len(payments_count.scalars().all())
+    return {"message": "Counters reconciled", "counts": counts}
+
+@router.get("/gateway")
+async def get_gateway_status(password: str):
+    await verify_admin_mode_password(password)
     
-    return {
-        "total_users": users_count,
-        "total_testimonials": testimonials_count,
-        "total_matches": matches_count,
-        "total_gallery_items": gallery_count,
-        "total_bookings": bookings_count,
-        "total_payments": payments_count
-    } 
\ No newline at end of file
+    # Circuit breaker state and in-flight calls for this worker's gateway client
+    return get_gateway().stats()
\ No newline at end of file
@@ -0,0 +1,165 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, literal_column
+from typing import List, Optional
+from datetime import date
+from database import get_db
+from models import MatchStats, DailyBookingStats, RollupState
+from schemas import MatchStatsResponse, BookingPeriodStats, VenueStats
+from analytics import refresh_rollups, STATE_NAME
+from serialization import list_response
+from routers.admin import verify_admin_mode_password
+
+router = APIRouter(prefix="/admin/analytics", tags=["admin"])
+
+MATCH_SORTS = {
+    "date": MatchStats.date.desc(),
+    "revenue": MatchStats.revenue.desc(),
+    "fill_rate": literal_column("fill_rate").desc(),
+    "cancellations": MatchStats.cancellations.desc(),
+    "refunds": MatchStats.refunds.desc(),
+}
+
+def iso_week(day: str) -> str:
+    year, week, _ = date.fromisoformat(day).isocalendar()
+    return f"{year}-W{week:02d}"
+
+@router.get("/matches", response_model=List[MatchStatsResponse])
+async def get_match_analytics(
+    password: str,
+    skip: int = 0,
+    limit: int = 100,
+    sort: str = "date",
+    location: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    await verify_admin_mode_password(password)
+    
+    if sort not in MATCH_SORTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"sort must be one of: {', '.join(MATCH_SORTS)}"
+        )
+    
+    active = MatchStats.bookings - MatchStats.cancellations
+    query = select(
+        MatchStats.match_id, MatchStats.date, MatchStats.location, MatchStats.max_players,
+        MatchStats.bookings, MatchStats.cancellations,
+        (func.coalesce(active * 1.0 / func.nullif(MatchStats.max_players, 0), 0)).label("fill_rate"),
+        MatchStats.revenue, MatchStats.refunds, MatchStats.refreshed_at
+    )
+    if location:
+        query = query.where(MatchStats.location == location)
+    if date_from:
+        query = query.where(MatchStats.date >= date_from)
+    if date_to:
+        query = query.where(MatchStats.date <= date_to)
+    
+    result = await db.execute(
+        query
+        .order_by(MATCH_SORTS[sort], MatchStats.match_id)
+        .offset(skip)
+        .limit(limit)
+    )
+    return list_response(MatchStatsResponse, result)
+
+@router.get("/bookings", response_model=List[BookingPeriodStats])
+async def get_booking_analytics(
+    password: str,
+    period: str = "day",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    location: Optional[str] = None,
+    by_venue: bool = False,
+    db: AsyncSession = Depends(get_db)
+):
+    await verify_admin_mode_password(password)
+    
+    if period not in ("day", "week"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="period must be 'day' or 'week'"
+        )
+    
+    columns = [DailyBookingStats.day]
+    if by_venue:
+        columns.append(DailyBookingStats.location)
+    query = select(
+        *columns,
+        func.sum(DailyBookingStats.bookings),
+        func.sum(DailyBookingStats.cancellations),
+        func.sum(DailyBookingStats.revenue),
+        func.sum(DailyBookingStats.refunds)
+    ).group_by(*columns).order_by(*columns)
+    if start:
+        query = query.where(DailyBookingStats.day >= start)
+    if end:
+        query = query.where(DailyBookingStats.day <= end)
+    if location:
+        query = query.where(DailyBookingStats.location == location)
+    
+    result = await db.execute(query)
+    
+    # Rollup rows are per day; weeks are folded from at most 7 of them
+    periods = {}
+    for row in result.all():
+        day, venue = row[0], row[1] if by_venue else None
+        bookings, cancellations, revenue, refunds = row[-4:]
+        key = (day if period == "day" else iso_week(day), venue)
+        totals = periods.setdefault(key, [0, 0, 0.0, 0.0])
+        totals[0] += bookings or 0
+        totals[1] += cancellations or 0
+        totals[2] += revenue or 0
+        totals[3] += refunds or 0
+    
+    return [
+        BookingPeriodStats(
+            period=key, location=venue, bookings=bookings, cancellations=cancellations,
+            revenue=revenue, refunds=refunds
+        )
+        for (key, venue), (bookings, cancellations, revenue, refunds) in periods.items()
+    ]
+
+@router.get("/venues", response_model=List[VenueStats])
+async def get_venue_analytics(
+    password: str,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    await verify_admin_mode_password(password)
+    
+    query = select(
+        DailyBookingStats.location,
+        func.sum(DailyBookingStats.bookings).label("bookings"),
+        func.sum(DailyBookingStats.cancellations).label("cancellations"),
+        func.sum(DailyBookingStats.revenue).label("revenue"),
+        func.sum(DailyBookingStats.refunds).label("refunds")
+    ).group_by(DailyBookingStats.location).order_by(func.sum(DailyBookingStats.revenue).desc())
+    if start:
+        query = query.where(DailyBookingStats.day >= start)
+    if end:
+        query = query.where(DailyBookingStats.day <= end)
+    
+    result = await db.execute(query)
+    return list_response(VenueStats, result)
+
+@router.get("/status")
+async def get_analytics_status(password: str, db: AsyncSession = Depends(get_db)):
+    await verify_admin_mode_password(password)
+    
+    result = await db.execute(select(RollupState).where(RollupState.name == STATE_NAME))
+    state = result.scalar_one_or_none()
+    
+    return {
+        "watermark": state.watermark if state else None,
+        "refreshed_at": state.refreshed_at if state else None
+    }
+
+@router.post("/refresh")
+async def refresh_analytics(password: str, full: bool = False):
+    await verify_admin_mode_password(password)
+    
+    return await refresh_rollups(full=full)
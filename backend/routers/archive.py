@@ -0,0 +1,136 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from typing import List, Optional
+from database import get_db
+from models import ArchivedMatch, ArchivedBooking, ArchivedPayment
+from schemas import (
+    ArchivedMatchResponse, ArchivedMatchDetail, ArchivedBookingResponse, ArchivedPaymentResponse
+)
+from archive import archive_matches, archive_status
+from serialization import select_for, list_response, list_adapter
+from routers.admin import verify_admin_mode_password
+
+router = APIRouter(prefix="/admin/archive", tags=["admin"])
+
+@router.get("/status")
+async def get_archive_status(password: str, db: AsyncSession = Depends(get_db)):
+    await verify_admin_mode_password(password)
+    
+    return await archive_status(db)
+
+@router.post("/run")
+async def run_archive(
+    password: str,
+    before: Optional[str] = None,
+    max_batches: Optional[int] = None
+):
+    await verify_admin_mode_password(password)
+    
+    # before: archive matches dated before this "YYYY-MM-DD" instead of the configured horizon
+    return await archive_matches(cutoff=before, max_batches=max_batches)
+
+@router.get("/matches", response_model=List[ArchivedMatchResponse])
+async def get_archived_matches(
+    password: str,
+    location: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+    db: AsyncSession = Depends(get_db)
+):
+    await verify_admin_mode_password(password)
+    
+    query = select_for(ArchivedMatchResponse, ArchivedMatch)
+    if location:
+        query = query.where(ArchivedMatch.location == location)
+    if start:
+        query = query.where(ArchivedMatch.date >= start)
+    if end:
+        query = query.where(ArchivedMatch.date <= end)
+    
+    result = await db.execute(
+        query.order_by(ArchivedMatch.date.desc(), ArchivedMatch.id).offset(skip).limit(limit)
+    )
+    return list_response(ArchivedMatchResponse, result)
+
+@router.get("/matches/{match_id}", response_model=ArchivedMatchDetail)
+async def get_archived_match(
+    match_id: str,
+    password: str,
+    db: AsyncSession = Depends(get_db)
+):
+    await verify_admin_mode_password(password)
+    
+    result = await db.execute(select(ArchivedMatch).where(ArchivedMatch.id == match_id))
+    match = result.scalar_one_or_none()
+    
+    if not match:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Archived match not found"
+        )
+    
+    bookings = await db.execute(
+        select_for(ArchivedBookingResponse, ArchivedBooking)
+        .where(ArchivedBooking.match_id == match_id)
+        .order_by(ArchivedBooking.booking_time)
+    )
+    payments = await db.execute(
+        select_for(ArchivedPaymentResponse, ArchivedPayment)
+        .where(ArchivedPayment.booking_id.in_(
+            select(ArchivedBooking.id).where(ArchivedBooking.match_id == match_id)
+        ))
+        .order_by(ArchivedPayment.created_at)
+    )
+    
+    return ArchivedMatchDetail(
+        **ArchivedMatchResponse.from_orm(match).model_dump(),
+        bookings=list_adapter(ArchivedBookingResponse).validate_python(bookings.mappings().all()),
+        payments=list_adapter(ArchivedPaymentResponse).validate_python(payments.mappings().all())
+    )
+
+@router.get("/bookings", response_model=List[ArchivedBookingResponse])
+async def get_archived_bookings(
+    password: str,
+    user_id: Optional[str] = None,
+    match_id: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+    db: AsyncSession = Depends(get_db)
+):
+    await verify_admin_mode_password(password)
+    
+    query = select_for(ArchivedBookingResponse, ArchivedBooking)
+    if user_id:
+        query = query.where(ArchivedBooking.user_id == user_id)
+    if match_id:
+        query = query.where(ArchivedBooking.match_id == match_id)
+    
+    result = await db.execute(
+        query.order_by(ArchivedBooking.booking_time.desc()).offset(skip).limit(limit)
+    )
+    return list_response(ArchivedBookingResponse, result)
+
+@router.get("/payments", response_model=List[ArchivedPaymentResponse])
+async def get_archived_payments(
+    password: str,
+    booking_id: Optional[str] = None,
+    payment_status: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+    db: AsyncSession = Depends(get_db)
+):
+    await verify_admin_mode_password(password)
+    
+    query = select_for(ArchivedPaymentResponse, ArchivedPayment)
+    if booking_id:
+        query = query.where(ArchivedPayment.booking_id == booking_id)
+    if payment_status:
+        query = query.where(ArchivedPayment.status == payment_status)
+    
+    result = await db.execute(
+        query.order_by(ArchivedPayment.created_at.desc()).offset(skip).limit(limit)
+    )
+    return list_response(ArchivedPaymentResponse, result)
@@ -0,0 +1,76 @@
+from fastapi import APIRouter, HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from typing import Optional
+from datetime import datetime
+from models import Booking, Payment
+from exports import FORMATS, parse_date_range, stream_export
+from compression import no_compression
+from routers.admin import verify_admin_mode_password
+
+router = APIRouter(prefix="/admin/export", tags=["admin"])
+
+BOOKING_COLUMNS = [
+    "id", "user_id", "match_id", "booking_time", "is_cancelled", "cancelled_at", "refund_amount"
+]
+PAYMENT_COLUMNS = [
+    "id", "booking_id", "amount", "payment_method", "transaction_id", "status", "created_at", "updated_at"
+]
+
+def export_response(query, columns, name: str, format: str, gzip: bool) -> StreamingResponse:
+    if format not in FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"format must be one of: {', '.join(FORMATS)}"
+        )
+    
+    media_type, extension = FORMATS[format]
+    filename = f"{name}-{datetime.utcnow():%Y%m%d-%H%M%S}.{extension}"
+    if gzip:
+        media_type, filename = "application/gzip", f"{filename}.gz"
+    
+    return StreamingResponse(
+        stream_export(query, columns, format, gzip),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.get("/bookings")
+@no_compression
+async def export_bookings(
+    password: str,
+    format: str = "csv",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    gzip: bool = False
+):
+    await verify_admin_mode_password(password)
+    
+    start_at, end_at = parse_date_range(start, end)
+    query = select(*[getattr(Booking, column) for column in BOOKING_COLUMNS])
+    if start_at:
+        query = query.where(Booking.booking_time >= start_at)
+    if end_at:
+        query = query.where(Booking.booking_time < end_at)
+    
+    return export_response(query.order_by(Booking.booking_time), BOOKING_COLUMNS, "bookings", format, gzip)
+
+@router.get("/payments")
+@no_compression
+async def export_payments(
+    password: str,
+    format: str = "csv",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    gzip: bool = False
+):
+    await verify_admin_mode_password(password)
+    
+    start_at, end_at = parse_date_range(start, end)
+    query = select(*[getattr(Payment, column) for column in PAYMENT_COLUMNS])
+    if start_at:
+        query = query.where(Payment.created_at >= start_at)
+    if end_at:
+        query = query.where(Payment.created_at < end_at)
+    
+    return export_response(query.order_by(Payment.created_at), PAYMENT_COLUMNS, "payments", format, gzip)
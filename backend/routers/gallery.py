@@ -1,11 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Request, UploadFile, status
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, delete
-from typing import List
+from typing import List, Optional
 from database import get_db
-from models import Gallery
+from models import User, Gallery
 from schemas import GalleryCreate, GalleryResponse, GalleryUpdate
 from auth import get_current_active_user
+from serialization import select_for, list_response
+from caching import conditional_get
+from media import ingest_image, InvalidImage, UploadTooLarge
 
 router = APIRouter(prefix="/gallery", tags=["gallery"])
 
@@ -27,14 +31,74 @@ async def create_gallery_item(
     
     return GalleryResponse.from_orm(gallery_item)
 
+@router.post("/upload", response_model=GalleryResponse)
+async def upload_gallery_image(
+    file: UploadFile = File(...),
+    title: str = Form(...),
+    category: str = Form(...),
+    description: Optional[str] = Form(None),
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Upload an image (JPEG, PNG, WebP, GIF) as a new gallery item; resized
+    JPEG and WebP variants are listed in srcset and srcset_webp, alongside
+    its dimensions and a placeholder
+    """
+    # Only admins can upload images
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can upload gallery images"
+        )
+    
+    try:
+        image = await ingest_image(file.file)
+    except UploadTooLarge as exc:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(exc)
+        )
+    except InvalidImage:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File is not a supported image"
+        )
+    finally:
+        await file.close()
+    
+    gallery_item = Gallery(
+        title=title,
+        description=description,
+        image_url=image.url,
+        image_hash=image.digest,
+        srcset=image.srcset("jpg"),
+        srcset_webp=image.srcset("webp"),
+        width=image.width,
+        height=image.height,
+        placeholder=image.placeholder,
+        category=category
+    )
+    
+    db.add(gallery_item)
+    await db.commit()
+    await db.refresh(gallery_item)
+    
+    return GalleryResponse.from_orm(gallery_item)
+
 @router.get("/", response_model=List[GalleryResponse])
 async def get_gallery_items(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     category: str = None,
     db: AsyncSession = Depends(get_db)
 ):
-    query = select(Gallery).where(Gallery.is_active == True)
+    not_modified, cache_headers = await conditional_get(request, db, "gallery")
+    if not_modified:
+        return not_modified
+    
+    query = select_for(GalleryResponse, Gallery).where(Gallery.is_active == True)
     
     if category:
         query = query.where(Gallery.category == category)
@@ -45,8 +109,9 @@ async def get_gallery_items(
         .limit(limit)
         .order_by(Gallery.created_at.desc())
     )
-    gallery_items = result.scalars().all()
-    return [GalleryResponse.from_orm(item) for item in gallery_items]
+    response = list_response(GalleryResponse, result)
+    response.headers.update(cache_headers)
+    return response
 
 @router.get("/{gallery_id}", response_model=GalleryResponse)
 async def get_gallery_item(
@@ -122,11 +187,15 @@ async def delete_gallery_item(
     return {"message": "Gallery item deleted successfully"}
 
 @router.get("/categories/list")
-async def get_gallery_categories(db: AsyncSession = Depends(get_db)):
+async def get_gallery_categories(request: Request, db: AsyncSession = Depends(get_db)):
+    not_modified, cache_headers = await conditional_get(request, db, "gallery")
+    if not_modified:
+        return not_modified
+    
     result = await db.execute(
         select(Gallery.category)
         .where(Gallery.is_active == True)
         .distinct()
     )
     categories = result.scalars().all()
-    return {"categories": list(categories)} 
\ No newline at end of file
+    return JSONResponse({"categories": list(categories)}, headers=cache_headers) 
\ No newline at end of file
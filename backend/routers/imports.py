@@ -0,0 +1,35 @@
+from fastapi import APIRouter, HTTPException, Request, status
+from typing import Optional
+from schemas import ImportResult
+from imports import FORMATS, import_format, import_users, import_matches
+from routers.admin import verify_admin_mode_password
+
+# Uploads are sent as the raw request body, e.g.
+#   curl --data-binary @users.csv -H "Content-Type: text/csv" \
+#        "$API/admin/import/users?password=..."
+# and are read as a stream, so large files never sit in memory
+router = APIRouter(prefix="/admin/import", tags=["admin"])
+
+def upload_format(request: Request, format: Optional[str]) -> str:
+    fmt = import_format(format, request.headers.get("content-type"))
+    if fmt is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"format must be one of: {', '.join(FORMATS)}"
+        )
+    return fmt
+
+def is_gzipped(request: Request) -> bool:
+    return request.headers.get("content-encoding", "").lower() == "gzip"
+
+@router.post("/users", response_model=ImportResult)
+async def import_users_upload(request: Request, password: str, format: Optional[str] = None):
+    await verify_admin_mode_password(password)
+
+    return await import_users(request.stream(), upload_format(request, format), is_gzipped(request))
+
+@router.post("/matches", response_model=ImportResult)
+async def import_matches_upload(request: Request, password: str, format: Optional[str] = None):
+    await verify_admin_mode_password(password)
+
+    return await import_matches(request.stream(), upload_format(request, format), is_gzipped(request))
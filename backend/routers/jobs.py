@@ -0,0 +1,29 @@
+from fastapi import APIRouter, HTTPException, status
+from scheduler import scheduler
+from routers.admin import verify_admin_mode_password
+
+router = APIRouter(prefix="/admin/jobs", tags=["admin"])
+
+@router.get("/")
+async def get_jobs(password: str):
+    await verify_admin_mode_password(password)
+    
+    return await scheduler.status()
+
+@router.post("/{name}/run")
+async def run_job(name: str, password: str):
+    await verify_admin_mode_password(password)
+    
+    if name not in scheduler.jobs:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    
+    if not await scheduler.run_now(name):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Job is already running"
+        )
+    
+    return {"message": f"Job {name} started"}
\ No newline at end of file
@@ -1,12 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete
+from sqlalchemy import select, update, delete
 from typing import List
 from datetime import datetime, timedelta
 from database import get_db
-from models import User, Match, Booking
-from schemas import MatchCreate, MatchResponse, MatchUpdate, BookingCreate, BookingResponse
+from models import User, Match, Booking, ArchivedBooking
+from schemas import MatchCreate, MatchResponse, MatchUpdate, BookingCreate, BookingResponse, ArchivedBookingResponse
 from auth import get_current_active_user
+from loaders import Loaders, get_loaders
+from serialization import select_for, list_response
+from caching import conditional_get
+from idempotency import idempotent
+from refunds import enqueue_refund
 
 router = APIRouter(prefix="/matches", tags=["matches"])
 
@@ -40,12 +45,17 @@ async def create_match(
 
 @router.get("/", response_model=List[MatchResponse])
 async def get_matches(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     active_only: bool = True,
     db: AsyncSession = Depends(get_db)
 ):
-    query = select(Match)
+    not_modified, cache_headers = await conditional_get(request, db, "matches")
+    if not_modified:
+        return not_modified
+    
+    query = select_for(MatchResponse, Match)
     
     if active_only:
         query = query.where(Match.is_active == True)
@@ -56,18 +66,17 @@ async def get_matches(
         .limit(limit)
         .order_by(Match.date.asc(), Match.time.asc())
     )
-    matches = result.scalars().all()
-    return [MatchResponse.from_orm(match) for match in matches]
+    response = list_response(MatchResponse, result)
+    response.headers.update(cache_headers)
+    return response
 
 @router.get("/{match_id}", response_model=MatchResponse)
 async def get_match(
     match_id: str,
+    loaders: Loaders = Depends(get_loaders),
     db: AsyncSession = Depends(get_db)
 ):
-    result = await db.execute(
-        select(Match).where(Match.id == match_id)
-    )
-    match = result.scalar_one_or_none()
+    match = await loaders.matches.load(match_id)
     
     if not match:
         raise HTTPException(
@@ -82,6 +91,7 @@ async def update_match(
     match_id: str,
     match_data: MatchUpdate,
     current_user: User = Depends(get_current_active_user),
+    loaders: Loaders = Depends(get_loaders),
     db: AsyncSession = Depends(get_db)
 ):
     # Only admins can update matches
@@ -91,10 +101,7 @@ async def update_match(
             detail="Only admins can update matches"
         )
     
-    result = await db.execute(
-        select(Match).where(Match.id == match_id)
-    )
-    match = result.scalar_one_or_none()
+    match = await loaders.matches.load(match_id)
     
     if not match:
         raise HTTPException(
@@ -102,21 +109,23 @@ async def update_match(
             detail="Match not found"
         )
     
-    # Update fields
-    if match_data.date is not None:
-        match.date = match_data.date
-    if match_data.time is not None:
-        match.time = match_data.time
-    if match_data.location is not None:
-        match.location = match_data.location
-    if match_data.price is not None:
-        match.price = match_data.price
-    if match_data.max_players is not None:
-        match.max_players = match_data.max_players
-    if match_data.players_left is not None:
-        match.players_left = match_data.players_left
-    if match_data.is_active is not None:
-        match.is_active = match_data.is_active
+    # Update fields in one UPDATE conditioned on the version the caller read
+    # (or, without one, the version just loaded), so a concurrent edit or
+    # booking can't be silently overwritten
+    values = match_data.model_dump(exclude_none=True, exclude={"version"})
+    expected = match_data.version if match_data.version is not None else match.version
+    result = await db.execute(
+        update(Match)
+        .where(Match.id == match_id, Match.version == expected)
+        .values(**values, version=Match.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    if not result.rowcount:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Match was changed by another request; reload and retry"
+        )
     
     await db.commit()
     await db.refresh(match)
@@ -127,6 +136,7 @@ async def update_match(
 async def delete_match(
     match_id: str,
     current_user: User = Depends(get_current_active_user),
+    loaders: Loaders = Depends(get_loaders),
     db: AsyncSession = Depends(get_db)
 ):
     # Only admins can delete matches
@@ -136,10 +146,7 @@ async def delete_match(
             detail="Only admins can delete matches"
         )
     
-    result = await db.execute(
-        select(Match).where(Match.id == match_id)
-    )
-    match = result.scalar_one_or_none()
+    match = await loaders.matches.load(match_id)
     
     if not match:
         raise HTTPException(
@@ -154,17 +161,16 @@ async def delete_match(
 
 # Booking endpoints
 @router.post("/{match_id}/book", response_model=BookingResponse)
+@idempotent
 async def book_match(
     match_id: str,
     booking_data: BookingCreate,
     current_user: User = Depends(get_current_active_user),
+    loaders: Loaders = Depends(get_loaders),
     db: AsyncSession = Depends(get_db)
 ):
     # Get match
-    result = await db.execute(
-        select(Match).where(Match.id == match_id)
-    )
-    match = result.scalar_one_or_none()
+    match = await loaders.matches.load(match_id)
     
     if not match:
         raise HTTPException(
@@ -178,12 +184,6 @@ async def book_match(
             detail="Match is not active"
         )
     
-    if match.players_left <= 0:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Match is full"
-        )
-    
     # Check if user already booked this match
     existing_booking = await db.execute(
         select(Booking).where(
@@ -198,15 +198,26 @@ async def book_match(
             detail="You have already booked this match"
         )
     
+    # Take a seat with a conditional decrement, so concurrent bookings can
+    # never oversell the last one
+    seat = await db.execute(
+        update(Match)
+        .where(Match.id == match_id, Match.is_active == True, Match.players_left > 0)
+        .values(players_left=Match.players_left - 1, version=Match.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    if not seat.rowcount:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Match is full"
+        )
+    
     # Create booking
     booking = Booking(
         user_id=current_user.id,
         match_id=match_id
     )
     
-    # Decrement players left
-    match.players_left -= 1
-    
     db.add(booking)
     await db.commit()
     await db.refresh(booking)
@@ -217,6 +228,7 @@ async def book_match(
 async def cancel_booking(
     match_id: str,
     current_user: User = Depends(get_current_active_user),
+    loaders: Loaders = Depends(get_loaders),
     db: AsyncSession = Depends(get_db)
 ):
     # Get booking
@@ -235,6 +247,13 @@ async def cancel_booking(
             detail="Booking not found"
         )
     
+    match = await loaders.matches.load(match_id)
+    if not match:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Match not found"
+        )
+    
     # Check if within 24 hours for full refund
     booking_time = booking.booking_time
     current_time = datetime.utcnow()
@@ -249,16 +268,26 @@ async def cancel_booking(
     booking.cancelled_at = current_time
     
     # Increment players left
-    match = await db.execute(select(Match).where(Match.id == match_id))
-    match = match.scalar_one_or_none()
-    if match:
-        match.players_left += 1
+    await db.execute(
+        update(Match)
+        .where(Match.id == match_id)
+        .values(players_left=Match.players_left + 1, version=Match.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    
+    # Queue the refund with the cancellation; refunds.py settles it with the gateway
+    refund_status = None
+    payment = await loaders.payments_by_booking.load(booking.id)
+    if payment and payment.status == "completed" and booking.refund_amount:
+        await enqueue_refund(db, payment, booking.refund_amount)
+        refund_status = "queued"
     
     await db.commit()
     
     return {
         "message": "Booking cancelled successfully",
-        "refund_amount": booking.refund_amount
+        "refund_amount": booking.refund_amount,
+        "refund_status": refund_status
     }
 
 @router.get("/user/bookings", response_model=List[BookingResponse])
@@ -267,8 +296,19 @@ async def get_user_bookings(
     db: AsyncSession = Depends(get_db)
 ):
     result = await db.execute(
-        select(Booking).where(Booking.user_id == current_user.id)
+        select_for(BookingResponse, Booking).where(Booking.user_id == current_user.id)
         .order_by(Booking.booking_time.desc())
     )
-    bookings = result.scalars().all()
-    return [BookingResponse.from_orm(booking) for booking in bookings] 
\ No newline at end of file
+    return list_response(BookingResponse, result)
+
+@router.get("/user/bookings/archived", response_model=List[ArchivedBookingResponse])
+async def get_user_archived_bookings(
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    # Bookings of matches moved out of the live tables by archive.py
+    result = await db.execute(
+        select_for(ArchivedBookingResponse, ArchivedBooking).where(ArchivedBooking.user_id == current_user.id)
+        .order_by(ArchivedBooking.booking_time.desc())
+    )
+    return list_response(ArchivedBookingResponse, result)
\ No newline at end of file
@@ -1,39 +1,67 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+from datetime import date, datetime, time, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update, func, case, or_, and_
+from sqlalchemy.orm import aliased
+from typing import List, Optional
 from database import get_db
-from models import User, Payment, Booking
-from schemas import PaymentCreate, PaymentResponse, PaymentUpdate
+from models import User, Payment, Booking, ArchivedPayment, ArchivedBooking
+from schemas import (
+    PaymentCreate, PaymentResponse, PaymentUpdate, PaymentHistoryResponse, PaymentSummary,
+    ArchivedPaymentResponse
+)
 from auth import get_current_active_user
+from loaders import Loaders, get_loaders
+from serialization import select_for, list_response
+from idempotency import idempotent
+from gateway import get_gateway, GatewayError, GatewayDeclined, GatewayUnavailable
+from payment_states import transition
 
 router = APIRouter(prefix="/payment", tags=["payment"])
 
+async def owned_payment(loaders: Loaders, payment_id: str, user: User, action: str) -> Payment:
+    payment = await loaders.payments.load(payment_id)
+    
+    if not payment:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Payment not found"
+        )
+    
+    # Verify user owns this payment
+    booking = await loaders.bookings.load(payment.booking_id)
+    
+    if not booking or booking.user_id != user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"Not authorized to {action} this payment"
+        )
+    
+    return payment
+
 @router.post("/", response_model=PaymentResponse)
+@idempotent
 async def create_payment(
     payment_data: PaymentCreate,
     current_user: User = Depends(get_current_active_user),
+    loaders: Loaders = Depends(get_loaders),
     db: AsyncSession = Depends(get_db)
 ):
     # Verify booking exists and belongs to user
-    result = await db.execute(
-        select(Booking).where(
-            Booking.id == payment_data.booking_id,
-            Booking.user_id == current_user.id
-        )
+    booking, existing_payment = await asyncio.gather(
+        loaders.bookings.load(payment_data.booking_id),
+        loaders.payments_by_booking.load(payment_data.booking_id)
     )
-    booking = result.scalar_one_or_none()
     
-    if not booking:
+    if not booking or booking.user_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Booking not found"
         )
     
     # Check if payment already exists
-    existing_payment = await db.execute(
-        select(Payment).where(Payment.booking_id == payment_data.booking_id)
-    )
-    if existing_payment.scalar_one_or_none():
+    if existing_payment:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Payment already exists for this booking"
@@ -56,30 +84,10 @@ async def create_payment(
 async def get_payment(
     payment_id: str,
     current_user: User = Depends(get_current_active_user),
+    loaders: Loaders = Depends(get_loaders),
     db: AsyncSession = Depends(get_db)
 ):
-    result = await db.execute(
-        select(Payment).where(Payment.id == payment_id)
-    )
-    payment = result.scalar_one_or_none()
-    
-    if not payment:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Payment not found"
-        )
-    
-    # Verify user owns this payment
-    booking_result = await db.execute(
-        select(Booking).where(Booking.id == payment.booking_id)
-    )
-    booking = booking_result.scalar_one_or_none()
-    
-    if not booking or booking.user_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to view this payment"
-        )
+    payment = await owned_payment(loaders, payment_id, current_user, "view")
     
     return PaymentResponse.from_orm(payment)
 
@@ -88,100 +96,185 @@ async def update_payment(
     payment_id: str,
     payment_data: PaymentUpdate,
     current_user: User = Depends(get_current_active_user),
+    loaders: Loaders = Depends(get_loaders),
     db: AsyncSession = Depends(get_db)
 ):
-    result = await db.execute(
-        select(Payment).where(Payment.id == payment_id)
-    )
-    payment = result.scalar_one_or_none()
-    
-    if not payment:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Payment not found"
-        )
+    payment = await owned_payment(loaders, payment_id, current_user, "update")
     
-    # Verify user owns this payment
-    booking_result = await db.execute(
-        select(Booking).where(Booking.id == payment.booking_id)
+    # Update fields; status only changes through the gateway (/process and
+    # webhooks). Conditioned on the version read, like update_match.
+    values = payment_data.model_dump(exclude_none=True, exclude={"version"})
+    expected = payment_data.version if payment_data.version is not None else payment.version
+    result = await db.execute(
+        update(Payment)
+        .where(Payment.id == payment_id, Payment.version == expected)
+        .values(**values, version=Payment.version + 1)
+        .execution_options(synchronize_session=False)
     )
-    booking = booking_result.scalar_one_or_none()
-    
-    if not booking or booking.user_id != current_user.id:
+    if not result.rowcount:
+        await db.rollback()
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to update this payment"
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Payment was changed by another request; reload and retry"
         )
     
-    # Update fields
-    if payment_data.transaction_id is not None:
-        payment.transaction_id = payment_data.transaction_id
-    if payment_data.status is not None:
-        payment.status = payment_data.status
-    
     await db.commit()
     await db.refresh(payment)
     
     return PaymentResponse.from_orm(payment)
 
-@router.get("/user/payments")
+@router.get("/user/payments", response_model=PaymentHistoryResponse)
 async def get_user_payments(
+    cursor: Optional[str] = None,
+    limit: int = 50,
+    payment_status: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
     current_user: User = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db)
 ):
-    # Get all bookings for user
-    bookings_result = await db.execute(
-        select(Booking).where(Booking.user_id == current_user.id)
-    )
-    bookings = bookings_result.scalars().all()
-    booking_ids = [booking.id for booking in bookings]
+    # Newest first, keyset-paginated: cursor is the id of the last payment on
+    # the previous page, and each page is one indexed join through bookings
+    limit = max(1, min(limit, 200))
+    conditions = [Booking.user_id == current_user.id]
+    if payment_status:
+        conditions.append(Payment.status == payment_status)
+    if date_from:
+        conditions.append(Payment.created_at >= datetime.combine(date_from, time.min))
+    if date_to:
+        conditions.append(Payment.created_at < datetime.combine(date_to + timedelta(days=1), time.min))
     
-    # Get payments for these bookings
-    payments_result = await db.execute(
-        select(Payment).where(Payment.booking_id.in_(booking_ids))
+    query = select_for(PaymentResponse, Payment).join(Booking, Booking.id == Payment.booking_id).where(*conditions)
+    if cursor:
+        # Compared column to column, so stored timestamp formats never matter
+        last = aliased(Payment)
+        after = select(last.created_at).where(last.id == cursor).scalar_subquery()
+        query = query.where(or_(
+            Payment.created_at < after,
+            and_(Payment.created_at == after, Payment.id < cursor)
+        ))
+    result = await db.execute(
+        query.order_by(Payment.created_at.desc(), Payment.id.desc()).limit(limit + 1)
     )
-    payments = payments_result.scalars().all()
+    keys = list(result.keys())
+    items = [dict(zip(keys, row)) for row in result]
+    
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = items[-1]["id"]
     
-    return [PaymentResponse.from_orm(payment) for payment in payments]
+    # Totals cover the whole filtered history; later pages skip the aggregate
+    summary = None
+    if not cursor:
+        totals = (await db.execute(
+            select(
+                func.coalesce(func.sum(case((Payment.status == "completed", Payment.amount), else_=0)), 0),
+                func.coalesce(func.sum(case((Payment.status == "refunded", Payment.amount), else_=0)), 0),
+                func.coalesce(func.sum(case((Payment.status == "pending", Payment.amount), else_=0)), 0),
+                func.count(Payment.id)
+            )
+            .join(Booking, Booking.id == Payment.booking_id)
+            .where(*conditions)
+        )).one()
+        summary = PaymentSummary(
+            total_paid=totals[0], total_refunded=totals[1], total_pending=totals[2], count=totals[3]
+        )
+    
+    page = PaymentHistoryResponse(items=items, next_cursor=next_cursor, summary=summary)
+    return Response(content=page.model_dump_json(), media_type="application/json")
+
+@router.get("/user/payments/archived", response_model=List[ArchivedPaymentResponse])
+async def get_user_archived_payments(
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    # Payments for bookings of matches moved out of the live tables by archive.py
+    result = await db.execute(
+        select_for(ArchivedPaymentResponse, ArchivedPayment).where(ArchivedPayment.booking_id.in_(
+            select(ArchivedBooking.id).where(ArchivedBooking.user_id == current_user.id)
+        ))
+        .order_by(ArchivedPayment.created_at.desc())
+    )
+    return list_response(ArchivedPaymentResponse, result)
 
 @router.post("/{payment_id}/process")
+@idempotent
 async def process_payment(
     payment_id: str,
     current_user: User = Depends(get_current_active_user),
+    loaders: Loaders = Depends(get_loaders),
     db: AsyncSession = Depends(get_db)
 ):
     """
-    Process payment through payment gateway
-    This is a placeholder for actual payment gateway integration
+    Charge a payment through the payment gateway (see gateway.py)
     """
-    result = await db.execute(
-        select(Payment).where(Payment.id == payment_id)
-    )
-    payment = result.scalar_one_or_none()
+    payment = await owned_payment(loaders, payment_id, current_user, "process")
     
-    if not payment:
+    if payment.status == "completed":
+        return {
+            "message": "Payment already processed",
+            "transaction_id": payment.transaction_id,
+            "status": payment.status
+        }
+    
+    # An expired payment was only left unpaid too long; like a declined one,
+    # it can be charged again, otherwise its booking could never be paid
+    if payment.status not in ("pending", "failed", "expired"):
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Payment not found"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Payment is {payment.status} and cannot be processed"
         )
     
-    # Verify user owns this payment
-    booking_result = await db.execute(
-        select(Booking).where(Booking.id == payment.booking_id)
-    )
-    booking = booking_result.scalar_one_or_none()
+    if payment.status == "pending" and payment.transaction_id:
+        # The gateway accepted a charge and is still settling it; charging
+        # again would take the money twice
+        return {
+            "message": "Payment is being processed",
+            "transaction_id": payment.transaction_id,
+            "status": payment.status
+        }
     
-    if not booking or booking.user_id != current_user.id:
+    # End the transaction so no pooled DB connection is held while waiting on
+    # the gateway. Each attempt is keyed by the version read here, so the
+    # gateway dedupes concurrent attempts into one charge, while a retry
+    # after a decline (which bumps the version) is charged afresh.
+    await db.commit()
+    
+    try:
+        charge = await get_gateway().charge(payment.id, payment.amount, payment.payment_method, payment.version)
+    except GatewayDeclined as exc:
+        # Only a still-pending payment fails; a success recorded meanwhile stands
+        await db.execute(transition("failed", Payment.id == payment.id))
+        await db.commit()
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to process this payment"
+            status_code=status.HTTP_402_PAYMENT_REQUIRED,
+            detail=str(exc)
+        )
+    except GatewayUnavailable:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Payment gateway is unavailable, please retry shortly"
+        )
+    except GatewayError:
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail="Payment gateway rejected the request"
         )
     
-    # Simulate payment processing
-    import uuid
-    payment.transaction_id = f"TXN_{uuid.uuid4().hex[:8].upper()}"
-    payment.status = "completed"
-    
+    # The card has been charged, so the charge is always recorded: the status
+    # moves if it still may (a success overrides an expiry or a decline that
+    # happened meanwhile), and the transaction id is kept regardless
+    result = await db.execute(transition(
+        charge.status, Payment.id == payment.id, transaction_id=charge.transaction_id
+    ))
+    if not result.rowcount:
+        await db.execute(
+            update(Payment)
+            .where(Payment.id == payment.id)
+            .values(transaction_id=charge.transaction_id, version=Payment.version + 1)
+            .execution_options(synchronize_session=False)
+        )
     await db.commit()
     await db.refresh(payment)
     
@@ -189,4 +282,4 @@ async def process_payment(
         "message": "Payment processed successfully",
         "transaction_id": payment.transaction_id,
         "status": payment.status
-    } 
\ No newline at end of file
+    }
\ No newline at end of file
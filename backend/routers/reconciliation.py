@@ -0,0 +1,96 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func
+from typing import List, Optional
+from database import get_db
+from models import ReconciliationRun, ReconciliationMismatch
+from schemas import ReconciliationRunResponse, ReconciliationMismatchResponse
+from reconciliation import reconcile_settlement
+from exports import parse_date_range
+from serialization import select_for, list_response
+from routers.imports import is_gzipped
+from routers.admin import verify_admin_mode_password
+
+# The gateway's settlement CSV is sent as the raw request body, e.g.
+#   curl --data-binary @settlement-2024-05.csv.gz -H "Content-Encoding: gzip" \
+#        "$API/admin/reconciliation/settlements?password=...&start=2024-05-01&end=2024-05-31"
+# start/end (inclusive) bound the payments expected in the file
+router = APIRouter(prefix="/admin/reconciliation", tags=["admin"])
+
+@router.post("/settlements", response_model=ReconciliationRunResponse)
+async def reconcile_settlement_file(
+    request: Request,
+    password: str,
+    start: Optional[str] = None,
+    end: Optional[str] = None
+):
+    await verify_admin_mode_password(password)
+    
+    since, until = parse_date_range(start, end)
+    return await reconcile_settlement(
+        request.stream(), is_gzipped(request), since, until, since_label=start, until_label=end
+    )
+
+@router.get("/runs", response_model=List[ReconciliationRunResponse])
+async def get_reconciliation_runs(
+    password: str,
+    skip: int = 0,
+    limit: int = 50,
+    db: AsyncSession = Depends(get_db)
+):
+    await verify_admin_mode_password(password)
+    
+    result = await db.execute(
+        select_for(ReconciliationRunResponse, ReconciliationRun)
+        .order_by(ReconciliationRun.started_at.desc())
+        .offset(skip)
+        .limit(limit)
+    )
+    return list_response(ReconciliationRunResponse, result)
+
+@router.get("/runs/{run_id}")
+async def get_reconciliation_run(
+    run_id: str,
+    password: str,
+    db: AsyncSession = Depends(get_db)
+):
+    await verify_admin_mode_password(password)
+    
+    run = await db.get(ReconciliationRun, run_id)
+    if not run:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Reconciliation run not found"
+        )
+    
+    kinds = await db.execute(
+        select(ReconciliationMismatch.kind, func.count())
+        .where(ReconciliationMismatch.run_id == run_id)
+        .group_by(ReconciliationMismatch.kind)
+    )
+    return {
+        **ReconciliationRunResponse.from_orm(run).model_dump(),
+        "mismatches_by_kind": dict(kinds.all())
+    }
+
+@router.get("/runs/{run_id}/mismatches", response_model=List[ReconciliationMismatchResponse])
+async def get_reconciliation_mismatches(
+    run_id: str,
+    password: str,
+    kind: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+    db: AsyncSession = Depends(get_db)
+):
+    await verify_admin_mode_password(password)
+    
+    query = select_for(ReconciliationMismatchResponse, ReconciliationMismatch).where(
+        ReconciliationMismatch.run_id == run_id
+    )
+    if kind:
+        query = query.where(ReconciliationMismatch.kind == kind)
+    
+    result = await db.execute(
+        query.order_by(ReconciliationMismatch.id).offset(skip).limit(limit)
+    )
+    return list_response(ReconciliationMismatchResponse, result)
\ No newline at end of file
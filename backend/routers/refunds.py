@@ -0,0 +1,79 @@
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update
+from typing import List, Optional
+from database import get_db
+from models import Refund
+from schemas import RefundResponse
+from refunds import refund_queue_status
+from scheduler import scheduler
+from serialization import select_for, list_response
+from routers.admin import verify_admin_mode_password
+
+router = APIRouter(prefix="/admin/refunds", tags=["admin"])
+
+@router.get("/status")
+async def get_refund_status(password: str, db: AsyncSession = Depends(get_db)):
+    await verify_admin_mode_password(password)
+    
+    return await refund_queue_status(db)
+
+@router.post("/run")
+async def run_refunds(password: str):
+    await verify_admin_mode_password(password)
+    
+    # Through the scheduler's lease, so it never overlaps a scheduled run
+    if not await scheduler.run_now("settle-refunds"):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Refunds are already being settled"
+        )
+    
+    return {"message": "Refund settlement started"}
+
+@router.get("/", response_model=List[RefundResponse])
+async def get_refunds(
+    password: str,
+    refund_status: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+    db: AsyncSession = Depends(get_db)
+):
+    await verify_admin_mode_password(password)
+    
+    query = select_for(RefundResponse, Refund)
+    if refund_status:
+        query = query.where(Refund.status == refund_status)
+    
+    result = await db.execute(
+        query.order_by(Refund.created_at.desc(), Refund.id).offset(skip).limit(limit)
+    )
+    return list_response(RefundResponse, result)
+
+@router.post("/{refund_id}/retry")
+async def retry_refund(
+    refund_id: str,
+    password: str,
+    db: AsyncSession = Depends(get_db)
+):
+    await verify_admin_mode_password(password)
+    
+    result = await db.execute(
+        update(Refund)
+        .where(Refund.id == refund_id, Refund.status == "failed")
+        .values(
+            status="queued", attempts=0, retries=Refund.retries + 1,
+            next_attempt_at=datetime.utcnow(), processed_at=None
+        )
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    
+    if not result.rowcount:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No failed refund with this id"
+        )
+    
+    return {"message": "Refund queued for retry"}
\ No newline at end of file
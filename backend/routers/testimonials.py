@@ -1,11 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete
-from typing import List
+from sqlalchemy import select, delete, false
+from typing import List, Optional
 from database import get_db
 from models import User, Testimonial
 from schemas import TestimonialCreate, TestimonialResponse, TestimonialUpdate
 from auth import get_current_active_user
+from serialization import select_for, list_response
+from caching import conditional_get
+from search import search_terms, match_testimonials
 
 router = APIRouter(prefix="/testimonials", tags=["testimonials"])
 
@@ -30,19 +33,61 @@ async def create_testimonial(
 
 @router.get("/", response_model=List[TestimonialResponse])
 async def get_testimonials(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     db: AsyncSession = Depends(get_db)
 ):
+    not_modified, cache_headers = await conditional_get(request, db, "testimonials")
+    if not_modified:
+        return not_modified
+    
     result = await db.execute(
-        select(Testimonial)
+        select_for(TestimonialResponse, Testimonial)
         .where(Testimonial.is_active == True)
         .offset(skip)
         .limit(limit)
         .order_by(Testimonial.created_at.desc())
     )
-    testimonials = result.scalars().all()
-    return [TestimonialResponse.from_orm(t) for t in testimonials]
+    response = list_response(TestimonialResponse, result)
+    response.headers.update(cache_headers)
+    return response
+
+@router.get("/search", response_model=List[TestimonialResponse])
+async def search_testimonials(
+    request: Request,
+    q: str,
+    min_rating: Optional[int] = None,
+    max_rating: Optional[int] = None,
+    skip: int = 0,
+    limit: int = 20,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Full-text search over active testimonials, best matches first. Every
+    word must appear, and matches as a prefix as well ("turf" finds "turfs").
+    """
+    not_modified, cache_headers = await conditional_get(request, db, "testimonials")
+    if not_modified:
+        return not_modified
+    
+    query = select_for(TestimonialResponse, Testimonial).where(Testimonial.is_active == True)
+    if min_rating is not None:
+        query = query.where(Testimonial.rating >= min_rating)
+    if max_rating is not None:
+        query = query.where(Testimonial.rating <= max_rating)
+    
+    terms = search_terms(q)
+    if not terms:
+        # Nothing searchable (only punctuation); match nothing
+        query = query.where(false())
+    else:
+        query = match_testimonials(query, terms)
+    
+    result = await db.execute(query.offset(skip).limit(min(limit, 100)))
+    response = list_response(TestimonialResponse, result)
+    response.headers.update(cache_headers)
+    return response
 
 @router.get("/{testimonial_id}", response_model=TestimonialResponse)
 async def get_testimonial(
@@ -135,7 +180,6 @@ async def get_user_testimonials(
     db: AsyncSession = Depends(get_db)
 ):
     result = await db.execute(
-        select(Testimonial).where(Testimonial.user_id == user_id)
+        select_for(TestimonialResponse, Testimonial).where(Testimonial.user_id == user_id)
     )
-    testimonials = result.scalars().all()
-    return [TestimonialResponse.from_orm(t) for t in testimonials] 
\ No newline at end of file
+    return list_response(TestimonialResponse, result) 
\ No newline at end of file
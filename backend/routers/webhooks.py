@@ -0,0 +1,74 @@
+import json
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func
+from typing import Optional
+from database import get_db
+from models import GatewayEvent
+from webhooks import verify_signature, record_event, processor
+from routers.admin import verify_admin_mode_password
+
+router = APIRouter(prefix="/webhooks", tags=["webhooks"])
+
+@router.post("/gateway")
+async def gateway_webhook(request: Request):
+    # Store and acknowledge only; the transition is applied by the webhook queue
+    body = await request.body()
+    if not verify_signature(request.headers.get("gateway-signature"), body):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid webhook signature"
+        )
+    
+    # Only decoded once the signature over the raw bytes checks out; bytes
+    # that aren't UTF-8 raise UnicodeDecodeError, a ValueError
+    try:
+        payload = body.decode("utf-8")
+        event = json.loads(payload)
+        event_id, event_type = str(event["id"]), str(event["type"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Malformed webhook event"
+        )
+    
+    # Gateways redeliver until acknowledged; a repeat is acknowledged again
+    if not await record_event(event_id, event_type, payload):
+        return {"received": True, "duplicate": True}
+    
+    processor.enqueue(event_id)
+    return {"received": True, "duplicate": False}
+
+@router.get("/gateway/events")
+async def get_gateway_events(
+    password: str,
+    event_status: Optional[str] = None,
+    limit: int = 50,
+    db: AsyncSession = Depends(get_db)
+):
+    await verify_admin_mode_password(password)
+    
+    query = select(GatewayEvent).order_by(GatewayEvent.received_at.desc()).limit(min(limit, 500))
+    if event_status:
+        query = query.where(GatewayEvent.status == event_status)
+    events = (await db.execute(query)).scalars().all()
+    
+    counts = dict((await db.execute(
+        select(GatewayEvent.status, func.count()).group_by(GatewayEvent.status)
+    )).all())
+    
+    return {
+        "counts": counts,
+        "queued": processor.depth(),
+        "events": [
+            {
+                "id": event.id,
+                "type": event.type,
+                "status": event.status,
+                "error": event.error,
+                "received_at": event.received_at,
+                "processed_at": event.processed_at
+            }
+            for event in events
+        ]
+    }
\ No newline at end of file
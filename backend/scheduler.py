@@ -0,0 +1,332 @@
+import asyncio
+import logging
+import os
+import random
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Optional
+from zoneinfo import ZoneInfo
+from sqlalchemy import select, update, insert, or_
+from sqlalchemy.exc import IntegrityError
+from database import AsyncSessionLocal
+from models import JobLease
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Longest a job loop sleeps before re-reading its lease row, so runs
+# triggered or finished on other workers are noticed promptly
+MAX_SLEEP = 60
+
+# Extra lease time past the job timeout before another worker may take over
+LEASE_MARGIN = 30
+
+# Pause after an unexpected scheduler error (e.g. the database is down)
+ERROR_BACKOFF = 30
+
+def utcnow() -> datetime:
+    # Naive UTC, like the other timestamps the app writes
+    return datetime.utcnow()
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # SQLite returns naive datetimes, Postgres aware ones
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+class CronSchedule:
+    """
+    Five-field cron expression: minute hour day-of-month month day-of-week,
+    with *, lists, ranges and steps ("*/15 6-23 * * 1-5"). Day-of-week
+    0 and 7 are Sunday. Times are wall-clock times in settings.timezone.
+    """
+
+    FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: {expression!r}")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, self.weekdays = [
+            self._parse(field, low, high) for field, (low, high) in zip(fields, self.FIELDS)
+        ]
+        if 7 in self.weekdays:
+            self.weekdays.add(0)
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+        self.zone = ZoneInfo(settings.timezone)
+
+    @staticmethod
+    def _parse(field: str, low: int, high: int) -> set:
+        values = set()
+        for part in field.split(","):
+            spec, _, step = part.partition("/")
+            if spec == "*":
+                start, end = low, high
+            elif "-" in spec:
+                start, end = (int(bound) for bound in spec.split("-", 1))
+            else:
+                start = int(spec)
+                end = high if step else start
+            step = int(step) if step else 1
+            if start < low or end > high or start > end or step < 1:
+                raise ValueError(f"Invalid cron field {field!r}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, moment: datetime) -> bool:
+        in_days = moment.day in self.days
+        in_weekdays = (moment.weekday() + 1) % 7 in self.weekdays
+        # Standard cron: when both fields are restricted, either may match
+        if self.any_day or self.any_weekday:
+            return in_days and in_weekdays
+        return in_days or in_weekdays
+
+    def next_after(self, after: datetime) -> datetime:
+        """Next matching time strictly after `after` (naive UTC in, naive UTC out)."""
+        local = after.replace(tzinfo=timezone.utc).astimezone(self.zone).replace(tzinfo=None)
+        moment = local.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment + timedelta(days=366 * 5)
+        while moment < limit:
+            if moment.month not in self.months:
+                moment = (moment.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + timedelta(days=1)
+            elif moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment.replace(tzinfo=self.zone).astimezone(timezone.utc).replace(tzinfo=None)
+        raise ValueError(f"Cron expression never matches: {self.expression!r}")
+
+class Job:
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[], Awaitable],
+        interval: Optional[int] = None,
+        cron: Optional[str] = None,
+        jitter: float = 0,
+        timeout: Optional[int] = None
+    ):
+        if (interval is None) == (cron is None):
+            raise ValueError(f"Job {name} needs exactly one of interval or cron")
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.cron = CronSchedule(cron) if cron else None
+        self.jitter = jitter
+        self.timeout = timeout or settings.scheduler_job_timeout
+
+    def next_run(self, after: datetime) -> datetime:
+        if self.cron:
+            return self.cron.next_after(after)
+        return after + timedelta(seconds=self.interval)
+
+    def describe(self) -> dict:
+        return {
+            "schedule": self.cron.expression if self.cron else f"every {self.interval}s",
+            "jitter": self.jitter,
+            "timeout": self.timeout,
+        }
+
+class Scheduler:
+    """
+    Runs periodic jobs inside every worker process. Each job has a row in
+    job_leases; a worker only runs a job after atomically claiming that row
+    (due, and not leased by a live run elsewhere), so each run happens once
+    across all workers. Intervals count from the end of the previous run.
+    """
+
+    def __init__(self):
+        self.jobs: Dict[str, Job] = {}
+        self.tasks: Dict[str, asyncio.Task] = {}
+        self.metrics: Dict[str, dict] = {}
+        self.owner = None
+
+    def add(self, job: Job):
+        self.jobs[job.name] = job
+        self.metrics[job.name] = {
+            "runs": 0, "failures": 0, "timeouts": 0,
+            "last_status": None, "last_duration_ms": None,
+        }
+
+    def _set_owner(self):
+        # Resolved at start rather than at import, because gunicorn imports
+        # the app in the master and forks the workers from it
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+    def start(self):
+        self._set_owner()
+        for job in self.jobs.values():
+            self.tasks[job.name] = asyncio.create_task(self._loop(job), name=f"job:{job.name}")
+
+    async def stop(self):
+        tasks = list(self.tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.tasks.clear()
+
+    async def run_now(self, name: str) -> bool:
+        """Starts a job immediately unless a run is already in flight somewhere."""
+        job = self.jobs[name]
+        if self.owner is None:
+            # SCHEDULER_ENABLED=false: manual runs still need an owner to
+            # take and hand back the lease
+            self._set_owner()
+        # Registers the job's lease row if it has never been scheduled anywhere
+        await self._due_at(job)
+        if not await self._acquire(job, force=True):
+            return False
+        task = asyncio.create_task(self._run(job), name=f"job:{name}:manual")
+        self.tasks[f"{name}:manual"] = task
+        task.add_done_callback(lambda _: self.tasks.pop(f"{name}:manual", None))
+        return True
+
+    async def _loop(self, job: Job):
+        while True:
+            try:
+                wait = (await self._due_at(job) - utcnow()).total_seconds()
+                if wait > 0:
+                    await asyncio.sleep(min(wait, MAX_SLEEP))
+                    continue
+                # Spread out workers, and jobs that fall due together
+                if job.jitter:
+                    await asyncio.sleep(random.uniform(0, job.jitter))
+                if await self._acquire(job):
+                    await self._run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Scheduler loop for %s failed", job.name)
+                await asyncio.sleep(ERROR_BACKOFF)
+
+    async def _due_at(self, job: Job) -> datetime:
+        now = utcnow()
+        async with AsyncSessionLocal() as db:
+            row = (await db.execute(
+                select(JobLease.next_run_at, JobLease.lease_expires_at).where(JobLease.name == job.name)
+            )).one_or_none()
+            if row is None:
+                first_run = job.next_run(now)
+                try:
+                    await db.execute(insert(JobLease).values(
+                        name=job.name, next_run_at=first_run, runs=0, failures=0
+                    ))
+                    await db.commit()
+                except IntegrityError:
+                    # Another worker registered the job first; its schedule stands
+                    await db.rollback()
+                    return now
+                return first_run
+
+        next_run_at, lease_expires_at = _naive_utc(row[0]) or now, _naive_utc(row[1])
+        if lease_expires_at and lease_expires_at > now:
+            # Running elsewhere; that run moves next_run_at when it finishes
+            return max(next_run_at, lease_expires_at)
+        return next_run_at
+
+    async def _acquire(self, job: Job, force: bool = False) -> bool:
+        now = utcnow()
+        conditions = [
+            JobLease.name == job.name,
+            or_(JobLease.lease_expires_at == None, JobLease.lease_expires_at < now),
+        ]
+        if not force:
+            conditions.append(JobLease.next_run_at <= now)
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(JobLease)
+                .where(*conditions)
+                .values(
+                    owner=self.owner,
+                    lease_expires_at=now + timedelta(seconds=job.timeout + LEASE_MARGIN),
+                    last_started_at=now
+                )
+            )
+            await db.commit()
+        return result.rowcount == 1
+
+    async def _run(self, job: Job):
+        started = time.perf_counter()
+        status, error = "ok", None
+        try:
+            await asyncio.wait_for(job.func(), timeout=job.timeout)
+        except asyncio.TimeoutError:
+            status, error = "timeout", f"Timed out after {job.timeout}s"
+            logger.error("Job %s timed out after %ss", job.name, job.timeout)
+        except asyncio.CancelledError:
+            # Shutting down: hand the lease back without consuming the slot,
+            # so another worker picks the job up right away
+            await self._release(job, "cancelled", None, started, advance=False)
+            raise
+        except Exception as exc:
+            status, error = "failed", repr(exc)[:1000]
+            logger.exception("Job %s failed", job.name)
+        await self._release(job, status, error, started)
+
+    async def _release(self, job: Job, status: str, error: Optional[str], started: float, advance: bool = True):
+        duration_ms = int((time.perf_counter() - started) * 1000)
+        metrics = self.metrics[job.name]
+        metrics["runs"] += 1
+        failed = status in ("failed", "timeout")
+        metrics["failures"] += int(failed)
+        metrics["timeouts"] += int(status == "timeout")
+        metrics["last_status"] = status
+        metrics["last_duration_ms"] = duration_ms
+
+        now = utcnow()
+        values = {
+            "owner": None,
+            "lease_expires_at": None,
+            "last_finished_at": now,
+            "last_status": status,
+            "last_error": error,
+            "last_duration_ms": duration_ms,
+            "runs": JobLease.runs + 1,
+            "failures": JobLease.failures + int(failed),
+        }
+        if advance:
+            values["next_run_at"] = job.next_run(now)
+        async with AsyncSessionLocal() as db:
+            # Only if the lease is still ours; an expired lease may have been taken over
+            await db.execute(
+                update(JobLease)
+                .where(JobLease.name == job.name, JobLease.owner == self.owner)
+                .values(**values)
+            )
+            await db.commit()
+
+    async def status(self) -> list:
+        async with AsyncSessionLocal() as db:
+            rows = {
+                lease.name: lease
+                for lease in (await db.execute(select(JobLease))).scalars().all()
+            }
+        jobs = []
+        for name, job in self.jobs.items():
+            lease = rows.get(name)
+            jobs.append({
+                "name": name,
+                **job.describe(),
+                "next_run_at": lease.next_run_at if lease else None,
+                "running": bool(lease and lease.lease_expires_at and _naive_utc(lease.lease_expires_at) > utcnow()),
+                "owner": lease.owner if lease else None,
+                "last_started_at": lease.last_started_at if lease else None,
+                "last_finished_at": lease.last_finished_at if lease else None,
+                "last_status": lease.last_status if lease else None,
+                "last_error": lease.last_error if lease else None,
+                "last_duration_ms": lease.last_duration_ms if lease else None,
+                "runs": lease.runs if lease else 0,
+                "failures": lease.failures if lease else 0,
+                # Runs made by the worker answering this request
+                "worker": self.metrics[name],
+            })
+        return jobs
+
+scheduler = Scheduler()
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, validator
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import datetime
 
 # User Schemas
@@ -94,6 +94,11 @@ class GalleryUpdate(BaseModel):
 
 class GalleryResponse(GalleryBase):
     id: str
+    srcset: Optional[str] = None  # JPEG variants, "<url> <width>w, ..."; uploads only
+    srcset_webp: Optional[str] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    placeholder: Optional[str] = None  # data: URI to show while the image loads
     is_active: bool
     created_at: datetime
     updated_at: Optional[datetime] = None
@@ -121,10 +126,12 @@ class MatchUpdate(BaseModel):
     max_players: Optional[int] = None
     players_left: Optional[int] = None
     is_active: Optional[bool] = None
+    version: Optional[int] = None  # version read; the update is refused (409) if it has moved on
 
 class MatchResponse(MatchBase):
     id: str
     is_active: bool
+    version: int
     created_at: datetime
     updated_at: Optional[datetime] = None
 
@@ -160,18 +167,132 @@ class PaymentCreate(PaymentBase):
 
 class PaymentUpdate(BaseModel):
     transaction_id: Optional[str] = None
-    status: Optional[str] = None
+    version: Optional[int] = None  # version read; the update is refused (409) if it has moved on
 
 class PaymentResponse(PaymentBase):
     id: str
     transaction_id: Optional[str] = None
     status: str
+    version: int
     created_at: datetime
     updated_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
 
+class PaymentSummary(BaseModel):
+    total_paid: float
+    total_refunded: float
+    total_pending: float
+    count: int
+
+class PaymentHistoryResponse(BaseModel):
+    items: List[PaymentResponse]
+    next_cursor: Optional[str] = None
+    summary: Optional[PaymentSummary] = None  # first page only
+
+class RefundResponse(BaseModel):
+    id: str
+    payment_id: str
+    booking_id: str
+    amount: float
+    status: str
+    attempts: int
+    retries: int
+    next_attempt_at: datetime
+    gateway_refund_id: Optional[str] = None
+    last_error: Optional[str] = None
+    created_at: datetime
+    processed_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+# Archive Schemas
+class ArchivedMatchResponse(MatchResponse):
+    version: Optional[int] = None
+    archived_at: datetime
+
+class ArchivedBookingResponse(BookingResponse):
+    archived_at: datetime
+
+class ArchivedPaymentResponse(PaymentResponse):
+    version: Optional[int] = None
+    archived_at: datetime
+
+class ArchivedMatchDetail(ArchivedMatchResponse):
+    bookings: List[ArchivedBookingResponse]
+    payments: List[ArchivedPaymentResponse]
+
+# Analytics Schemas
+class MatchStatsResponse(BaseModel):
+    match_id: str
+    date: str
+    location: str
+    max_players: int
+    bookings: int
+    cancellations: int
+    fill_rate: float
+    revenue: float
+    refunds: float
+    refreshed_at: datetime
+
+class BookingPeriodStats(BaseModel):
+    period: str  # "2024-01-15" for days, "2024-W03" for ISO weeks
+    location: Optional[str] = None
+    bookings: int
+    cancellations: int
+    revenue: float
+    refunds: float
+
+class VenueStats(BaseModel):
+    location: str
+    bookings: int
+    cancellations: int
+    revenue: float
+    refunds: float
+
+# Import Schemas
+class ImportRowError(BaseModel):
+    line: int
+    errors: List[str]
+
+class ImportResult(BaseModel):
+    imported: int
+    failed: int
+    errors: List[ImportRowError]
+    errors_truncated: bool
+
+# Reconciliation Schemas
+class ReconciliationRunResponse(BaseModel):
+    id: str
+    status: str
+    since: Optional[str] = None
+    until: Optional[str] = None
+    rows: int
+    matched: int
+    mismatched: int
+    error: Optional[str] = None
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class ReconciliationMismatchResponse(BaseModel):
+    kind: str
+    line: Optional[int] = None
+    transaction_id: Optional[str] = None
+    payment_id: Optional[str] = None
+    payment_amount: Optional[float] = None
+    settled_amount: Optional[float] = None
+    payment_status: Optional[str] = None
+    settled_status: Optional[str] = None
+    detail: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
 # Admin Schemas
 class AdminModeRequest(BaseModel):
     password: str
@@ -180,6 +301,33 @@ class AdminModeResponse(BaseModel):
     access_granted: bool
     message: str
 
+class BulkFilter(BaseModel):
+    # Each resource accepts the subset of fields that exist on it
+    is_active: Optional[bool] = None
+    created_before: Optional[datetime] = None
+    created_after: Optional[datetime] = None
+    username_contains: Optional[str] = None  # users
+    email_domain: Optional[str] = None  # users
+    user_id: Optional[str] = None  # testimonials, bookings
+    max_rating: Optional[int] = None  # testimonials
+    location: Optional[str] = None  # matches
+    date_before: Optional[str] = None  # matches, "2024-01-15"
+    date_after: Optional[str] = None  # matches
+    category: Optional[str] = None  # gallery
+    match_id: Optional[str] = None  # bookings
+    is_cancelled: Optional[bool] = None  # bookings
+    status: Optional[str] = None  # payments
+
+class BulkActionRequest(BaseModel):
+    action: str  # deactivate, restore, delete
+    ids: Optional[List[str]] = None
+    filter: Optional[BulkFilter] = None
+
+class BulkActionResponse(BaseModel):
+    resource: str
+    action: str
+    affected: Dict[str, int]
+
 # Google OAuth Schemas
 class GoogleAuthRequest(BaseModel):
     code: str
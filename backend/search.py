@@ -0,0 +1,132 @@
+import re
+from typing import List
+from sqlalchemy import Select, column, func, literal_column, table
+from database import engine
+from models import Testimonial
+
+# Words of a query that are searched for; the rest are ignored
+MAX_TERMS = 8
+
+# SQLite: an FTS5 index over testimonials (external content, so the text is
+# not stored twice) kept up to date by triggers, whichever code path writes
+# the table. It is keyed by search_key, an integer column added here and
+# assigned on insert, rather than by the implicit rowid, which VACUUM or a
+# migration that copies the table may renumber
+SQLITE_INDEX = [
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_testimonials_search_key ON testimonials (search_key)",
+    """
+    CREATE VIRTUAL TABLE testimonials_fts USING fts5(
+        text, name,
+        content='testimonials', content_rowid='search_key',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER testimonials_fts_insert AFTER INSERT ON testimonials BEGIN
+        UPDATE testimonials
+        SET search_key = (SELECT coalesce(max(search_key), 0) + 1 FROM testimonials)
+        WHERE rowid = new.rowid AND search_key IS NULL;
+        INSERT INTO testimonials_fts(rowid, text, name)
+        SELECT search_key, text, name FROM testimonials WHERE rowid = new.rowid;
+    END
+    """,
+    """
+    CREATE TRIGGER testimonials_fts_delete AFTER DELETE ON testimonials BEGIN
+        INSERT INTO testimonials_fts(testimonials_fts, rowid, text, name)
+        VALUES ('delete', old.search_key, old.text, old.name);
+    END
+    """,
+    """
+    CREATE TRIGGER testimonials_fts_update AFTER UPDATE OF text, name ON testimonials BEGIN
+        INSERT INTO testimonials_fts(testimonials_fts, rowid, text, name)
+        VALUES ('delete', old.search_key, old.text, old.name);
+        INSERT INTO testimonials_fts(rowid, text, name) VALUES (new.search_key, new.text, new.name);
+    END
+    """,
+]
+
+# Postgres: a generated tsvector column, which the database recomputes on
+# every write, and a GIN index over it. Review text ranks above names
+POSTGRES_INDEX = [
+    """
+    ALTER TABLE testimonials ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(text, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(name, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_testimonials_search ON testimonials USING GIN (search_vector)",
+]
+
+def _rebuild_sqlite(connection):
+    for trigger in ("insert", "delete", "update"):
+        connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS testimonials_fts_{trigger}")
+    connection.exec_driver_sql("DROP TABLE IF EXISTS testimonials_fts")
+    columns = [row[1] for row in connection.exec_driver_sql("PRAGMA table_info(testimonials)")]
+    if "search_key" not in columns:
+        connection.exec_driver_sql("ALTER TABLE testimonials ADD COLUMN search_key INTEGER")
+    # Key rows written before the column or while the triggers were missing,
+    # above every key already taken
+    connection.exec_driver_sql(
+        "UPDATE testimonials SET search_key = rowid + "
+        "(SELECT coalesce(max(search_key), 0) FROM testimonials) WHERE search_key IS NULL"
+    )
+    for statement in SQLITE_INDEX:
+        connection.exec_driver_sql(statement)
+    connection.exec_driver_sql("INSERT INTO testimonials_fts(testimonials_fts) VALUES ('rebuild')")
+
+def _ensure(connection):
+    if connection.dialect.name == "sqlite":
+        # Dropping the testimonials table (benchmarks.seed does) drops the
+        # triggers but leaves a stale index behind, so check for those, and
+        # for an index from before it was keyed by search_key
+        triggers = connection.exec_driver_sql(
+            "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'testimonials_fts_%'"
+        ).scalar()
+        index = connection.exec_driver_sql(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'testimonials_fts'"
+        ).scalar()
+        if triggers < 3 or "search_key" not in (index or ""):
+            _rebuild_sqlite(connection)
+    elif connection.dialect.name == "postgresql":
+        for statement in POSTGRES_INDEX:
+            connection.exec_driver_sql(statement)
+
+async def ensure_search_index():
+    """Creates the testimonial search index if it's missing, indexing existing rows."""
+    async with engine.begin() as conn:
+        await conn.run_sync(_ensure)
+
+async def rebuild_search_index():
+    """Re-indexes every testimonial on SQLite; Postgres keeps its index current itself."""
+    async with engine.begin() as conn:
+        if conn.dialect.name == "sqlite":
+            await conn.run_sync(_rebuild_sqlite)
+
+def search_terms(query: str) -> List[str]:
+    return re.findall(r"[^\W_]+", query.lower())[:MAX_TERMS]
+
+def match_testimonials(query: Select, terms: List[str]) -> Select:
+    """
+    Narrows a select over testimonials to rows containing every term, best
+    match first. Each term also matches as a prefix ("turf" finds "turfs"),
+    except single letters, which would match most of the index.
+    """
+    if engine.dialect.name == "postgresql":
+        expression = " & ".join(term + ":*" if len(term) > 1 else term for term in terms)
+        tsquery = func.to_tsquery("english", expression)
+        vector = literal_column("testimonials.search_vector")
+        return query.where(vector.op("@@")(tsquery)).order_by(
+            func.ts_rank_cd(vector, tsquery).desc(), Testimonial.created_at.desc()
+        )
+
+    # Quoted, so words like AND or NEAR are searched for rather than parsed
+    expression = " ".join(f'"{term}"*' if len(term) > 1 else f'"{term}"' for term in terms)
+    fts = table("testimonials_fts", column("rowid"))
+    index = literal_column("testimonials_fts")
+    return (
+        query.join(fts, fts.c.rowid == literal_column("testimonials.search_key"))
+        .where(index.op("MATCH")(expression))
+        # bm25 is lower for better matches; text is weighted above name
+        .order_by(func.bm25(index, 1.0, 0.5), Testimonial.created_at.desc())
+    )
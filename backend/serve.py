@@ -0,0 +1,63 @@
+"""
+Production entry point.
+
+Runs the API under gunicorn with uvicorn workers:
+
+    python serve.py
+
+`python main.py` is still the single-process development server. Worker
+count, request recycling, graceful shutdown and the database connection
+budget all come from config.py.
+"""
+import multiprocessing
+from gunicorn.app.base import BaseApplication
+from config import settings
+
+def worker_count() -> int:
+    if settings.web_concurrency > 0:
+        return settings.web_concurrency
+    return max(1, min(multiprocessing.cpu_count(), settings.max_workers))
+
+# Resolve the worker count before database.py builds the engine, so each
+# worker's pool gets its share of DB_MAX_CONNECTIONS
+settings.web_concurrency = worker_count()
+
+# Preload: import the app once in the master and fork the workers from it
+from main import app
+from database import engine
+
+def post_fork(server, worker):
+    # Pooled connections must never be shared across processes; drop any the
+    # master may have opened without closing them underneath it
+    engine.sync_engine.dispose(close=False)
+
+class KickoraApplication(BaseApplication):
+    def __init__(self, application, options: dict):
+        self.application = application
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        return self.application
+
+def gunicorn_options() -> dict:
+    return {
+        "bind": f"{settings.host}:{settings.port}",
+        "workers": settings.web_concurrency,
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        "preload_app": True,
+        # Recycle workers to bound memory growth; jitter avoids restarting them all at once
+        "max_requests": settings.worker_max_requests,
+        "max_requests_jitter": settings.worker_max_requests_jitter,
+        # On SIGTERM workers stop accepting and let in-flight requests (bookings,
+        # payments) finish before the lifespan shutdown closes the pool
+        "graceful_timeout": settings.graceful_timeout,
+        "post_fork": post_fork,
+    }
+
+if __name__ == "__main__":
+    KickoraApplication(app, gunicorn_options()).run()
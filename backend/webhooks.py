@@ -0,0 +1,209 @@
+import asyncio
+import hmac
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional
+from sqlalchemy import select, update, insert, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import AsyncSessionLocal
+from models import GatewayEvent, Payment, Booking, Match
+from gateway import webhook_signature
+from payment_states import transition
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Events queued per worker; anything beyond this waits for the sweep
+QUEUE_SIZE = 10000
+
+# The sweep leaves events this young (seconds) to the worker that received them
+SWEEP_GRACE = 30
+
+def verify_signature(header: Optional[str], body: bytes) -> bool:
+    """Checks a "t=<unix time>,v1=<hex hmac>" Gateway-Signature header against the raw body."""
+    if not settings.gateway_webhook_secret or not header:
+        return False
+    fields = dict(part.strip().split("=", 1) for part in header.split(",") if "=" in part)
+    try:
+        timestamp = int(fields.get("t", ""))
+    except ValueError:
+        return False
+    # Old signatures are refused so a captured request can't be replayed later
+    if abs(time.time() - timestamp) > settings.gateway_webhook_tolerance:
+        return False
+    expected = webhook_signature(settings.gateway_webhook_secret, timestamp, body)
+    return hmac.compare_digest(expected, fields.get("v1", ""))
+
+async def record_event(event_id: str, event_type: str, payload: str) -> bool:
+    """Stores the raw event; False when this event id was already received."""
+    async with AsyncSessionLocal() as db:
+        try:
+            await db.execute(insert(GatewayEvent).values(
+                id=event_id, type=event_type, payload=payload, status="received"
+            ))
+            await db.commit()
+        except IntegrityError:
+            return False
+    return True
+
+# Each transition returns True when applied, False when it no longer
+# applies (ignored) and None when it arrived ahead of an event it depends on
+# (left "received" for the sweep). Guarded updates make events safe to
+# apply twice.
+async def _charge_succeeded(db: AsyncSession, data: dict) -> bool:
+    result = await db.execute(
+        transition("completed", Payment.id == data["reference"], transaction_id=data["id"])
+    )
+    return result.rowcount > 0
+
+async def _charge_failed(db: AsyncSession, data: dict) -> bool:
+    result = await db.execute(transition("failed", Payment.id == data["reference"]))
+    return result.rowcount > 0
+
+async def _charge_refunded(db: AsyncSession, data: dict) -> bool:
+    payment_id, amount = data["reference"], float(data.get("amount_refunded", data["amount"]))
+    current = (await db.execute(select(Payment.status).where(Payment.id == payment_id))).scalar_one_or_none()
+    if current in ("pending", "failed", "expired"):
+        # The charge hasn't been recorded as succeeded yet
+        return None
+    result = await db.execute(transition("refunded", Payment.id == payment_id))
+    if not result.rowcount:
+        return False
+
+    # Money returned outside a cancellation voids the booking and frees its seat
+    booking_id = select(Payment.booking_id).where(Payment.id == payment_id).scalar_subquery()
+    await db.execute(
+        update(Booking)
+        .where(Booking.id == booking_id, Booking.refund_amount == None)
+        .values(refund_amount=amount)
+        .execution_options(synchronize_session=False)
+    )
+    cancelled = await db.execute(
+        update(Booking)
+        .where(Booking.id == booking_id, Booking.is_cancelled == False)
+        .values(is_cancelled=True, cancelled_at=func.now())
+        .execution_options(synchronize_session=False)
+    )
+    if cancelled.rowcount:
+        await db.execute(
+            update(Match)
+            .where(Match.id == select(Booking.match_id).where(Booking.id == booking_id).scalar_subquery())
+            .values(players_left=Match.players_left + 1, version=Match.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+    return True
+
+TRANSITIONS = {
+    "charge.succeeded": _charge_succeeded,
+    "charge.failed": _charge_failed,
+    "charge.refunded": _charge_refunded,
+}
+
+async def apply_events(event_ids: List[str]) -> int:
+    """Applies a batch of received events in one transaction, oldest first; returns how many were settled."""
+    async with AsyncSessionLocal() as db:
+        events = (await db.execute(
+            select(GatewayEvent)
+            .where(GatewayEvent.id.in_(event_ids), GatewayEvent.status == "received")
+        )).scalars().all()
+        # received_at may only have second resolution; ties keep arrival order
+        position = {event_id: index for index, event_id in enumerate(event_ids)}
+        events.sort(key=lambda event: (event.received_at, position[event.id]))
+        settled = 0
+        for event in events:
+            apply = TRANSITIONS.get(event.type)
+            if apply is None:
+                event.status = "ignored"
+            else:
+                try:
+                    data = json.loads(event.payload)["data"]
+                    applied = await apply(db, data)
+                    if applied is None:
+                        continue
+                    event.status = "applied" if applied else "ignored"
+                except (KeyError, TypeError, ValueError) as exc:
+                    # A malformed event is recorded, not retried; database
+                    # errors abort the batch and leave it for the sweep
+                    event.status, event.error = "failed", repr(exc)[:1000]
+            event.processed_at = func.now()
+            settled += 1
+        await db.commit()
+    return settled
+
+async def apply_pending_events() -> int:
+    """Sweep for events no worker queue applied (full queue, restart, crash)."""
+    cutoff = datetime.utcnow() - timedelta(seconds=SWEEP_GRACE)
+    total = deferred = 0
+    while True:
+        async with AsyncSessionLocal() as db:
+            event_ids = (await db.execute(
+                select(GatewayEvent.id)
+                .where(GatewayEvent.status == "received", GatewayEvent.received_at < cutoff)
+                .order_by(GatewayEvent.received_at, GatewayEvent.id)
+                .offset(deferred)
+                .limit(settings.webhook_batch_size)
+            )).scalars().all()
+        if not event_ids:
+            return total
+        settled = await apply_events(event_ids)
+        # Deferred events stay "received"; step past them
+        deferred += len(event_ids) - settled
+        total += settled
+
+class WebhookProcessor:
+    """
+    Per-worker queue between the webhook endpoint and the database. The
+    endpoint only stores the raw event and enqueues its id; a background
+    task collects ids for up to WEBHOOK_BATCH_WAIT seconds and applies them
+    in batches, so a burst of webhooks costs a few transactions rather than
+    one per event.
+    """
+
+    def __init__(self):
+        self.queue: Optional[asyncio.Queue] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.task = asyncio.create_task(self._consume(), name="webhooks")
+
+    async def stop(self):
+        # Events still queued stay "received" and are picked up by the sweep
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    def enqueue(self, event_id: str):
+        if self.queue is None:
+            return
+        try:
+            self.queue.put_nowait(event_id)
+        except asyncio.QueueFull:
+            logger.warning("Webhook queue full; event %s left for the sweep", event_id)
+
+    def depth(self) -> int:
+        return self.queue.qsize() if self.queue else 0
+
+    async def _consume(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + settings.webhook_batch_wait
+            while len(batch) < settings.webhook_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await apply_events(batch)
+            except Exception:
+                logger.exception("Applying %d webhook events failed; left for the sweep", len(batch))
+
+processor = WebhookProcessor()